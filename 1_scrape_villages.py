@@ -1,99 +1,28 @@
-import osmnx as ox
-import pandas as pd
-import time
-import numpy as np
+import feature_rows
+import lga_reference
+import osm_delta
+import pipeline
+import run_metrics
+import scrape_engine
 
-# 1. Define LGAs
-lgas = [
-    "Adavi", "Ajaokuta", "Ankpa", "Bassa", "Dekina", 
-    "Ibaji", "Idah", "Igalamela-Odolu", "Ijumu", "Kabba/Bunu", 
-    "Kogi", "Lokoja", "Mopa-Muro", "Ofu", "Ogori/Magongo", 
-    "Okehi", "Okene", "Olamaboro", "Omala", "Yagba East", "Yagba West"
-]
+# LGAs, tags and file names come from the region config (regions/kogi.json)
+region = lga_reference.REGION
 
-all_settlements = []
+args = scrape_engine.parse_engine_args("Scrape every settlement in the Kogi LGAs from OpenStreetMap.")
+scrape_engine.configure(args)
+# Per-LGA timings, bytes, cache hits and errors -> the run log and the report at the end
+run_metrics.start(region.run_log_file, region.name, args.profile)
 
 print("--- STARTING SMART VILLAGE SCRAPE (FIXED NAMES) ---")
 
-def estimate_pop(place_type):
-    p_type = str(place_type).lower()
-    if 'city' in p_type: return "High (100k+)"
-    if 'town' in p_type: return "High (20k-50k)"
-    if 'village' in p_type: return "Medium (2k-10k)"
-    if 'hamlet' in p_type: return "Low (<1k)"
-    return "Unknown"
-
-# Helper to find ANY valid name in the row
-def get_best_name(row, lga, lat):
-    # List of columns where names might hide
-    name_cols = ['name', 'name:en', 'alt_name', 'int_name', 'loc_name']
-    
-    for col in name_cols:
-        if col in row and pd.notna(row[col]) and str(row[col]).strip() != "":
-            return row[col]
-            
-    # If still no name, generate a Unique ID so you can find it later
-    return f"Unmapped Cluster ({lga} - {str(lat)[:6]})"
-
-for lga in lgas:
-    query = f"{lga}, Kogi State, Nigeria"
-    print(f"Scanning {query}...")
-    
-    try:
-        tags = {"place": ["village", "town", "hamlet", "suburb"]}
-        gdf = ox.features_from_place(query, tags)
-        
-        if not gdf.empty:
-            gdf = gdf.reset_index()
-            
-            for _, row in gdf.iterrows():
-                # Get Coordinates first
-                lat = row.geometry.centroid.y
-                lon = row.geometry.centroid.x
-                
-                # 1. USE THE NEW NAMING FUNCTION
-                name = get_best_name(row, lga, lat)
-                
-                # Get Type & Pop
-                place_type = row['place'] if 'place' in row else "village"
-                
-                real_pop = row['population'] if 'population' in row and pd.notna(row['population']) else None
-                if real_pop:
-                    pop_display = f"Confirmed: {int(real_pop)}"
-                    priority = 1 if int(real_pop) > 5000 else 2
-                else:
-                    pop_display = estimate_pop(place_type)
-                    priority = 1 if "High" in pop_display else (2 if "Medium" in pop_display else 3)
-                
-                # If it's an "Unmapped Cluster", it might actually be a GOLDMINE (hidden market)
-                # So we keep the priority high enough to check.
-                if "Unmapped" in name:
-                    priority = 2 
-
-                all_settlements.append({
-                    "Name": name,
-                    "Type": place_type,
-                    "LGA": lga,
-                    "Population_Info": pop_display,
-                    "Priority_Tier": priority,
-                    "Latitude": lat,
-                    "Longitude": lon
-                })
-            print(f"  -> Found {len(gdf)} settlements in {lga}")
-        else:
-            print(f"  -> No data found for {lga}")
-
-    except Exception as e:
-        print(f"  -> Error scanning {lga}: {e}")
-    
-    time.sleep(1)
-
-# Save
-if all_settlements:
-    df = pd.DataFrame(all_settlements)
-    filename = "kogi_villages_smart.csv"
-    df.to_csv(filename, index=False)
-    print(f"\nSUCCESS! Scraped {len(df)} locations.")
-    print(f"Data saved to {filename}")
+if args.incremental:
+    # Only what changed since the last run, patched into the CSVs by OSM_ID
+    with run_metrics.span("villages"):
+        osm_delta.run_incremental("villages", region.villages_file, region.settlement_tags,
+                                  feature_rows.settlement_rows, region.lgas)
 else:
-    print("\nFAILED. No data collected.")
\ No newline at end of file
+    # The villages stage of pipeline.py (per-LGA, --workers in parallel, or --single-pass)
+    pipeline.scrape_villages(region, args.workers, args.single_pass, args.fail_fast)
+
+scrape_engine.finish()
+print(run_metrics.finish())
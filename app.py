@@ -2,8 +2,19 @@ import streamlit as st
 import pandas as pd
 import folium
 from streamlit_folium import st_folium
-from folium.plugins import MarkerCluster, Fullscreen, MousePosition, HeatMap, MiniMap, MeasureControl
 import altair as alt
+import streamlit.components.v1 as components
+
+import dashboard_views
+import field_coverage
+import hex_grid
+import map_layers
+import master_leads
+import region_config
+import route_planner
+import spatial_index
+import travel_times
+import view_cache
 
 # 1. ENTERPRISE PAGE CONFIG
 st.set_page_config(
@@ -14,65 +25,60 @@ st.set_page_config(
 )
 
 # ------------------------------------------------------
-# 2. OFFICIAL KOGI STATE POPULATION DATA & VIABILITY TIERS
+# 2. REGION: OFFICIAL POPULATION DATA & VIABILITY TIERS (regions/<name>.json, see region_config.py)
 # ------------------------------------------------------
-LGA_DATA = {
-    "Okene": {"pop": 420000, "tier": "Tier 1: Critical Mass", "desc": "Commercial Hub"},
-    "Dekina": {"pop": 360000, "tier": "Tier 1: Critical Mass", "desc": "Agrarian Giant"},
-    "Ankpa": {"pop": 350000, "tier": "Tier 1: Critical Mass", "desc": "Trade & Coal"},
-    "Lokoja": {"pop": 305000, "tier": "Tier 1: Critical Mass", "desc": "State Capital"},
-    "Adavi": {"pop": 298000, "tier": "Tier 1: Critical Mass", "desc": "Industrial Hub"},
-    "Okehi": {"pop": 280000, "tier": "Tier 2: Growth Engine", "desc": "Semi-Urban"},
-    "Ofu": {"pop": 245000, "tier": "Tier 2: Growth Engine", "desc": "Connector Hub"},
-    "Olamaboro": {"pop": 215000, "tier": "Tier 2: Growth Engine", "desc": "Border Trade"},
-    "Igalamela-Odolu": {"pop": 205000, "tier": "Tier 2: Growth Engine", "desc": "Farming Cluster"},
-    "Bassa": {"pop": 195000, "tier": "Tier 2: Growth Engine", "desc": "Remote Agrarian"},
-    "Yagba East": {"pop": 195000, "tier": "Tier 2: Growth Engine", "desc": "Okun Hub"},
-    "Kabba/Bunu": {"pop": 190000, "tier": "Tier 2: Growth Engine", "desc": "Education/Admin"},
-    "Yagba West": {"pop": 185000, "tier": "Tier 3: Niche Market", "desc": "Border/Trade"},
-    "Ibaji": {"pop": 168000, "tier": "Tier 3: Niche Market", "desc": "Riverine/Rice"},
-    "Ajaokuta": {"pop": 165000, "tier": "Tier 3: Niche Market", "desc": "Industrial Zone"},
-    "Omala": {"pop": 158000, "tier": "Tier 3: Niche Market", "desc": "Agrarian"},
-    "Ijumu": {"pop": 155000, "tier": "Tier 3: Niche Market", "desc": "Remittance Hub"},
-    "Kogi": {"pop": 152000, "tier": "Tier 3: Niche Market", "desc": "Fishing/River"},
-    "Idah": {"pop": 105000, "tier": "Tier 3: Niche Market", "desc": "Cultural/Inst."},
-    "Mopa-Muro": {"pop": 65000, "tier": "Tier 3: Niche Market", "desc": "Community"},
-    "Ogori/Magongo": {"pop": 55000, "tier": "Tier 3: Niche Market", "desc": "Small Community"}
-}
+st.sidebar.image("https://upload.wikimedia.org/wikipedia/commons/thumb/c/c8/Sterling_Bank_Logo.svg/2560px-Sterling_Bank_Logo.svg.png", width=160)
+st.sidebar.markdown("## 🛰️ Mission Controls")
+
+region_names = region_config.available_regions()
+region_name = st.sidebar.selectbox("🌍 Region:", region_names) if len(region_names) > 1 else region_config.DEFAULT_REGION
+region = region_config.load_region(region_name)
+LGA_DATA = region.lga_data
 
 # 3. DATA LOADING
 @st.cache_data
-def load_data():
+def load_data(data_version, region_name):
+    # data_version (file mtimes/sizes) makes a fresh merge invalidate this cache
+    region = region_config.load_region(region_name)
     try:
-        df = pd.read_csv("kogi_master_leads.csv")
-        
-        # Scoring & Address
-        def get_score(pop_str):
-            p = str(pop_str).lower()
-            if "high" in p: return 100
-            if "medium" in p: return 50
-            if "low" in p: return 10
-            return 5
-        df['Market_Score'] = df['Tentative_Population'].apply(get_score)
-        df['Full_Address'] = df['Name'] + ", " + df['LGA'] + " LGA, Kogi State"
-        
-        # Merge Actual LGA Data
-        df['LGA_Actual_Pop'] = df['LGA'].map(lambda x: LGA_DATA.get(x, {}).get('pop', 0))
-        df['Viability_Tier'] = df['LGA'].map(lambda x: LGA_DATA.get(x, {}).get('tier', 'Unknown'))
-        df['LGA_Desc'] = df['LGA'].map(lambda x: LGA_DATA.get(x, {}).get('desc', ''))
-        
-        # Simplified Chart Type
-        df['Chart_Type'] = df['Category'].apply(lambda x: 'Village/Settlement' if x == 'Settlement' else 'Commercial/Inst.')
-        
-        return df
+        # Scores, addresses, LGA data and chart types are precomputed by the merge stage (pipeline.py)
+        df = master_leads.load_master(region.master_file, region.master_parquet)
     except FileNotFoundError:
         return pd.DataFrame()
+    # Road minutes to the nearest branch, looked up in the matrix built by travel_times.py
+    return travel_times.add_branch_minutes(df, get_travel_times(data_version, region_name))
 
-df = load_data()
+
+@st.cache_resource(max_entries=1)
+def get_travel_times(data_version, region_name):
+    # Memory-mapped (branches x leads) minutes, or None before travel_times.py has run
+    region = region_config.load_region(region_name)
+    return travel_times.load(region.matrix_file, region.index_file)
+
+
+@st.cache_resource(max_entries=1)
+def get_coverage(data_version, region_name):
+    # Visit log and coverage aggregates (field_coverage.py); the lead list follows the master file
+    region = region_config.load_region(region_name)
+    store = field_coverage.CoverageStore(region.coverage_file)
+    leads = load_data(data_version, region_name)
+    if not leads.empty:
+        store.sync_leads(leads)
+    return store
+
+
+@st.cache_resource(max_entries=1)
+def get_view_cache(data_version):
+    # One memo shared by all sessions, replaced whenever the master file changes
+    return view_cache.ViewCache()
+
+# File names carry the region prefix, so each region gets its own cache entries
+data_version = (master_leads.data_version(region.master_file, region.master_parquet)
+                + travel_times.data_version(region.matrix_file, region.index_file))
+df = load_data(data_version, region_name)
+views = get_view_cache(data_version)
 
 # 4. SIDEBAR CONTROLS
-st.sidebar.image("https://upload.wikimedia.org/wikipedia/commons/thumb/c/c8/Sterling_Bank_Logo.svg/2560px-Sterling_Bank_Logo.svg.png", width=160)
-st.sidebar.markdown("## 🛰️ Mission Controls")
 
 available_lgas = sorted(df['LGA'].unique()) if not df.empty else []
 selected_lgas = st.sidebar.multiselect(
@@ -85,18 +91,33 @@ selected_lgas = st.sidebar.multiselect(
 available_cats = sorted(df['Category'].unique()) if not df.empty else []
 selected_cats = st.sidebar.multiselect("🏢 Facility Types:", available_cats, default=available_cats)
 priority = st.sidebar.slider("🔥 Priority Tier", 1, 3, (1, 3))
+client_limit = st.sidebar.number_input(
+    "🗺️ Max individual markers", min_value=100, value=map_layers.DEFAULT_CLIENT_LIMIT, step=500,
+    help="Above this many targets the map switches to server-side clusters."
+)
+
+st.sidebar.markdown("## 📡 Proximity Search")
+branch = st.sidebar.selectbox("🏦 Start Branch:", list(region.branches))
+search_mode = st.sidebar.radio("Search:", ["Within radius", "Nearest N"], horizontal=True)
+if search_mode == "Within radius":
+    radius_km = st.sidebar.slider("📏 Radius (km)", 1, 150, 15)
+else:
+    nearest_n = st.sidebar.number_input("🔢 Nearest targets", min_value=1, value=50, step=10)
+
+st.sidebar.markdown("## 🚗 Route Planner")
+route_stops = st.sidebar.number_input("🎯 Targets to consider", min_value=1, value=route_planner.DEFAULT_MAX_STOPS, step=10,
+                                      help="The nearest targets to the start branch; the day keeps as many as fit.")
+day_hours = st.sidebar.slider("⏱️ Field day (hours)", 1, 14, route_planner.DEFAULT_DAY_HOURS)
+service_min = st.sidebar.slider("🤝 Minutes per visit", 5, 90, route_planner.DEFAULT_SERVICE_MIN, step=5)
+route_per_lga = st.sidebar.checkbox("Finish one LGA before the next", value=False)
 
-# 5. FILTERING
+# 5. FILTERING (memoized on the normalized filter, see view_cache.py; the views are in dashboard_views.py)
 if not df.empty:
-    filtered_df = df[
-        (df['Category'].isin(selected_cats)) &
-        (df['Priority_Tier'].between(priority[0], priority[1]))
-    ]
-    if selected_lgas:
-        filtered_df = filtered_df[filtered_df['LGA'].isin(selected_lgas)]
+    view_key = view_cache.filter_key(selected_lgas, selected_cats, priority)
+    filtered_df = views.get("filtered", view_key, lambda: dashboard_views.filter_leads(df, selected_lgas, selected_cats, priority))
 
     # 6. TABS
-    tab1, tab2, tab3 = st.tabs(["🗺️ COMMAND MAP", "📊 STRATEGIC INTELLIGENCE", "📋 TARGET GRID"])
+    tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(["🗺️ COMMAND MAP", "📊 STRATEGIC INTELLIGENCE", "📋 TARGET GRID", "📡 PROXIMITY", "🚗 ROUTE", "✅ COVERAGE"])
 
     # ==========================================
     # TAB 1: THE ULTIMATE MAP
@@ -106,7 +127,7 @@ if not df.empty:
         with c1:
             st.markdown(f"### 📍 Operational View ({len(filtered_df)} Targets)")
         with c2:
-            total_selected_pop = filtered_df.drop_duplicates('LGA')['LGA_Actual_Pop'].sum()
+            total_selected_pop = views.get("tam", view_key, lambda: filtered_df.drop_duplicates('LGA')['LGA_Actual_Pop'].sum())
             st.metric("Total Addressable Market (TAM)", f"{int(total_selected_pop):,}")
 
         if not filtered_df.empty:
@@ -114,87 +135,35 @@ if not df.empty:
             center_lon = filtered_df['Longitude'].mean()
             zoom = 12 if len(selected_lgas) == 1 else 9
 
-            m = folium.Map(location=[center_lat, center_lon], zoom_start=zoom, control_scale=True)
-
-            folium.TileLayer('CartoDB positron', name="Light Map (Clean)").add_to(m)
-            folium.TileLayer('CartoDB dark_matter', name="Dark Map (High Contrast)").add_to(m)
-            folium.TileLayer('OpenStreetMap', name="Street Map (Detailed)").add_to(m)
-            folium.TileLayer(
-                tiles='https://server.arcgisonline.com/ArcGIS/rest/services/World_Imagery/MapServer/tile/{z}/{y}/{x}',
-                attr='Esri',
-                name='Satellite Imagery',
-                overlay=False
-            ).add_to(m)
-
-            heat_data = filtered_df[['Latitude', 'Longitude']].values.tolist()
-            HeatMap(heat_data, name="Density Heatmap", radius=15, blur=10, show=False).add_to(m)
-
-            marker_cluster = MarkerCluster(name="Target Clusters").add_to(m)
-
-            for _, row in filtered_df.iterrows():
-                if "Market" in str(row['Type']) or "Shop" in str(row['Type']):
-                    color, icon_name = "red", "shopping-cart"
-                elif "School" in str(row['Type']) or "College" in str(row['Type']):
-                    color, icon_name = "green", "book"
-                elif "Relig" in str(row['Category']):
-                    color, icon_name = "purple", "bell"
-                elif row['Category'] == "Settlement":
-                    color, icon_name = "blue", "home"
-                elif "Bank" in str(row['Type']) or "Finance" in str(row['Type']):
-                     color, icon_name = "darkblue", "briefcase"
-                else:
-                    color, icon_name = "gray", "info-sign"
-
-                popup_html = f"""
-                <div style='font-family: "Segoe UI", sans-serif; width: 250px; border-radius: 8px; overflow: hidden; box-shadow: 0 2px 5px rgba(0,0,0,0.3);'>
-                    <div style="background-color: {color}; color: white; padding: 10px; font-weight: bold; font-size: 14px;">
-                        <i class="fa fa-{icon_name}"></i> {row['Name']}
-                    </div>
-                    <div style="padding: 15px; background-color: #fff; color: #333;">
-                        <p style="margin: 5px 0; font-size: 13px;"><b>📍 LGA:</b> {row['LGA']} ({row.get('Viability_Tier', 'N/A')})</p>
-                        <p style="margin: 5px 0; font-size: 13px;"><b>🏢 Type:</b> {row['Type']}</p>
-                        <p style="margin: 5px 0; font-size: 13px;"><b>👥 Estimate:</b> {row['Tentative_Population']}</p>
-                        <hr style="margin: 10px 0; border: 0; border-top: 1px solid #eee;">
-                        <a href="{row['Navigation_Link']}" target="_blank" style="text-decoration:none;">
-                            <button style='width:100%; background-color:{color}; color:white; border:none; padding: 10px; border-radius: 4px; cursor:pointer; font-weight: bold; font-size: 13px; transition: background-color 0.3s;'>
-                            <i class="fa fa-location-arrow"></i> NAVIGATE HERE
-                            </button>
-                        </a>
-                    </div>
-                </div>
-                """
-                folium.Marker(
-                    [row['Latitude'], row['Longitude']],
-                    popup=folium.Popup(popup_html, max_width=300),
-                    tooltip=f"{row['Name']} | {row['Type']}",
-                    icon=folium.Icon(color=color, icon=icon_name, prefix='fa')
-                ).add_to(marker_cluster)
-
-            Fullscreen(position='topright').add_to(m)
-            MousePosition(position='bottomleft').add_to(m)
-            MeasureControl(position='topleft', primary_length_unit='kilometers').add_to(m)
-            MiniMap(toggle_display=True, position='bottomright').add_to(m)
-            folium.LayerControl(collapsed=False).add_to(m)
-
-            legend_html = """
-             <div style="position: fixed; 
-                         bottom: 50px; left: 50px; width: 180px; height: auto; 
-                         border:1px solid #ccc; z-index:9999; font-size:13px;
-                         background-color:rgba(255, 255, 255, 0.95); padding: 10px;
-                         color: black !important;
-                         border-radius: 8px; box-shadow: 0 2px 5px rgba(0,0,0,0.2);">
-                 <b style="color:black;">🎯 Target Legend</b><br>
-                 <div style="margin-top:5px; color:black;"><i class="fa fa-shopping-cart" style="color:red"></i> Markets/Comm.</div>
-                 <div style="color:black;"><i class="fa fa-book" style="color:green"></i> Education</div>
-                 <div style="color:black;"><i class="fa fa-bell" style="color:purple"></i> Religious</div>
-                 <div style="color:black;"><i class="fa fa-home" style="color:blue"></i> Settlements</div>
-                 <div style="color:black;"><i class="fa fa-briefcase" style="color:darkblue"></i> Financial</div>
-                 <div style="color:black;"><i class="fa fa-info-sign" style="color:gray"></i> Other</div>
-              </div>
-             """
-            m.get_root().html.add_child(folium.Element(legend_html))
-
-            st_folium(m, width="100%", height=750)
+            # Last viewport reported by the map, kept while the filter stays the same
+            view = st.session_state.get("map_view", {})
+            if view.get("filter") != view_key:
+                view = {}
+            if view:
+                (south, west), (north, east) = view["bounds"]
+                center_lat, center_lon, zoom = (south + north) / 2, (west + east) / 2, view["zoom"]
+
+            # Hex cells at the resolution for this zoom, aggregated once per filter (hex_grid.py)
+            hex_resolution = hex_grid.resolution_for_zoom(zoom)
+            hex_cells = views.get("hex", (view_key, hex_resolution), lambda: hex_grid.aggregate(filtered_df, hex_resolution))
+
+            # The map page is memoized per filter / marker limit (and viewport when clustering)
+            map_key = (view_key, client_limit, view.get("zoom"), view.get("bounds"))
+            m, render_mode, map_html = views.get("map", map_key, lambda: dashboard_views.build_map(
+                filtered_df, center_lat, center_lon, zoom, client_limit, view.get("bounds"), (hex_resolution, hex_cells)
+            ))
+
+            if render_mode == "server":
+                # Pre-clustered mode follows the viewport: pan/zoom re-clusters for what is on screen
+                st.caption(f"{len(filtered_df):,} targets: showing server-side clusters, zoom in for individual markers.")
+                map_state = st_folium(m, width="100%", height=750, returned_objects=["zoom", "bounds"])
+                new_view = map_layers.viewport(map_state)
+                if new_view and map_layers.viewport_moved(view, new_view):
+                    st.session_state["map_view"] = dict(new_view, filter=view_key)
+                    st.rerun()
+            else:
+                # Everything is in the page already, so map interactions need no rerun
+                components.html(map_html, height=750)
         else:
             st.warning("No targets found.")
 
@@ -204,12 +173,7 @@ if not df.empty:
     with tab2:
         st.markdown("### 📊 Market Viability Matrix")
         
-        viability_summary = filtered_df.groupby('LGA').agg(
-            Tier=('Viability_Tier', 'max'),
-            Description=('LGA_Desc', 'max'),
-            Actual_Population=('LGA_Actual_Pop', 'max'),
-            Captured_Targets=('Name', 'count')
-        ).reset_index().sort_values('Actual_Population', ascending=False)
+        viability_summary = views.get("viability", view_key, lambda: dashboard_views.viability_matrix(filtered_df))
 
         st.dataframe(
             viability_summary,
@@ -223,13 +187,36 @@ if not df.empty:
         
         st.divider()
 
+        st.markdown("### 🔥 Hot Cells (Hex-Grid Market Potential)")
+        hex_sizes = {f"{edge:g} km": resolution for resolution, edge in enumerate(hex_grid.RESOLUTIONS)}
+        hex_size = st.select_slider("Hex size (edge)", options=list(hex_sizes), value=list(hex_sizes)[1])
+        hot_resolution = hex_sizes[hex_size]
+        hot_cells = views.get("hex", (view_key, hot_resolution), lambda: hex_grid.aggregate(filtered_df, hot_resolution))
+        hot_table = hot_cells.head(20).assign(
+            Navigation_Link=lambda cells: master_leads.navigation_links(cells['Latitude'].round(6), cells['Longitude'].round(6))
+        )
+        st.caption(f"{len(filtered_df):,} targets in {len(hot_cells):,} cells of {hex_size}.")
+        st.dataframe(
+            hot_table[['Top_LGA', 'Leads', 'Settlements', 'Commercial', 'Tier1', 'Score_Sum', 'Pop_Share', 'Potential', 'Navigation_Link']],
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "Potential": st.column_config.ProgressColumn("Potential", format="%.1f", min_value=0, max_value=100),
+                "Navigation_Link": st.column_config.LinkColumn("Map"),
+            }
+        )
+
+        st.divider()
+
         st.markdown("### 🔬 Micro-Territory Analysis (Deep Dive)")
         
         if not selected_lgas:
             st.info("👈 Select LGAs in the sidebar to see detailed village breakdowns.")
         else:
             for lga_name in selected_lgas:
-                lga_df = filtered_df[filtered_df['LGA'] == lga_name]
+                lga_df, top_sector, settlements, commercial = views.get(
+                    "deep_dive", (view_key, lga_name), lambda: dashboard_views.lga_deep_dive(filtered_df, lga_name)
+                )
                 if lga_df.empty: continue
                 
                 with st.expander(f"📍 {lga_name} Deep Dive ({len(lga_df)} Targets Found)", expanded=True):
@@ -239,33 +226,178 @@ if not df.empty:
                     
                     m1.metric("Official Population", f"{lga_pop:,}", delta=tier)
                     m2.metric("Scraped Targets", len(lga_df))
-                    m3.metric("Most Common Sector", lga_df['Type'].mode()[0] if not lga_df.empty else "N/A")
+                    m3.metric("Most Common Sector", top_sector)
                     
                     st.divider()
                     
                     col_a, col_b = st.columns(2)
                     with col_a:
                         st.markdown("#### 🏘️ Top Settlements (By Density)")
-                        settlements = lga_df[lga_df['Category'] == 'Settlement'].sort_values('Market_Score', ascending=False).head(10)
-                        st.dataframe(settlements[['Name', 'Tentative_Population', 'Navigation_Link']], hide_index=True, use_container_width=True, column_config={"Navigation_Link": st.column_config.LinkColumn("Map")})
+                        st.dataframe(settlements, hide_index=True, use_container_width=True, column_config={"Navigation_Link": st.column_config.LinkColumn("Map")})
                         
                     with col_b:
                         st.markdown("#### 💰 Top Commercial Hubs (By Traffic)")
-                        commercial = lga_df[lga_df['Category'] != 'Settlement'].sort_values('Market_Score', ascending=False).head(10)
-                        st.dataframe(commercial[['Name', 'Type', 'Tentative_Population', 'Navigation_Link']], hide_index=True, use_container_width=True, column_config={"Navigation_Link": st.column_config.LinkColumn("Map")})
+                        st.dataframe(commercial, hide_index=True, use_container_width=True, column_config={"Navigation_Link": st.column_config.LinkColumn("Map")})
 
     # ==========================================
     # TAB 3: DATA GRID
     # ==========================================
     with tab3:
         st.subheader("📋 Raw Data Explorer")
-        st.dataframe(filtered_df[['Name', 'LGA', 'Viability_Tier', 'Type', 'Tentative_Population']], use_container_width=True)
-        csv = filtered_df.to_csv(index=False).encode('utf-8')
-        st.download_button("📥 Download Report", csv, "Kogi_Report.csv", "text/csv")
+        grid_cols = ['Name', 'LGA', 'Viability_Tier', 'Type', 'Tentative_Population']
+        if 'Population_Estimate' in filtered_df.columns:
+            grid_cols.append('Population_Estimate')
+        if 'Branch_Drive_Min' in filtered_df.columns:
+            grid_cols += ['Nearest_Branch', 'Branch_Drive_Min']
+        st.dataframe(filtered_df[grid_cols], use_container_width=True)
+        csv = views.get("export", view_key, lambda: filtered_df.to_csv(index=False).encode('utf-8'))
+        st.download_button("📥 Download Report", csv, f"{region.name.title()}_Report.csv", "text/csv")
+
+    # ==========================================
+    # TAB 4: PROXIMITY SEARCH (spatial_index.py)
+    # ==========================================
+    with tab4:
+        branch_lat, branch_lon = region.branches[branch]
+        lead_index = views.get("spatial_index", view_key, lambda: spatial_index.LeadIndex(filtered_df))
+        if search_mode == "Within radius":
+            st.markdown(f"### 📡 Targets within {radius_km} km of {branch} branch")
+            nearby = lead_index.within_radius(branch_lat, branch_lon, radius_km)
+        else:
+            st.markdown(f"### 📡 {nearest_n} nearest targets to {branch} branch")
+            nearby = lead_index.nearest(branch_lat, branch_lon, int(nearest_n))
+
+        proximity_cols = ['Name', 'Category', 'Type', 'LGA', 'Priority_Tier', 'Distance_km', 'Navigation_Link']
+        road_times = get_travel_times(data_version, region_name)
+        if road_times is not None:
+            # Precomputed road minutes (travel_times.py): no graph search here
+            nearby = nearby.assign(Drive_Min=road_times.minutes_from(nearby, branch).round(1))
+            proximity_cols.insert(-1, 'Drive_Min')
+
+        p1, p2, p3 = st.columns(3)
+        p1.metric("Targets Found", len(nearby))
+        p2.metric("Tier 1 Targets", int((nearby['Priority_Tier'] == 1).sum()))
+        p3.metric("Furthest (km)", f"{nearby['Distance_km'].max():.1f}" if not nearby.empty else "-")
+        st.dataframe(
+            nearby[proximity_cols],
+            hide_index=True, use_container_width=True,
+            column_config={"Navigation_Link": st.column_config.LinkColumn("Map")}
+        )
+
+    # ==========================================
+    # TAB 5: DAILY FIELD ROUTE (route_planner.py)
+    # ==========================================
+    with tab5:
+        branch_start = region.branches[branch]
+        route_key = (view_key, branch, int(route_stops), day_hours, service_min, route_per_lga)
+        route, route_summary = views.get("route", route_key, lambda: route_planner.plan_route(
+            filtered_df, branch_start, max_stops=int(route_stops), day_hours=day_hours,
+            service_min=service_min, per_lga=route_per_lga
+        ))
+        st.markdown(f"### 🚗 Day plan from {branch} branch ({route_summary['stops']} stops)")
+
+        r1, r2, r3, r4 = st.columns(4)
+        r1.metric("Stops", route_summary['stops'], delta=f"-{route_summary['left_out']} left out" if route_summary['left_out'] else None)
+        r2.metric("Road Distance (km)", f"{route_summary['distance_km']:.1f}")
+        r3.metric("Driving (h)", f"{route_summary['drive_min'] / 60:.1f}")
+        r4.metric("Total Day (h)", f"{route_summary['total_min'] / 60:.1f}")
+
+        if route.empty:
+            st.warning("No targets fit in the day from this branch.")
+        else:
+            for leg, link in enumerate(route_planner.directions_links(branch_start, route), start=1):
+                st.markdown(f"🧭 [Open leg {leg} in Google Maps]({link})")
+
+            def build_route_map():
+                rm = folium.Map(location=list(branch_start), zoom_start=10, control_scale=True, tiles='CartoDB positron')
+                map_layers.add_route_layer(rm, branch_start, route)
+                lats = [branch_start[0], *route['Latitude'].astype(float)]
+                lons = [branch_start[1], *route['Longitude'].astype(float)]
+                rm.fit_bounds([[min(lats), min(lons)], [max(lats), max(lons)]])
+                return rm.get_root().render()
+
+            components.html(views.get("route_map", route_key, build_route_map), height=550)
+            st.dataframe(
+                route[['Stop', 'Name', 'Type', 'LGA', 'Leg_km', 'Arrival_Min', 'Navigation_Link']],
+                hide_index=True, use_container_width=True,
+                column_config={"Navigation_Link": st.column_config.LinkColumn("Map")}
+            )
+
+    # ==========================================
+    # TAB 6: FIELD COVERAGE (field_coverage.py)
+    # ==========================================
+    with tab6:
+        coverage = get_coverage(data_version, region_name)
+
+        with st.expander("📝 Log a visit"):
+            with st.form("log_visit", clear_on_submit=True):
+                visit_leads = filtered_df.drop_duplicates(master_leads.ID_COLUMN)
+                lead_names = dict(zip(visit_leads[master_leads.ID_COLUMN], visit_leads['Name'].astype(str) + " (" + visit_leads['LGA'].astype(str) + ")"))
+                visit_lead = st.selectbox("Target", list(lead_names), format_func=lead_names.get)
+                visit_officer = st.text_input("Officer")
+                visit_outcome = st.selectbox("Outcome", field_coverage.OUTCOMES)
+                visit_notes = st.text_input("Notes")
+                if st.form_submit_button("Log visit"):
+                    if visit_lead is None or not visit_officer.strip():
+                        st.error("Pick a target and enter the officer's name.")
+                    elif coverage.log_visit(visit_lead, visit_officer.strip(), visit_outcome, notes=visit_notes or None):
+                        st.success(f"Logged: {lead_names[visit_lead]}, {visit_outcome}.")
+                    else:
+                        st.info("That visit was already logged.")
+
+        with st.expander("📤 Import field visits (CSV)"):
+            st.caption("Columns: OSM_ID, Officer, Visited_At, and optionally Outcome (" + ", ".join(field_coverage.OUTCOMES) + ") and Notes.")
+            visit_file = st.file_uploader("Field visits", type="csv")
+            if visit_file is not None and st.button("Import visits"):
+                try:
+                    added, duplicates, rejected = coverage.import_csv(visit_file, source=f"upload:{visit_file.name}")
+                except ValueError as e:
+                    st.error(str(e))
+                else:
+                    st.success(f"{added:,} visits added, {duplicates:,} already logged, {len(rejected):,} rejected.")
+                    if len(rejected):
+                        st.dataframe(rejected, hide_index=True, use_container_width=True)
+
+        # Aggregates are kept up to date as visits come in, so this reads a few small tables
+        totals = coverage.totals(selected_lgas)
+        st.markdown(f"### ✅ Field Coverage ({', '.join(selected_lgas) if selected_lgas else 'all LGAs'})")
+        st.caption("Coverage counts every target of the selected LGAs, whatever the facility and tier filters.")
+        v1, v2, v3, v4 = st.columns(4)
+        v1.metric("Targets", f"{totals['leads']:,}")
+        v2.metric("Visited", f"{totals['visited']:,}", delta=f"{100 * totals['visited'] / max(totals['leads'], 1):.1f}%")
+        v3.metric("Converted", f"{totals['converted']:,}")
+        v4.metric("Pending", f"{totals['pending']:,}")
+
+        coverage_pct = st.column_config.ProgressColumn("Coverage", format="%.1f%%", min_value=0, max_value=100)
+        st.dataframe(coverage.by_lga(selected_lgas), hide_index=True, use_container_width=True,
+                     column_config={"Coverage_Pct": coverage_pct})
+
+        st.markdown("#### 🧭 Cells with the most pending targets")
+        pending_cells = coverage.by_cell(selected_lgas).head(20).assign(
+            Navigation_Link=lambda cells: master_leads.navigation_links(cells['Latitude'], cells['Longitude'])
+        )
+        st.dataframe(
+            pending_cells[['Top_LGA', 'Leads', 'Visited', 'Converted', 'Pending', 'Coverage_Pct', 'Navigation_Link']],
+            hide_index=True, use_container_width=True,
+            column_config={"Coverage_Pct": coverage_pct, "Navigation_Link": st.column_config.LinkColumn("Map")}
+        )
+
+        c_officers, c_recent = st.columns(2)
+        with c_officers:
+            st.markdown("#### 👥 Officers")
+            st.dataframe(coverage.by_officer(), hide_index=True, use_container_width=True)
+        with c_recent:
+            st.markdown("#### 🕑 Latest visits")
+            st.dataframe(coverage.recent_visits(20), hide_index=True, use_container_width=True)
 
 else:
     st.warning("⚠️ No data loaded.")
 
+# --- CACHE DEBUG PANEL ---
+with st.sidebar.expander("🐞 View cache"):
+    st.dataframe(pd.DataFrame(views.report()), hide_index=True, use_container_width=True)
+    if st.button("Clear view cache"):
+        views.clear()
+
 # --- FOOTER (Added per request) ---
 st.markdown("---")
 st.caption("Created by Philip Osita | State Cluster Manager | Sterling Bank Plc")
\ No newline at end of file
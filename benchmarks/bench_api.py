@@ -0,0 +1,153 @@
+"""
+Load test for leads_api.py: latency and throughput with many concurrent field clients.
+
+Each client is a thread with one keep-alive connection that loops over a mix
+of requests until the time is up:
+
+    page      /leads?lga=<random LGA>&page=<random page>     (gzip)
+    geojson   /leads?format=geojson&category=<random>        (gzip)
+    revisit   a page it already has, with If-None-Match      (expects 304)
+    bundle    /bundle/<random LGA>                           (gzip)
+
+and the script prints requests/s and p50/p95/p99 latency per kind, status
+codes and bytes on the wire. Without --url it starts leads_api.py on a free
+local port for the run. For hundreds of clients against the VPS, run it from
+another machine: in one process the Python clients share one core and
+become the bottleneck themselves.
+
+Usage:
+    python benchmarks/bench_api.py --clients 200 --duration 30
+    python benchmarks/bench_api.py --url http://vps.example:8080 --clients 300
+"""
+import argparse
+import http.client
+import json
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from urllib.parse import quote, urlsplit
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+
+MIX = {"page": 0.5, "geojson": 0.1, "revisit": 0.3, "bundle": 0.1}
+CATEGORIES = ["Settlement", "Education", "Religious", "Business", "Hospitality"]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(port, region):
+    server = subprocess.Popen([sys.executable, str(ROOT / "leads_api.py"), "--port", str(port), "--region", region],
+                              cwd=ROOT, stdout=subprocess.DEVNULL)
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            conn.request("GET", "/health")
+            if conn.getresponse().status == 200:
+                return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    sys.exit("leads_api.py did not come up")
+
+
+def client(host, port, lgas, deadline, seed, results):
+    rng = random.Random(seed)
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    seen = {}  # path -> ETag
+    while time.time() < deadline:
+        kind = rng.choices(list(MIX), weights=list(MIX.values()))[0]
+        headers = {"Accept-Encoding": "gzip"}
+        if kind == "revisit" and seen:
+            path = rng.choice(list(seen))
+            headers["If-None-Match"] = seen[path]
+        elif kind == "bundle":
+            path = f"/bundle/{quote(rng.choice(lgas))}"
+        elif kind == "geojson":
+            path = f"/leads?format=geojson&category={rng.choice(CATEGORIES)}&per_page=200"
+        else:
+            kind = "page"
+            path = f"/leads?lga={quote(rng.choice(lgas))}&page={rng.randint(1, 3)}&per_page=50"
+        start = time.perf_counter()
+        try:
+            conn.request("GET", path, headers=headers)
+            response = conn.getresponse()
+            body = response.read()
+        except OSError as e:
+            results.append((kind, time.perf_counter() - start, type(e).__name__, 0))
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=30)
+            continue
+        results.append((kind, time.perf_counter() - start, response.status, len(body)))
+        if response.status == 200 and response.getheader("ETag"):
+            seen[path] = response.getheader("ETag")
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the leads API.")
+    parser.add_argument("--url", default=None, help="API to test (default: start leads_api.py locally).")
+    parser.add_argument("--region", default="kogi", help="Region to serve when starting the API locally.")
+    parser.add_argument("--clients", type=int, default=100, help="Concurrent clients.")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds to run.")
+    args = parser.parse_args()
+
+    server = None
+    if args.url:
+        parts = urlsplit(args.url)
+        host, port = parts.hostname, parts.port or 80
+    else:
+        host, port = "127.0.0.1", free_port()
+        server = start_server(port, args.region)
+    try:
+        conn = http.client.HTTPConnection(host, port, timeout=30)
+        conn.request("GET", "/lgas")
+        lgas = [entry["lga"] for entry in json.loads(conn.getresponse().read())["lgas"]]
+        conn.close()
+
+        print(f"--- LOAD TEST ({args.clients} clients, {args.duration:g}s, http://{host}:{port}) ---")
+        results = []
+        deadline = time.time() + args.duration
+        threads = [threading.Thread(target=client, args=(host, port, lgas, deadline, seed, results))
+                   for seed in range(args.clients)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    by_kind = defaultdict(list)
+    statuses = defaultdict(int)
+    for kind, seconds, status, size in results:
+        by_kind[kind].append((seconds, size))
+        statuses[status] += 1
+    print(f"   {'kind':<9}{'requests':>10}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'avg kB':>9}")
+    for kind in MIX:
+        if not by_kind[kind]:
+            continue
+        seconds, sizes = (np.array(column) for column in zip(*by_kind[kind]))
+        p50, p95, p99 = np.percentile(seconds * 1000, [50, 95, 99])
+        print(f"   {kind:<9}{len(seconds):>10,}{len(seconds) / elapsed:>9,.0f}{p50:>9.1f}{p95:>9.1f}{p99:>9.1f}"
+              f"{sizes.mean() / 1024:>9.1f}")
+    print(f"   total: {len(results):,} requests, {len(results) / elapsed:,.0f} req/s, "
+          f"{sum(r[3] for r in results) / 2 ** 20:,.1f} MB | status {dict(sorted(statuses.items(), key=str))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+Micro-benchmark: feature -> row conversion, old iterrows loop vs feature_rows.
+
+Builds N synthetic features that look like the osmnx frames we get for Kogi
+(points and small polygons, sparse name columns, a few confirmed populations,
+commercial tag columns), checks both paths produce the same frame, and prints
+the timings.
+
+One difference is intended: feature_rows takes Type, Category and the
+settlement place from the feature's own tags, where the loop asked whether
+the frame had a `tourism`/`office`/`place`/... column at all. Rows where a
+tag column exists but is blank for the feature may therefore differ in the
+columns derived from those tags; they are counted as relabelled, and any
+other difference is a MISMATCH (exit status 1).
+
+Usage:
+    python benchmarks/bench_conversion.py --n 100000
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import feature_rows  # noqa: E402
+
+# Rough Kogi State bounding box
+LAT_RANGE = (6.5, 8.7)
+LON_RANGE = (5.4, 7.9)
+
+
+def synthetic_features(n, seed=42):
+    rng = np.random.default_rng(seed)
+    lat = rng.uniform(*LAT_RANGE, n)
+    lon = rng.uniform(*LON_RANGE, n)
+    geoms = shapely.points(lon, lat)
+    # Every 10th feature is a small square way instead of a node
+    ways = np.arange(n) % 10 == 0
+    geoms[ways] = shapely.buffer(geoms[ways], 0.001, cap_style="square")
+
+    def sparse(values, fill_rate):
+        col = rng.choice(values, n).astype(object)
+        col[rng.random(n) > fill_rate] = np.nan
+        return col
+
+    return gpd.GeoDataFrame({
+        "element": np.where(ways, "way", "node"),
+        "id": np.arange(n),
+        "name": sparse(["Ofokopi", "Chikoro", "Ejikulu", " ", "Okene Central Market"], 0.8),
+        "name:en": sparse(["Ofokopi", "Ejikulu"], 0.05),
+        "alt_name": sparse(["Chilaro", "Agajeju"], 0.2),
+        "place": sparse(["village", "town", "hamlet", "suburb", "city"], 0.95),
+        "population": sparse(["1200", "8000", "45000"], 0.01),
+        "amenity": sparse(["marketplace", "school", "place_of_worship", "bank", "fuel", "clinic"], 0.7),
+        "shop": sparse(["supermarket", "general", "wholesale"], 0.1),
+        "tourism": sparse(["hotel", "guest_house"], 0.03),
+    }, geometry=geoms, crs="EPSG:4326")
+
+
+# --- the row-by-row code the scrapers used before feature_rows -------------
+
+def legacy_estimate_pop(place_type):
+    p_type = str(place_type).lower()
+    if 'city' in p_type: return "High (100k+)"
+    if 'town' in p_type: return "High (20k-50k)"
+    if 'village' in p_type: return "Medium (2k-10k)"
+    if 'hamlet' in p_type: return "Low (<1k)"
+    return "Unknown"
+
+
+def legacy_get_best_name(row, lga, lat):
+    for col in ['name', 'name:en', 'alt_name', 'int_name', 'loc_name']:
+        if col in row and pd.notna(row[col]) and str(row[col]).strip() != "":
+            return row[col]
+    return f"Unmapped Cluster ({lga} - {str(lat)[:6]})"
+
+
+def legacy_settlement_rows(gdf, lga):
+    settlements = []
+    for _, row in gdf.iterrows():
+        lat = row.geometry.centroid.y
+        lon = row.geometry.centroid.x
+        name = legacy_get_best_name(row, lga, lat)
+        place_type = row['place'] if 'place' in row else "village"
+        real_pop = row['population'] if 'population' in row and pd.notna(row['population']) else None
+        if real_pop:
+            pop_display = f"Confirmed: {int(real_pop)}"
+            priority = 1 if int(real_pop) > 5000 else 2
+        else:
+            pop_display = legacy_estimate_pop(place_type)
+            priority = 1 if "High" in pop_display else (2 if "Medium" in pop_display else 3)
+        if "Unmapped" in name:
+            priority = 2
+        settlements.append({"Name": name, "Type": place_type, "LGA": lga, "Population_Info": pop_display,
+                            "Priority_Tier": priority, "Latitude": lat, "Longitude": lon})
+    return pd.DataFrame(settlements)
+
+
+def legacy_estimate_traffic(obj_type, category):
+    t = str(obj_type).lower()
+    if any(x in t for x in ['university', 'market', 'mall', 'hospital']):
+        return "High (Thousands Daily)"
+    if any(x in t for x in ['college', 'worship', 'church', 'mosque', 'supermarket', 'factory']):
+        return "Medium-High (Hundreds Daily/Weekly)"
+    if any(x in t for x in ['hotel', 'bank', 'fuel', 'school', 'secondary']):
+        return "Medium (Steady Flow)"
+    return "Low-Medium (Local Traffic)"
+
+
+def legacy_commercial_rows(gdf, lga):
+    leads = []
+    for _, row in gdf.iterrows():
+        category = "Business"
+        if 'amenity' in row and row['amenity'] == 'place_of_worship': category = "Religious"
+        elif 'amenity' in row and row['amenity'] in ['school', 'college', 'university']: category = "Education"
+        elif 'tourism' in row: category = "Hospitality"
+        elif 'office' in row: category = "Office/Govt"
+        elif 'industrial' in row: category = "Industrial"
+        name = None
+        for col in ['name', 'name:en', 'alt_name']:
+            if col in row and pd.notna(row[col]):
+                name = row[col]
+                break
+        obj_type = row.get('amenity') or row.get('shop') or row.get('office') or row.get('tourism') or row.get('industrial') or "Business"
+        if not name:
+            name = f"Unnamed {str(obj_type).title()}"
+        leads.append({"Name": name, "Type": str(obj_type).title(), "Category": category, "LGA": lga,
+                      "Tentative_Population": legacy_estimate_traffic(obj_type, category), "Priority_Tier": 1,
+                      "Latitude": row.geometry.centroid.y, "Longitude": row.geometry.centroid.x})
+    return pd.DataFrame(leads)
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+# (tag columns whose blank values the loop treated as set, columns derived from them)
+RELABELLED = {
+    "settlements": (['place'], ["Type", "Population_Info", "Priority_Tier"]),
+    "commercial": (feature_rows.COMMERCIAL_TYPE_COLS, ["Name", "Type", "Category", "Tentative_Population"]),
+}
+
+
+def compare(new, old, gdf, label):
+    """'identical', 'identical apart from N relabelled rows' or 'MISMATCH'."""
+    # The old loops predate the OSM_ID column
+    new = new.drop(columns="OSM_ID", errors="ignore")
+    tag_cols, derived = RELABELLED[label]
+    blank_tag = np.zeros(len(gdf), dtype=bool)
+    for col in tag_cols:
+        if col in gdf.columns:
+            blank_tag |= ~feature_rows.not_blank(gdf[col])
+    kept = [col for col in new.columns if col not in derived]
+    if (new[kept].to_csv(index=False) != old[kept].to_csv(index=False)
+            or new[~blank_tag].to_csv(index=False) != old[~blank_tag].to_csv(index=False)):
+        return "MISMATCH"
+    relabelled = int((new[derived].astype(str) != old[derived].astype(str)).any(axis=1).sum())
+    return f"identical apart from {relabelled:,} relabelled rows" if relabelled else "identical"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark iterrows vs vectorized feature conversion.")
+    parser.add_argument("--n", type=int, default=100_000, help="Synthetic features to convert.")
+    parser.add_argument("--skip-legacy", action="store_true", help="Only time the vectorized path.")
+    args = parser.parse_args()
+
+    print(f"--- CONVERSION BENCHMARK ({args.n:,} synthetic features) ---")
+    gdf = synthetic_features(args.n)
+
+    mismatch = False
+    for label, new_fn, old_fn in [
+        ("settlements", feature_rows.settlement_rows, legacy_settlement_rows),
+        ("commercial", feature_rows.commercial_rows, legacy_commercial_rows),
+    ]:
+        new, new_time = timed(new_fn, gdf, "Okene")
+        line = f"{label:>12}: vectorized {new_time:7.3f}s ({args.n / new_time:,.0f} rows/s)"
+        if not args.skip_legacy:
+            old, old_time = timed(old_fn, gdf, "Okene")
+            match = compare(new, old, gdf, label)
+            mismatch |= match == "MISMATCH"
+            line += f" | iterrows {old_time:7.3f}s | {old_time / new_time:5.1f}x faster | output {match}"
+        print(line)
+    if mismatch:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
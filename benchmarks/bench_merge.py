@@ -0,0 +1,98 @@
+"""
+Benchmark + parity check: in-memory merge (master_leads.build_master) vs the
+streaming merge (streaming_merge.stream_merge).
+
+The real scraper CSVs are tiled `--scale` times over a grid of far-apart
+offsets with fresh OSM_IDs, so every copy deduplicates like the original.
+Both paths run on the same files (twice: once timed, once under
+tracemalloc); the script prints time and peak traced memory for each and
+checks that the master CSV and the merge report are identical, exiting
+non-zero when they are not.
+
+Usage:
+    python benchmarks/bench_merge.py --scale 100 --chunksize 20000
+"""
+import argparse
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+import master_leads  # noqa: E402
+import streaming_merge  # noqa: E402
+
+# Copies are laid out on a grid this many degrees apart
+TILE_DEG = 3.0
+
+
+def scaled(df, scale):
+    side = int(np.ceil(np.sqrt(scale)))
+    copies = []
+    for k in range(scale):
+        copy = df.copy()
+        copy['Latitude'] = copy['Latitude'] + (k // side) * TILE_DEG
+        copy['Longitude'] = copy['Longitude'] + (k % side) * TILE_DEG
+        copy['OSM_ID'] = copy['OSM_ID'].astype(str) + f"#{k}"
+        copies.append(copy)
+    return pd.concat(copies, ignore_index=True)
+
+
+def measured(fn, *args, **kwargs):
+    """(result, seconds, peak traced MB); timed on a plain run, since tracing slows Python down."""
+    start = time.perf_counter()
+    fn(*args, **kwargs)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    result = fn(*args, **kwargs)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak / 2 ** 20
+
+
+def in_memory(villages_file, commercial_file, csv_path, report_path):
+    df_master, report = master_leads.build_master(pd.read_csv(villages_file), pd.read_csv(commercial_file))
+    df_master.to_csv(csv_path, index=False)
+    report.to_csv(report_path, index=False)
+    return len(df_master)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the in-memory and streaming master merge.")
+    parser.add_argument("--scale", type=int, default=20, help="Copies of the real scraper CSVs.")
+    parser.add_argument("--chunksize", type=int, default=streaming_merge.DEFAULT_CHUNKSIZE)
+    parser.add_argument("--skip-in-memory", action="store_true", help="Only run the streaming merge.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        villages, commercial = tmp / "villages.csv", tmp / "commercial.csv"
+        scaled(pd.read_csv(ROOT / master_leads.VILLAGES_FILE), args.scale).to_csv(villages, index=False)
+        scaled(pd.read_csv(ROOT / master_leads.COMMERCIAL_FILE), args.scale).to_csv(commercial, index=False)
+        print(f"--- MERGE BENCHMARK (scale {args.scale}x, chunks of {args.chunksize:,}) ---")
+
+        (read, kept, duplicates), stream_time, stream_peak = measured(
+            streaming_merge.stream_merge, villages, commercial, tmp / "stream.csv", tmp / "stream.parquet",
+            tmp / "stream_report.csv", chunksize=args.chunksize)
+        print(f"   streaming: {stream_time:7.2f}s, peak {stream_peak:8.1f} MB | {read:,} rows -> {kept:,} kept, "
+              f"{duplicates:,} duplicates")
+        if args.skip_in_memory:
+            return
+
+        _, memory_time, memory_peak = measured(in_memory, villages, commercial, tmp / "memory.csv",
+                                               tmp / "memory_report.csv")
+        same = ((tmp / "stream.csv").read_bytes() == (tmp / "memory.csv").read_bytes()
+                and (tmp / "stream_report.csv").read_bytes() == (tmp / "memory_report.csv").read_bytes())
+        print(f"   in-memory: {memory_time:7.2f}s, peak {memory_peak:8.1f} MB | output "
+              f"{'identical' if same else 'MISMATCH'}")
+        if not same:
+            sys.exit("Streaming and in-memory merges wrote different files.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Micro-benchmark: route_planner on synthetic stops scattered over Kogi State.
+
+Times the nearest-neighbour seed and the full 2-opt / Or-opt optimization
+for a few day sizes and prints how much shorter the optimized route is.
+
+Usage:
+    python benchmarks/bench_route.py --stops 100 500 1000
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import route_planner  # noqa: E402
+
+# Rough Kogi State bounding box, start at Okene
+LAT_RANGE = (6.5, 8.7)
+LON_RANGE = (5.4, 7.9)
+START = (7.5513, 6.2350)
+
+
+def closed_matrix(n, seed=42):
+    """Branch (node 0), n stops, and node n + 1 = back at the branch."""
+    rng = np.random.default_rng(seed)
+    lat = np.concatenate([[START[0]], rng.uniform(*LAT_RANGE, n)])
+    lon = np.concatenate([[START[1]], rng.uniform(*LON_RANGE, n)])
+    d = np.zeros((n + 2, n + 2))
+    d[:n + 1, :n + 1] = route_planner.distance_matrix(lat, lon)
+    d[n + 1, :n + 1] = d[:n + 1, n + 1] = d[0, :n + 1]
+    return d
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the field-route optimizer.")
+    parser.add_argument("--stops", type=int, nargs="+", default=[100, 500, 1000], help="Stops per synthetic day.")
+    args = parser.parse_args()
+
+    print("--- ROUTE BENCHMARK (closed tour from Okene) ---")
+    for n in args.stops:
+        d = closed_matrix(n)
+        nodes = np.arange(1, n + 1)
+        start = time.perf_counter()
+        seed = route_planner.nearest_neighbour(d, nodes, 0, n + 1)
+        seed_time = time.perf_counter() - start
+        start = time.perf_counter()
+        path = route_planner.optimize_path(d, nodes, 0, n + 1)
+        opt_time = time.perf_counter() - start
+        seed_km, opt_km = route_planner.path_length(d, seed), route_planner.path_length(d, path)
+        print(f"{n:>6} stops: nearest-neighbour {seed_time:6.3f}s {seed_km:9,.0f} km | "
+              f"optimized {opt_time:6.3f}s {opt_km:9,.0f} km | {100 * (1 - opt_km / seed_km):4.1f}% shorter")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+"""
+Benchmark suite: scrape, merge and dashboard paths on recorded and scaled-up data.
+
+Fixtures:
+- the Overpass responses recorded in cache/ (see overpass_cache.py), replayed
+  through osmnx's own parser, so no network is involved,
+- the scraper CSVs (kogi_villages_smart.csv, kogi_commercial.csv),
+both tiled `scale` times over a grid of far-apart offsets with fresh OSM ids
+(as in bench_merge.py), so every copy parses and deduplicates like the original.
+
+Stages, each fed by the one before:
+    scrape    Overpass JSON -> features (osmnx) -> scraper rows (feature_rows),
+              one copy of the responses at a time, as the scrapers go LGA by
+              LGA                                              units: elements
+    merge     scraper CSVs -> master table (build_master)      units: input rows
+    load      save + load_master + branch minutes (load_data)  units: leads
+    filter    sidebar filter (dashboard_views.filter_leads)    units: leads
+    aggregate viability matrix + hex cells at every resolution units: leads
+    map       the command map (dashboard_views.build_map), as
+              HTML                                             units: leads
+
+The dashboard stages call the same dashboard_views functions as app.py.
+    index     LeadIndex build + a radius query                 units: leads
+
+Each stage runs once under tracemalloc for the peak traced memory (which
+also warms it up), then `--repeat` times for the best time. Results are compared against
+benchmarks/baselines.json (per scale and stage); a stage that is slower or
+bigger than its baseline by more than `--tolerance` is flagged and the
+script exits with status 1. Record a new baseline after an intended change,
+on the machine the comparison runs on.
+
+Usage:
+    python benchmarks/bench_suite.py                      # scales 1, 10, 100
+    python benchmarks/bench_suite.py --scales 1000 --repeat 1
+    python benchmarks/bench_suite.py --save-baseline
+"""
+import argparse
+import glob
+import json
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import osmnx.features
+import pandas as pd
+import shapely
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+import dashboard_views  # noqa: E402
+import feature_rows  # noqa: E402
+import hex_grid  # noqa: E402
+import lga_reference  # noqa: E402
+import map_layers  # noqa: E402
+import master_leads  # noqa: E402
+import spatial_index  # noqa: E402
+import travel_times  # noqa: E402
+from bench_merge import TILE_DEG, scaled  # noqa: E402
+
+# folium asks for a CartoDB API key on every map it builds; the tiles are never fetched here
+warnings.filterwarnings("ignore", message="CartoDB tiles now require an API key")
+
+BASELINE_FILE = Path(__file__).resolve().parent / "baselines.json"
+DEFAULT_SCALES = [1, 10, 100]
+DEFAULT_TOLERANCE = 0.5
+# Differences below this many seconds are timer noise, whatever the ratio
+MIN_SECONDS = 0.25
+
+# Fresh ids per copy; OSM ids are far below this
+ID_STRIDE = 10 ** 11
+
+
+def recorded_responses(cache_dir=ROOT / "cache"):
+    """The Overpass answers in the response cache (Nominatim answers are lists and are skipped)."""
+    responses = []
+    for path in sorted(glob.glob(str(Path(cache_dir) / "*.json"))):
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+        if isinstance(data, dict) and "elements" in data:
+            responses.append(data)
+    return responses
+
+
+def scaled_responses(responses, scale):
+    """
+    `scale` copies of the responses, laid out like bench_merge.scaled, with ids
+    and references renumbered: one list of response bodies (JSON text) per copy.
+    """
+    side = int(np.ceil(np.sqrt(scale)))
+    copies = []
+    for k in range(scale):
+        dlat, dlon, shift = (k // side) * TILE_DEG, (k % side) * TILE_DEG, k * ID_STRIDE
+        bodies = []
+        for response in responses:
+            elements = []
+            for element in response["elements"]:
+                element = {**element, "id": element["id"] + shift}
+                if "lat" in element:
+                    element["lat"] += dlat
+                    element["lon"] += dlon
+                if "nodes" in element:
+                    element["nodes"] = [node + shift for node in element["nodes"]]
+                if "members" in element:
+                    element["members"] = [{**member, "ref": member["ref"] + shift} for member in element["members"]]
+                elements.append(element)
+            bodies.append(json.dumps({**response, "elements": elements}))
+        copies.append(bodies)
+    return copies
+
+
+def fixture_polygon(responses, scale):
+    """Box around every node of the scaled responses, so the parser keeps all of them."""
+    lat = [e["lat"] for r in responses for e in r["elements"] if "lat" in e]
+    lon = [e["lon"] for r in responses for e in r["elements"] if "lon" in e]
+    reach = (int(np.ceil(np.sqrt(scale))) - 1) * TILE_DEG
+    return shapely.box(min(lon) - 0.01, min(lat) - 0.01, max(lon) + reach + 0.01, max(lat) + reach + 0.01)
+
+
+def measured(fn, repeat=3):
+    """(result, best seconds of `repeat` plain runs, peak traced MB of a first run before them)."""
+    # The traced run goes first and doubles as the warm-up (lazy imports, first-call caches)
+    tracemalloc.start()
+    result = fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return result, best, peak / 2 ** 20
+
+
+# --- stages ---------------------------------------------------------------
+
+def scrape(copies, polygon, tags):
+    """(village rows, commercial rows) of every copy; only the rows outlive a copy, as in a real scan."""
+    villages, commercial = [], []
+    for bodies in copies:
+        # osmnx consumes the decoded elements, so every run decodes the bodies afresh
+        features = osmnx.features._create_gdf([json.loads(body) for body in bodies], polygon, tags).reset_index()
+        # The settlement and commercial answers share one frame here; `place` tells them apart
+        is_place = features['place'].notna() if 'place' in features.columns else pd.Series(False, index=features.index)
+        villages.append(feature_rows.settlement_rows(features[is_place].reset_index(drop=True), "Fixture"))
+        commercial.append(feature_rows.commercial_rows(features[~is_place].reset_index(drop=True), "Fixture"))
+    return pd.concat(villages, ignore_index=True), pd.concat(commercial, ignore_index=True)
+
+
+def load(df_master, tmp, times):
+    # load_data in app.py, without Streamlit's cache
+    csv_path, parquet_path = tmp / "master.csv", tmp / "master.parquet"
+    master_leads.save_master(df_master, csv_path, parquet_path)
+    return travel_times.add_branch_minutes(master_leads.load_master(csv_path, parquet_path), times)
+
+
+def synthetic_times(df_master, tmp, seed=42):
+    """A random branch x lead minutes matrix, saved and memory-mapped like the real one."""
+    branches = lga_reference.BRANCHES
+    minutes = np.random.default_rng(seed).uniform(5, 240, (len(branches), len(df_master))).astype(np.float32)
+    matrix_file, index_file = tmp / "minutes.npy", tmp / "minutes.json"
+    travel_times.save(minutes, df_master[master_leads.ID_COLUMN], branches, matrix_file, index_file)
+    return travel_times.load(matrix_file, index_file)
+
+
+def aggregate(df):
+    # The Strategic Intelligence viability matrix and the hex layers
+    return dashboard_views.viability_matrix(df), hex_grid.aggregate_all(df)
+
+
+def build_map(df, cells):
+    # State-wide view; the server-side page is rendered here too (st_folium does it in the app)
+    resolution = hex_grid.resolution_for_zoom(9)
+    m, mode, html = dashboard_views.build_map(df, df['Latitude'].mean(), df['Longitude'].mean(), 9,
+                                              map_layers.DEFAULT_CLIENT_LIMIT, None, (resolution, cells[resolution]))
+    return mode, len(html if html is not None else m.get_root().render())
+
+
+def index_query(df):
+    index = spatial_index.LeadIndex(df)
+    lat, lon = next(iter(lga_reference.BRANCHES.values()))
+    return len(index.within_radius(lat, lon, 25))
+
+
+def run_scale(responses, villages_csv, commercial_csv, scale, repeat):
+    """{stage: {"units", "seconds", "peak_mb"}} for one scale."""
+    results = {}
+
+    def stage(name, units, fn):
+        result, seconds, peak = measured(fn, repeat)
+        results[name] = {"units": int(units), "seconds": round(seconds, 4), "peak_mb": round(peak, 2)}
+        return result
+
+    copies = scaled_responses(responses, scale)
+    polygon = fixture_polygon(responses, scale)
+    elements = scale * sum(len(response["elements"]) for response in responses)
+    stage("scrape", elements, lambda: scrape(copies, polygon, lga_reference.REGION.all_tags))
+    # The response bodies are the largest fixture at 1000x; the later stages do not need them
+    copies = None
+
+    df_villages, df_commercial = scaled(villages_csv, scale), scaled(commercial_csv, scale)
+    df_master, _ = stage("merge", len(df_villages) + len(df_commercial),
+                         lambda: master_leads.build_master(df_villages, df_commercial))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        times = synthetic_times(df_master, tmp)
+        df = stage("load", len(df_master), lambda: load(df_master, tmp, times))
+
+    categories = sorted(df['Category'].unique())
+    # Every LGA, priority tiers 1-2
+    filtered = stage("filter", len(df), lambda: dashboard_views.filter_leads(df, [], categories, (1, 2)))
+    _, cells = stage("aggregate", len(filtered), lambda: aggregate(filtered))
+    stage("map", len(filtered), lambda: build_map(filtered, cells))
+    stage("index", len(df), lambda: index_query(df))
+    return results
+
+
+# --- baselines ------------------------------------------------------------
+
+def load_baselines(path=BASELINE_FILE):
+    path = Path(path)
+    return json.loads(path.read_text(encoding="utf-8")) if path.is_file() else {"scales": {}}
+
+
+def save_baselines(baselines, measured_scales, path=BASELINE_FILE):
+    baselines["recorded"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    baselines["machine"] = f"{platform.machine()} {platform.system()}, Python {platform.python_version()}"
+    baselines.setdefault("scales", {}).update({str(scale): stages for scale, stages in measured_scales.items()})
+    Path(path).write_text(json.dumps(baselines, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+
+
+def regressions(current, baseline, tolerance):
+    """Messages for each metric more than `tolerance` (a fraction) above its baseline."""
+    found = []
+    for name, now in current.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        if now["seconds"] > before["seconds"] * (1 + tolerance) and now["seconds"] - before["seconds"] > MIN_SECONDS:
+            found.append(f"{name}: {before['seconds']:.3f}s -> {now['seconds']:.3f}s")
+        if now["peak_mb"] > before["peak_mb"] * (1 + tolerance) and now["peak_mb"] - before["peak_mb"] > 1:
+            found.append(f"{name}: peak {before['peak_mb']:.1f} MB -> {now['peak_mb']:.1f} MB")
+    return found
+
+
+def table(results, baseline):
+    lines = [f"   {'stage':<10}{'units':>11}{'seconds':>10}{'units/s':>13}{'peak MB':>10}{'vs baseline':>13}"]
+    for name, r in results.items():
+        rate = r["units"] / r["seconds"] if r["seconds"] else float("inf")
+        before = baseline.get(name)
+        change = f"{(r['seconds'] / before['seconds'] - 1) * 100:+.0f}%" if before and before["seconds"] else "-"
+        lines.append(f"   {name:<10}{r['units']:>11,}{r['seconds']:>10.3f}{rate:>13,.0f}{r['peak_mb']:>10.1f}{change:>13}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the scrape, merge and dashboard paths.")
+    parser.add_argument("--scales", type=int, nargs="+", default=DEFAULT_SCALES, help="Copies of the fixtures.")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per stage (the best one counts).")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed slowdown or memory growth over the baseline, as a fraction.")
+    parser.add_argument("--baseline", default=str(BASELINE_FILE), help="Baseline file.")
+    parser.add_argument("--save-baseline", action="store_true", help="Record these results as the baseline.")
+    args = parser.parse_args()
+
+    responses = recorded_responses()
+    if not responses:
+        sys.exit("No recorded Overpass responses in cache/ - run a scrape with the response cache first.")
+    villages_csv = pd.read_csv(ROOT / master_leads.VILLAGES_FILE)
+    commercial_csv = pd.read_csv(ROOT / master_leads.COMMERCIAL_FILE)
+    baselines = load_baselines(args.baseline)
+
+    results, flagged = {}, []
+    for scale in args.scales:
+        print(f"--- BENCHMARK SUITE (scale {scale}x, {len(responses)} recorded responses, best of {args.repeat}) ---")
+        results[scale] = run_scale(responses, villages_csv, commercial_csv, scale, args.repeat)
+        baseline = baselines["scales"].get(str(scale), {})
+        print(table(results[scale], baseline))
+        flagged += [f"{scale}x {message}" for message in regressions(results[scale], baseline, args.tolerance)]
+
+    if args.save_baseline:
+        save_baselines(baselines, results, args.baseline)
+        print(f"Baseline saved: {args.baseline}")
+        return
+    if flagged:
+        print(f"REGRESSIONS (over {args.tolerance:.0%} of baseline):")
+        print("\n".join(f"   {message}" for message in flagged))
+        sys.exit(1)
+    print("No regressions against the baseline." if baselines["scales"] else "No baseline yet (--save-baseline).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+What the dashboard shows for one filter, without Streamlit.
+
+app.py memoizes these per filter (view_cache.py) and puts the results on
+the page; benchmarks/bench_suite.py times the same functions, so a slower
+filter, matrix or map shows up there.
+"""
+import folium
+from folium.plugins import Fullscreen, HeatMap, MeasureControl, MiniMap, MousePosition
+
+import map_layers
+
+
+def filter_leads(df, selected_lgas, selected_cats, priority):
+    """Leads of the selected categories and priority tiers, in the selected LGAs (all when none)."""
+    filtered_df = df[
+        (df['Category'].isin(selected_cats)) &
+        (df['Priority_Tier'].between(priority[0], priority[1]))
+    ]
+    if selected_lgas:
+        filtered_df = filtered_df[filtered_df['LGA'].isin(selected_lgas)]
+    return filtered_df
+
+
+def viability_matrix(filtered_df):
+    """The Strategic Intelligence matrix: one row per LGA, most populous first."""
+    return filtered_df.groupby('LGA', observed=True).agg(
+        Tier=('Viability_Tier', 'first'),
+        Description=('LGA_Desc', 'first'),
+        Actual_Population=('LGA_Actual_Pop', 'max'),
+        Captured_Targets=('Name', 'count')
+    ).reset_index().sort_values('Actual_Population', ascending=False)
+
+
+def lga_deep_dive(filtered_df, lga_name):
+    """(rows of the LGA, most common type, top 10 settlements, top 10 commercial hubs)."""
+    lga_df = filtered_df[filtered_df['LGA'] == lga_name]
+    top_sector = lga_df['Type'].mode()[0] if not lga_df.empty else "N/A"
+    settlements = lga_df[lga_df['Category'] == 'Settlement'].sort_values('Market_Score', ascending=False, kind='stable').head(10)
+    commercial = lga_df[lga_df['Category'] != 'Settlement'].sort_values('Market_Score', ascending=False, kind='stable').head(10)
+    return (lga_df, top_sector, settlements[['Name', 'Tentative_Population', 'Navigation_Link']],
+            commercial[['Name', 'Type', 'Tentative_Population', 'Navigation_Link']])
+
+
+def build_map(filtered_df, center_lat, center_lon, zoom, client_limit, bounds=None, hex_cells=None):
+    """
+    The COMMAND MAP for one filter: (folium map, "client"/"server" mode, page HTML or None).
+    `hex_cells` is (resolution, cells) from hex_grid for the market-potential layer.
+    """
+    m = folium.Map(location=[center_lat, center_lon], zoom_start=zoom, control_scale=True)
+
+    folium.TileLayer('CartoDB positron', name="Light Map (Clean)").add_to(m)
+    folium.TileLayer('CartoDB dark_matter', name="Dark Map (High Contrast)").add_to(m)
+    folium.TileLayer('OpenStreetMap', name="Street Map (Detailed)").add_to(m)
+    folium.TileLayer(
+        tiles='https://server.arcgisonline.com/ArcGIS/rest/services/World_Imagery/MapServer/tile/{z}/{y}/{x}',
+        attr='Esri',
+        name='Satellite Imagery',
+        overlay=False
+    ).add_to(m)
+
+    # Heat weighted by Market_Score, so a market counts for more than a hamlet
+    heat = filtered_df[['Latitude', 'Longitude']].astype(float).round(5)
+    heat['Weight'] = (filtered_df['Market_Score'].astype(float) / 100).round(2).to_numpy()
+    HeatMap(heat.values.tolist(), name="Density Heatmap", radius=15, blur=10, show=False).add_to(m)
+
+    if hex_cells is not None:
+        # Above the marker limit the hexes are the overview, so they start switched on
+        resolution, cells = hex_cells
+        colormap = map_layers.add_hex_layer(m, cells, resolution, show=len(filtered_df) > client_limit)
+        colormap.add_to(m)
+
+    # One compact payload; above the limit, clusters are built here for the last viewport
+    render_mode = map_layers.add_lead_layer(m, filtered_df, client_limit=client_limit, zoom=zoom, bounds=bounds)
+
+    Fullscreen(position='topright').add_to(m)
+    MousePosition(position='bottomleft').add_to(m)
+    MeasureControl(position='topleft', primary_length_unit='kilometers').add_to(m)
+    MiniMap(toggle_display=True, position='bottomright').add_to(m)
+    folium.LayerControl(collapsed=False).add_to(m)
+
+    legend_html = """
+     <div style="position: fixed; 
+                 bottom: 50px; left: 50px; width: 180px; height: auto; 
+                 border:1px solid #ccc; z-index:9999; font-size:13px;
+                 background-color:rgba(255, 255, 255, 0.95); padding: 10px;
+                 color: black !important;
+                 border-radius: 8px; box-shadow: 0 2px 5px rgba(0,0,0,0.2);">
+         <b style="color:black;">🎯 Target Legend</b><br>
+         <div style="margin-top:5px; color:black;"><i class="fa fa-shopping-cart" style="color:red"></i> Markets/Comm.</div>
+         <div style="color:black;"><i class="fa fa-book" style="color:green"></i> Education</div>
+         <div style="color:black;"><i class="fa fa-bell" style="color:purple"></i> Religious</div>
+         <div style="color:black;"><i class="fa fa-home" style="color:blue"></i> Settlements</div>
+         <div style="color:black;"><i class="fa fa-briefcase" style="color:darkblue"></i> Financial</div>
+         <div style="color:black;"><i class="fa fa-info-sign" style="color:gray"></i> Other</div>
+      </div>
+     """
+    m.get_root().html.add_child(folium.Element(legend_html))
+
+    # Client-side mode never talks back, so the finished page can be cached as HTML
+    map_html = m.get_root().render() if render_mode == "client" else None
+    return m, render_mode, map_html
@@ -0,0 +1,174 @@
+"""
+Fuzzy, spatially bucketed deduplication of leads.
+
+The scrapers used to drop duplicates on exact keys (Name + Latitude). That
+misses the common real cases: a market mapped both as a node and as a way
+(centroids a few metres apart), or a village entered twice under slightly
+different spellings. Here two leads are the same target when:
+
+- they are the same OSM element (same OSM_ID, e.g. picked up by two LGAs), or
+- both have real names, they are within `radius_m`, and their normalized
+  names are at least `min_similarity` alike, or
+- both carry generated placeholder names ("Unnamed ...", "Unmapped
+  Cluster ..."), have the same Type and are within `placeholder_radius_m`.
+
+Only pairs in the same or neighbouring grid cells (cell edge = radius) are
+ever compared, so the cost grows with the number of leads, not its square.
+Duplicate groups are resolved with union-find and the first row of each group
+is kept (the same rule as drop_duplicates(keep='first')). Every dropped row is
+listed in a merge report.
+"""
+import difflib
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+import spatial_index
+
+DEFAULT_RADIUS_M = 100
+DEFAULT_MIN_SIMILARITY = 0.85
+PLACEHOLDER_RADIUS_M = 15
+
+PLACEHOLDER_PATTERN = r"^(?:unnamed|unmapped cluster)\b"
+
+REPORT_COLUMNS = ["Kept_Name", "Kept_OSM_ID", "Dropped_Name", "Dropped_OSM_ID", "Dropped_LGA",
+                  "Distance_m", "Name_Similarity", "Rule"]
+
+# Cell offsets that cover every neighbouring pair of cells exactly once
+_NEIGHBOURS = [(0, 0), (0, 1), (1, -1), (1, 0), (1, 1)]
+
+
+def normalize_names(names):
+    """Lower-case, accents and punctuation stripped, whitespace collapsed."""
+    text = names.astype(object).where(names.notna(), "").astype(str)
+    text = text.map(lambda s: unicodedata.normalize("NFKD", s).encode("ascii", "ignore").decode())
+    return (text.str.lower()
+            .str.replace(r"[_\W]+", " ", regex=True)
+            .str.replace(r"\s+", " ", regex=True)
+            .str.strip())
+
+
+def candidate_pairs(lat, lon, radius_m):
+    """
+    (i, j) index pairs (i < j) of points in the same or adjacent grid cells.
+
+    The cell edge is at least `radius_m` in both directions, so every pair
+    closer than the radius is among the candidates.
+    """
+    radius_deg = radius_m / (spatial_index.KM_PER_DEGREE * 1000)
+    max_lat = float(np.nanmax(np.abs(lat))) if len(lat) else 0.0
+    cell = radius_deg / max(np.cos(np.radians(min(max_lat, 89.0))), 1e-6)
+
+    points = pd.DataFrame({
+        "i": np.arange(len(lat)),
+        "cy": np.floor(lat / cell).astype(np.int64),
+        "cx": np.floor(lon / cell).astype(np.int64),
+    })
+    pairs = []
+    for dy, dx in _NEIGHBOURS:
+        shifted = points.assign(cy=points["cy"] - dy, cx=points["cx"] - dx).rename(columns={"i": "j"})
+        joined = points.merge(shifted, on=["cy", "cx"])
+        if (dy, dx) == (0, 0):
+            joined = joined[joined["i"] < joined["j"]]
+        pairs.append(joined[["i", "j"]].to_numpy())
+    pairs = np.concatenate(pairs) if pairs else np.empty((0, 2), dtype=np.int64)
+    return np.sort(pairs, axis=1)
+
+
+def _root(parent, i):
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def duplicate_groups(df, radius_m=DEFAULT_RADIUS_M, min_similarity=DEFAULT_MIN_SIMILARITY,
+                     placeholder_radius_m=PLACEHOLDER_RADIUS_M):
+    """
+    Group root (row position of the survivor) of every row of `df`, plus the
+    merge report: one row per dropped lead, in row order.
+    """
+    n = len(df)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64), pd.DataFrame(columns=REPORT_COLUMNS)
+
+    lat = df['Latitude'].to_numpy(dtype=float)
+    lon = df['Longitude'].to_numpy(dtype=float)
+    names = normalize_names(df['Name']).to_numpy(dtype=object)
+    placeholder = pd.Series(names).str.contains(PLACEHOLDER_PATTERN, regex=True).to_numpy()
+    types = df['Type'].astype(object).to_numpy() if 'Type' in df.columns else np.full(n, None)
+    ids = df['OSM_ID'].astype(object).to_numpy() if 'OSM_ID' in df.columns else np.full(n, None)
+
+    pairs = candidate_pairs(lat, lon, max(radius_m, placeholder_radius_m))
+    i, j = pairs[:, 0], pairs[:, 1]
+    distance = spatial_index.haversine_km(lat[i], lon[i], lat[j], lon[j]) * 1000
+
+    same_element = pd.notna(ids[i]) & (ids[i] == ids[j])
+    both_placeholder = placeholder[i] & placeholder[j]
+    both_named = ~placeholder[i] & ~placeholder[j] & (names[i] != "") & (names[j] != "")
+
+    placeholder_dup = both_placeholder & (distance <= placeholder_radius_m) & (types[i] == types[j])
+    named_close = both_named & (distance <= radius_m)
+
+    # Exact name matches need no string comparison; only near pairs with different names do
+    similarity = np.where(names[i] == names[j], 1.0, 0.0)
+    fuzzy = np.flatnonzero(named_close & (similarity < 1.0))
+    for k in fuzzy:
+        similarity[k] = difflib.SequenceMatcher(None, names[i[k]], names[j[k]]).ratio()
+    named_dup = named_close & (similarity >= min_similarity)
+
+    duplicate = same_element | placeholder_dup | named_dup
+    rule = np.where(same_element, "same OSM element", np.where(named_dup, "near + similar name", "near placeholder"))
+
+    # Union-find over duplicate pairs; the lowest row index of each group survives
+    parent = np.arange(n)
+    matched = np.flatnonzero(duplicate)
+    for k in matched[np.argsort(i[matched], kind="stable")]:
+        a, b = _root(parent, i[k]), _root(parent, j[k])
+        if a != b:
+            parent[max(a, b)] = min(a, b)
+    roots = np.array([_root(parent, x) for x in range(n)])
+    keep = roots == np.arange(n)
+
+    # Report each dropped row against its group's survivor, with the pair evidence that linked it
+    evidence = {}
+    for k in matched:
+        for dropped in (i[k], j[k]):
+            if not keep[dropped] and dropped not in evidence:
+                evidence[dropped] = k
+    dropped_rows = np.flatnonzero(~keep)
+    kept_rows = roots[dropped_rows]
+    report = pd.DataFrame({
+        "Kept_Name": df['Name'].to_numpy()[kept_rows],
+        "Kept_OSM_ID": ids[kept_rows],
+        "Dropped_Name": df['Name'].to_numpy()[dropped_rows],
+        "Dropped_OSM_ID": ids[dropped_rows],
+        "Dropped_LGA": df['LGA'].to_numpy()[dropped_rows] if 'LGA' in df.columns else None,
+        "Distance_m": np.round(spatial_index.haversine_km(
+            lat[kept_rows], lon[kept_rows], lat[dropped_rows], lon[dropped_rows]) * 1000, 1),
+        # Names only decide the "similar name" rule; the others report no score
+        "Name_Similarity": [round(similarity[evidence[r]], 3) if named_dup[evidence[r]] else np.nan
+                            for r in dropped_rows],
+        "Rule": [rule[evidence[r]] for r in dropped_rows],
+    }, columns=REPORT_COLUMNS)
+    return roots, report
+
+
+def find_duplicates(df, **kwargs):
+    """
+    Boolean "keep" mask over `df` plus the merge report (one row per dropped lead).
+    """
+    roots, report = duplicate_groups(df, **kwargs)
+    return roots == np.arange(len(df)), report
+
+
+def deduplicate(df, **kwargs):
+    """(df without duplicates, merge report). Keyword arguments go to find_duplicates."""
+    keep, report = find_duplicates(df, **kwargs)
+    return df[keep], report
+
+
+def save_report(report, path):
+    report.to_csv(path, index=False)
+    print(f"Merge report: {len(report)} duplicates -> {path}")
@@ -0,0 +1,123 @@
+"""
+Local stand-in for the Overpass + Nominatim APIs.
+
+Replays the responses saved in cache/ (plain, gzip or zstd entries, read
+through overpass_cache) so the scrapers can be exercised offline (and in
+parallel) without touching the public servers. It can also
+misbehave on purpose - random 429/504 answers and a hard slot limit - to
+check the rate limiter and retry logic.
+
+Usage:
+    python fake_overpass_server.py --port 8765 --fail-rate 0.2
+    python 1_scrape_villages.py --workers 4 --no-cache \
+        --overpass-url http://127.0.0.1:8765/api \
+        --nominatim-url http://127.0.0.1:8765/
+"""
+import argparse
+import random
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+import requests
+
+import overpass_cache
+
+# osmnx names its cache files after the public URLs, so we rebuild those keys
+PUBLIC_OVERPASS = "https://overpass-api.de/api/interpreter"
+PUBLIC_NOMINATIM = "https://nominatim.openstreetmap.org"
+
+
+class FakeOverpassHandler(BaseHTTPRequestHandler):
+    cache_dir = Path("cache")
+    fail_rate = 0.0
+    latency = 0.0
+    slots = None  # threading.BoundedSemaphore when a slot limit is set
+    stats = {"hits": 0, "misses": 0, "throttled": 0}
+    stats_lock = threading.Lock()
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _count(self, key):
+        with self.stats_lock:
+            self.stats[key] += 1
+
+    def _send(self, status, body, content_type="application/json"):
+        payload = body.encode("utf-8") if isinstance(body, str) else body
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _replay(self, public_url):
+        # Misbehave first, like the real server does under load
+        if random.random() < self.fail_rate:
+            self._count("throttled")
+            return self._send(random.choice([429, 504]), '{"remark": "stand-in throttle"}')
+
+        if self.slots is not None and not self.slots.acquire(blocking=False):
+            self._count("throttled")
+            return self._send(429, '{"remark": "no free slot"}')
+        try:
+            time.sleep(self.latency)
+            body = overpass_cache.read_response(self.cache_dir, public_url)
+            if body is None:
+                self._count("misses")
+                return self._send(404, '{"remark": "not in stand-in cache"}')
+            self._count("hits")
+            self._send(200, body)
+        finally:
+            if self.slots is not None:
+                self.slots.release()
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        if parts.path.endswith("/status"):
+            return self._send(200, "Connected as: 0\nCurrent time: -\nAnnounced endpoint: none\n"
+                                   "Rate limit: 2\n2 slots available now.\n", "text/plain")
+        if parts.path.endswith("/search"):
+            return self._replay(f"{PUBLIC_NOMINATIM}/search?{parts.query}")
+        self._send(404, '{"remark": "unknown endpoint"}')
+
+    def do_POST(self):
+        if not urlsplit(self.path).path.endswith("/interpreter"):
+            return self._send(404, '{"remark": "unknown endpoint"}')
+        length = int(self.headers.get("Content-Length", 0))
+        form = parse_qs(self.rfile.read(length).decode("utf-8"))
+        query = form.get("data", [""])[0]
+        public_url = requests.Request("GET", PUBLIC_OVERPASS, params=OrderedDict(data=query)).prepare().url
+        self._replay(str(public_url))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay cached Overpass/Nominatim responses locally.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--cache-dir", default="cache")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Share of requests answered with 429/504.")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every answer.")
+    parser.add_argument("--slots", type=int, default=None, help="Concurrent requests allowed before 429.")
+    args = parser.parse_args()
+
+    FakeOverpassHandler.cache_dir = Path(args.cache_dir)
+    FakeOverpassHandler.fail_rate = args.fail_rate
+    FakeOverpassHandler.latency = args.latency
+    if args.slots:
+        FakeOverpassHandler.slots = threading.BoundedSemaphore(args.slots)
+
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), FakeOverpassHandler)
+    print(f"--- STAND-IN OVERPASS ON http://127.0.0.1:{args.port} ---")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"Stats: {FakeOverpassHandler.stats}")
+
+
+if __name__ == "__main__":
+    main()
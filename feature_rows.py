@@ -0,0 +1,193 @@
+"""
+Feature -> CSV row conversion for both scrapers, as columnar operations.
+
+The scrapers used to walk every feature with `gdf.iterrows()`, computing the
+centroid twice per row and calling the estimators one Series at a time. Here
+the same rules run on whole columns: one vectorized centroid pass, name
+coalescing with bfill across the name columns, and np.select for the
+population / traffic / category classification.
+
+The output columns and values are what the row-by-row code produced, minus
+two of its quirks. Type, Category and the settlement place come from the
+feature's own tags: the old code asked whether the LGA's frame had a
+`tourism`/`office`/... column at all, so one hotel in an LGA made every bank
+there "Hospitality", and an incremental batch (osm_delta.py) with different
+columns would label the same element differently. And a population tag that
+is not a number ("1,200") falls back to the place estimate instead of
+failing the whole LGA.
+"""
+import numpy as np
+import pandas as pd
+import shapely
+
+SETTLEMENT_NAME_COLS = ['name', 'name:en', 'alt_name', 'int_name', 'loc_name']
+COMMERCIAL_NAME_COLS = ['name', 'name:en', 'alt_name']
+COMMERCIAL_TYPE_COLS = ['amenity', 'shop', 'office', 'tourism', 'industrial']
+
+SETTLEMENT_COLUMNS = ["Name", "Type", "LGA", "Population_Info", "Priority_Tier", "Latitude", "Longitude"]
+COMMERCIAL_COLUMNS = ["Name", "Type", "Category", "LGA", "Tentative_Population", "Priority_Tier", "Latitude", "Longitude"]
+
+# Ordered (keywords, label) rules - the first match wins, like the old if-chains
+POPULATION_RULES = [
+    (['city'], "High (100k+)"),
+    (['town'], "High (20k-50k)"),
+    (['village'], "Medium (2k-10k)"),
+    (['hamlet'], "Low (<1k)"),
+]
+
+TRAFFIC_RULES = [
+    # 1. HUGE CROWDS (Massive Cash Flow)
+    (['university', 'market', 'mall', 'hospital'], "High (Thousands Daily)"),
+    # 2. LARGE GATHERINGS (Weekly/Daily peaks)
+    (['college', 'worship', 'church', 'mosque', 'supermarket', 'factory'], "Medium-High (Hundreds Daily/Weekly)"),
+    # 3. STEADY BUSINESS
+    (['hotel', 'bank', 'fuel', 'school', 'secondary'], "Medium (Steady Flow)"),
+]
+
+
+def as_text(values):
+    """str() of every value (NaN -> 'nan'), the same on every pandas version."""
+    return pd.Series(np.asarray(values, dtype=object).astype(str), index=getattr(values, "index", None))
+
+
+def per_unique(values, fn):
+    """
+    Apply a vectorized `fn` to the distinct values only and broadcast back.
+
+    Tag columns have a handful of distinct values across 100k rows, so the
+    string work is done a few dozen times instead of once per feature.
+    """
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object), use_na_sentinel=False)
+    return np.asarray(fn(uniques), dtype=object)[codes]
+
+
+def centroids(gdf):
+    """(lat, lon) arrays of every feature's centroid in one pass."""
+    points = shapely.centroid(gdf.geometry.to_numpy())
+    return shapely.get_y(points), shapely.get_x(points)
+
+
+def classify(text, rules, default):
+    """np.select over keyword rules; `text` is an already lower-cased Series."""
+    conditions = [text.str.contains("|".join(words), regex=True) for words, _ in rules]
+    return np.select(conditions, [label for _, label in rules], default=default).astype(object)
+
+
+def estimate_pop(place_type):
+    """Vectorized population tier from the OSM `place` tag."""
+    return per_unique(place_type, lambda u: classify(as_text(u).str.lower(), POPULATION_RULES, "Unknown"))
+
+
+def estimate_traffic(obj_type):
+    """Vectorized footfall estimate from the facility type."""
+    return per_unique(obj_type, lambda u: classify(as_text(u).str.lower(), TRAFFIC_RULES, "Low-Medium (Local Traffic)"))
+
+
+def not_blank(values):
+    """notna and not whitespace-only, only stringifying the non-null values."""
+    mask = values.notna().to_numpy().copy()
+    mask[mask] = as_text(values[mask]).str.strip().ne("").to_numpy()
+    return mask
+
+
+def with_osm_ids(rows, gdf):
+    """Append the stable OSM key ("node/123") that incremental runs patch on."""
+    if 'element' in gdf.columns and 'id' in gdf.columns:
+        rows['OSM_ID'] = (gdf['element'].astype(object) + "/" + as_text(gdf['id'])).to_numpy()
+    return rows
+
+
+def coalesce(gdf, cols, valid):
+    """First value across `cols` (in order) where valid(column) is True, else NaN."""
+    present = [col for col in cols if col in gdf.columns]
+    if not present:
+        return pd.Series(np.nan, index=gdf.index, dtype=object)
+    candidates = pd.DataFrame({col: gdf[col].astype(object).where(valid(gdf[col]), np.nan) for col in present})
+    return candidates.bfill(axis=1).iloc[:, 0]
+
+
+def settlement_rows(gdf, lga):
+    """Rows for kogi_villages_smart.csv from a features frame of one LGA."""
+    lat, lon = centroids(gdf)
+
+    # Best name: first non-blank name column, else a findable placeholder
+    name = coalesce(gdf, SETTLEMENT_NAME_COLS, not_blank)
+    unnamed = name.isna().to_numpy()
+    name[unnamed] = ("Unmapped Cluster (" + lga + " - " + as_text(lat[unnamed]).str[:6] + ")").to_numpy()
+
+    place_type = coalesce(gdf, ['place'], not_blank).fillna("village")
+
+    # Confirmed population where OSM has one, otherwise the tag-based estimate
+    pop_display = pd.Series(estimate_pop(place_type), index=gdf.index)
+    priority = pd.Series(np.select(
+        [pop_display.str.contains("High"), pop_display.str.contains("Medium")], [1, 2], default=3
+    ), index=gdf.index)
+    if 'population' in gdf.columns:
+        # Free-text tags ("1,200", "approx 500") count as unknown instead of failing the LGA
+        population = pd.to_numeric(gdf['population'], errors="coerce")
+        confirmed = np.isfinite(population) & population.ne(0)
+        if confirmed.any():
+            real_pop = population[confirmed].astype(np.int64)
+            pop_display[confirmed] = "Confirmed: " + real_pop.astype(str)
+            priority[confirmed] = np.where(real_pop > 5000, 1, 2)
+
+    # An "Unmapped Cluster" might be a hidden market, so keep it worth a check
+    priority[as_text(name).str.contains("Unmapped", regex=False).to_numpy()] = 2
+
+    rows = pd.DataFrame({
+        "Name": name.to_numpy(),
+        "Type": place_type.to_numpy(),
+        "LGA": lga,
+        "Population_Info": pop_display.to_numpy(),
+        "Priority_Tier": priority.to_numpy(dtype=np.int64),
+        "Latitude": lat,
+        "Longitude": lon,
+    }, columns=SETTLEMENT_COLUMNS)
+    return with_osm_ids(rows, gdf)
+
+
+def tagged(gdf, col):
+    """Mask of the features that carry a non-blank `col` tag (all False when no feature has it)."""
+    return not_blank(gdf[col]) if col in gdf.columns else np.zeros(len(gdf), dtype=bool)
+
+
+def commercial_category(gdf):
+    """Category per row, decided by the feature's own tags."""
+    amenity = gdf['amenity'] if 'amenity' in gdf.columns else pd.Series(np.nan, index=gdf.index)
+    conditions = [
+        amenity.eq('place_of_worship').to_numpy(),
+        amenity.isin(['school', 'college', 'university']).to_numpy(),
+        tagged(gdf, 'tourism'),
+        tagged(gdf, 'office'),
+        tagged(gdf, 'industrial'),
+    ]
+    choices = ["Religious", "Education", "Hospitality", "Office/Govt", "Industrial"]
+    return np.select(conditions, choices, default="Business").astype(object)
+
+
+def commercial_type(gdf):
+    """First non-blank of amenity, shop, office, tourism, industrial, else "Business"."""
+    return coalesce(gdf, COMMERCIAL_TYPE_COLS, not_blank).fillna("Business")
+
+
+def commercial_rows(gdf, lga):
+    """Rows for kogi_commercial.csv from a features frame of one LGA."""
+    lat, lon = centroids(gdf)
+    obj_type = commercial_type(gdf)
+    type_title = pd.Series(per_unique(obj_type, lambda u: as_text(u).str.title()), index=gdf.index)
+
+    name = coalesce(gdf, COMMERCIAL_NAME_COLS, lambda s: s.notna())
+    unnamed = (name.isna() | name.eq("")).to_numpy()
+    name = name.where(~unnamed, ("Unnamed " + type_title).to_numpy())
+
+    rows = pd.DataFrame({
+        "Name": name.to_numpy(),
+        "Type": type_title.to_numpy(),
+        "Category": commercial_category(gdf),
+        "LGA": lga,
+        "Tentative_Population": estimate_traffic(obj_type),
+        "Priority_Tier": np.ones(len(gdf), dtype=np.int64),
+        "Latitude": lat,
+        "Longitude": lon,
+    }, columns=COMMERCIAL_COLUMNS)
+    return with_osm_ids(rows, gdf)
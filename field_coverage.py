@@ -0,0 +1,394 @@
+"""
+Field coverage: which leads officers have visited, converted or not yet reached.
+
+One SQLite file per region (kogi_coverage.sqlite) holds:
+
+- leads: the current master leads (OSM_ID, name, LGA, hex cell), refreshed
+  by sync_leads() whenever the master file changes,
+- visits: the visit log, one row per (lead, officer, time), with the outcome
+  (visited, follow_up, converted, declined), notes and where it came from
+  (the dashboard, or the name of an imported CSV),
+- lead_status / officer_leads: the state of each lead (latest outcome,
+  converted once converted, visit count, first/last visit) and of each
+  lead per officer,
+- coverage_lga / coverage_cell / coverage_officer: leads, leads visited,
+  leads converted and visits per LGA, per hex cell (hex_grid resolution
+  COVERAGE_RESOLUTION) and per officer.
+
+A trigger on visits keeps the status and coverage tables up to date as each
+visit is inserted, so reading coverage never scans the visit log. When the
+master changes, only the per-area lead counts are recounted from the lead
+tables. rebuild() recomputes everything from the visit log, for repairs.
+
+    store = CoverageStore(region.coverage_file)
+    store.sync_leads(df_master)
+    store.log_visit("node/318084136", "A. Bello", "converted")
+    added, duplicates, rejected = store.import_csv("field_visits.csv")
+    store.by_lga()
+
+Field CSVs (offline visits) need OSM_ID, Officer and Visited_At columns, and
+may have Outcome (default "visited") and Notes. Rows for unknown leads, with
+an unknown outcome or an unreadable date are returned as rejected, with the
+reason. A row already in the log (same lead, officer and time) is skipped,
+so re-importing a file is harmless.
+
+    python3 field_coverage.py                       # coverage by LGA and officer
+    python3 field_coverage.py --import field_visits.csv
+    python3 field_coverage.py --log node/318084136 --officer "A. Bello" --outcome converted
+"""
+import argparse
+import contextlib
+import sqlite3
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+import hex_grid
+import master_leads
+
+ID_COLUMN = master_leads.ID_COLUMN
+
+OUTCOMES = ["visited", "follow_up", "converted", "declined"]
+
+# Hex size of coverage_cell: the dashboard's default Hot Cells size (10 km edge)
+COVERAGE_RESOLUTION = 1
+
+IMPORT_COLUMNS = [ID_COLUMN, 'Officer', 'Visited_At', 'Outcome', 'Notes']
+REQUIRED_COLUMNS = [ID_COLUMN, 'Officer', 'Visited_At']
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS leads (osm_id TEXT PRIMARY KEY, name TEXT, lga TEXT, cell TEXT);
+CREATE INDEX IF NOT EXISTS leads_lga ON leads (lga);
+CREATE INDEX IF NOT EXISTS leads_cell ON leads (cell);
+
+CREATE TABLE IF NOT EXISTS visits (
+    id INTEGER PRIMARY KEY, osm_id TEXT NOT NULL, officer TEXT NOT NULL, visited_at TEXT NOT NULL,
+    outcome TEXT NOT NULL, notes TEXT, source TEXT, UNIQUE (osm_id, officer, visited_at));
+CREATE INDEX IF NOT EXISTS visits_officer ON visits (officer, visited_at);
+CREATE INDEX IF NOT EXISTS visits_time ON visits (visited_at);
+
+CREATE TABLE IF NOT EXISTS lead_status (
+    osm_id TEXT PRIMARY KEY, status TEXT, converted INTEGER, visits INTEGER,
+    first_visit TEXT, last_visit TEXT, last_officer TEXT);
+CREATE TABLE IF NOT EXISTS officer_leads (
+    officer TEXT, osm_id TEXT, converted INTEGER, PRIMARY KEY (officer, osm_id));
+
+CREATE TABLE IF NOT EXISTS coverage_lga (
+    lga TEXT PRIMARY KEY, leads INTEGER DEFAULT 0, visited INTEGER DEFAULT 0,
+    converted INTEGER DEFAULT 0, visits INTEGER DEFAULT 0);
+CREATE TABLE IF NOT EXISTS coverage_cell (
+    cell TEXT PRIMARY KEY, lat REAL, lon REAL, lga TEXT, leads INTEGER DEFAULT 0,
+    visited INTEGER DEFAULT 0, converted INTEGER DEFAULT 0, visits INTEGER DEFAULT 0);
+CREATE INDEX IF NOT EXISTS coverage_cell_lga ON coverage_cell (lga);
+CREATE TABLE IF NOT EXISTS coverage_officer (
+    officer TEXT PRIMARY KEY, visits INTEGER DEFAULT 0, leads INTEGER DEFAULT 0,
+    converted INTEGER DEFAULT 0, last_visit TEXT);
+
+-- Every aggregate moves with each inserted visit; "first" checks look at the
+-- status tables before they are updated at the end
+CREATE TRIGGER IF NOT EXISTS visit_added AFTER INSERT ON visits BEGIN
+    UPDATE coverage_lga SET
+        visits = visits + 1,
+        visited = visited + NOT EXISTS (SELECT 1 FROM lead_status WHERE osm_id = NEW.osm_id),
+        converted = converted + (NEW.outcome = 'converted'
+                                 AND NOT EXISTS (SELECT 1 FROM lead_status WHERE osm_id = NEW.osm_id AND converted))
+    WHERE lga = (SELECT lga FROM leads WHERE osm_id = NEW.osm_id);
+    UPDATE coverage_cell SET
+        visits = visits + 1,
+        visited = visited + NOT EXISTS (SELECT 1 FROM lead_status WHERE osm_id = NEW.osm_id),
+        converted = converted + (NEW.outcome = 'converted'
+                                 AND NOT EXISTS (SELECT 1 FROM lead_status WHERE osm_id = NEW.osm_id AND converted))
+    WHERE cell = (SELECT cell FROM leads WHERE osm_id = NEW.osm_id);
+    INSERT INTO coverage_officer (officer, visits, leads, converted, last_visit) VALUES (
+        NEW.officer, 1,
+        NOT EXISTS (SELECT 1 FROM officer_leads WHERE officer = NEW.officer AND osm_id = NEW.osm_id),
+        NEW.outcome = 'converted' AND NOT EXISTS (
+            SELECT 1 FROM officer_leads WHERE officer = NEW.officer AND osm_id = NEW.osm_id AND converted),
+        NEW.visited_at)
+    ON CONFLICT (officer) DO UPDATE SET
+        visits = visits + 1, leads = leads + excluded.leads, converted = converted + excluded.converted,
+        last_visit = max(last_visit, excluded.last_visit);
+    INSERT INTO officer_leads VALUES (NEW.officer, NEW.osm_id, NEW.outcome = 'converted')
+    ON CONFLICT (officer, osm_id) DO UPDATE SET converted = converted OR excluded.converted;
+    INSERT INTO lead_status VALUES (
+        NEW.osm_id, NEW.outcome, NEW.outcome = 'converted', 1, NEW.visited_at, NEW.visited_at, NEW.officer)
+    ON CONFLICT (osm_id) DO UPDATE SET
+        status = CASE WHEN converted OR excluded.converted THEN 'converted'
+                      WHEN excluded.last_visit >= last_visit THEN excluded.status ELSE status END,
+        converted = converted OR excluded.converted,
+        visits = visits + 1,
+        first_visit = min(first_visit, excluded.first_visit),
+        last_officer = CASE WHEN excluded.last_visit >= last_visit THEN excluded.last_officer ELSE last_officer END,
+        last_visit = max(last_visit, excluded.last_visit);
+END;
+"""
+
+# Per-area counts from the lead tables, for sync_leads() and rebuild()
+_AREA_COUNTS = """
+INSERT INTO coverage_{area} ({key}{extra_cols}, leads, visited, converted, visits)
+SELECT l.{key}{extra_select}, count(*), count(s.osm_id), coalesce(sum(s.converted), 0), coalesce(sum(s.visits), 0)
+FROM leads l LEFT JOIN lead_status s ON s.osm_id = l.osm_id
+GROUP BY l.{key}
+"""
+
+
+def _now():
+    return datetime.now(timezone.utc).strftime(TIME_FORMAT)
+
+
+def _timestamps(values):
+    """Visit times as UTC text (TIME_FORMAT), NaN where unreadable; times without a zone are taken as UTC."""
+    parsed = pd.to_datetime(pd.Series(values, dtype=object), errors='coerce', utc=True, format='mixed')
+    return parsed.dt.strftime(TIME_FORMAT).where(parsed.notna(), np.nan)
+
+
+def _outcomes(values):
+    return pd.Series(values, dtype=object).fillna("visited").astype(str).str.strip().str.lower().str.replace(" ", "_")
+
+
+def lead_cells(df):
+    """Coverage cell id of each lead, as hex_grid names cells ("1:q:r")."""
+    q, r = hex_grid.hex_cells(df['Latitude'].to_numpy(dtype=float), df['Longitude'].to_numpy(dtype=float),
+                              hex_grid.RESOLUTIONS[COVERAGE_RESOLUTION])
+    return [f"{COVERAGE_RESOLUTION}:{a}:{b}" for a, b in zip(q, r)]
+
+
+class CoverageStore:
+    """The coverage database of one region. Each call opens its own connection, so one store serves every thread."""
+
+    def __init__(self, path):
+        self.path = str(path)
+        with self._connect() as db:
+            # Readers (dashboard sessions) are not blocked by an import in progress
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(SCHEMA)
+
+    @contextlib.contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def _frame(self, query, params=(), columns=None):
+        with self._connect() as db:
+            cursor = db.execute(query, params)
+            return pd.DataFrame(cursor.fetchall(), columns=columns or [c[0] for c in cursor.description])
+
+    # --- writes -----------------------------------------------------------
+
+    def sync_leads(self, df_master):
+        """Replace the lead list with the master table's and recount leads per LGA and cell. Returns the lead count."""
+        cells = lead_cells(df_master)
+        rows = zip(df_master[ID_COLUMN].astype(str), df_master['Name'].astype(object),
+                   df_master['LGA'].astype(object), cells)
+        with self._connect() as db:
+            db.execute("DELETE FROM leads")
+            db.executemany("INSERT OR IGNORE INTO leads VALUES (?, ?, ?, ?)", rows)
+            self._recount_areas(db)
+        return len(df_master)
+
+    def _recount_areas(self, db):
+        db.execute("DELETE FROM coverage_lga")
+        db.execute(_AREA_COUNTS.format(area="lga", key="lga", extra_cols="", extra_select=""))
+        db.execute("DELETE FROM coverage_cell")
+        # Cell centre, and the LGA with most leads in the cell
+        db.execute(_AREA_COUNTS.format(
+            area="cell", key="cell", extra_cols=", lga",
+            extra_select=", (SELECT lga FROM leads WHERE cell = l.cell GROUP BY lga ORDER BY count(*) DESC, lga LIMIT 1)",
+        ))
+        cells = db.execute("SELECT cell FROM coverage_cell").fetchall()
+        if cells:
+            qr = np.array([cell.split(":")[1:] for (cell,) in cells], dtype=np.int64)
+            lat, lon = hex_grid.cell_centers(qr[:, 0], qr[:, 1], hex_grid.RESOLUTIONS[COVERAGE_RESOLUTION])
+            db.executemany("UPDATE coverage_cell SET lat = ?, lon = ? WHERE cell = ?",
+                           zip(np.round(lat, 6).tolist(), np.round(lon, 6).tolist(), [cell for (cell,) in cells]))
+
+    def log_visit(self, osm_id, officer, outcome="visited", visited_at=None, notes=None, source="dashboard"):
+        """Record one visit (now, unless `visited_at` is given). Returns False when it was already logged."""
+        added, _, rejected = self.import_visits(pd.DataFrame([{
+            ID_COLUMN: osm_id, 'Officer': officer, 'Visited_At': visited_at or _now(), 'Outcome': outcome, 'Notes': notes,
+        }]), source=source)
+        if len(rejected):
+            raise ValueError(f"Visit not logged: {rejected['Reason'].iloc[0]}")
+        return added == 1
+
+    def import_visits(self, df, source="import"):
+        """
+        Add the visits of a field frame (IMPORT_COLUMNS). Returns (visits added,
+        rows already logged, rejected rows with a Reason column).
+        """
+        columns = {str(c).strip().lower(): c for c in df.columns}
+        missing = [c for c in REQUIRED_COLUMNS if c.lower() not in columns]
+        if missing:
+            raise ValueError(f"Visit file is missing column(s): {', '.join(missing)}")
+        df = df.rename(columns={columns[c.lower()]: c for c in IMPORT_COLUMNS if c.lower() in columns})
+        df = df.reindex(columns=IMPORT_COLUMNS).reset_index(drop=True)
+
+        visits = pd.DataFrame({
+            'osm_id': df[ID_COLUMN].fillna("").astype(str).str.strip(),
+            'officer': df['Officer'].fillna("").astype(str).str.strip(),
+            'visited_at': _timestamps(df['Visited_At']),
+            'outcome': _outcomes(df['Outcome']),
+            'notes': df['Notes'].astype(object).where(df['Notes'].notna(), None),
+        })
+        with self._connect() as db:
+            known = {osm_id for (osm_id,) in db.execute("SELECT osm_id FROM leads")}
+            reason = pd.Series(None, index=df.index, dtype=object)
+            reason[~visits['outcome'].isin(OUTCOMES)] = "unknown outcome (use " + ", ".join(OUTCOMES) + ")"
+            reason[visits['visited_at'].isna()] = "unreadable Visited_At"
+            reason[visits['officer'].eq("")] = "no Officer"
+            reason[~visits['osm_id'].isin(known)] = "not a lead in the master file"
+            ok = reason.isna()
+
+            before = db.execute("SELECT count(*) FROM visits").fetchone()[0]
+            # Oldest first, so "latest outcome" is settled by the end of the batch
+            batch = visits[ok].sort_values('visited_at', kind='stable')
+            db.executemany(
+                "INSERT OR IGNORE INTO visits (osm_id, officer, visited_at, outcome, notes, source) VALUES (?, ?, ?, ?, ?, ?)",
+                ((*row, source) for row in batch.itertuples(index=False)),
+            )
+            added = db.execute("SELECT count(*) FROM visits").fetchone()[0] - before
+        rejected = df[~ok].assign(Reason=reason[~ok])
+        return added, int(ok.sum()) - added, rejected
+
+    def import_csv(self, path_or_buffer, source=None):
+        """import_visits() for a field CSV (a path or an uploaded file)."""
+        source = source or f"import:{getattr(path_or_buffer, 'name', path_or_buffer)}"
+        return self.import_visits(pd.read_csv(path_or_buffer, dtype=str), source=source)
+
+    def rebuild(self):
+        """Recompute every status and coverage table from the visit log."""
+        with self._connect() as db:
+            db.execute("DELETE FROM lead_status")
+            db.execute("""
+                INSERT INTO lead_status
+                SELECT osm_id,
+                       CASE WHEN max(outcome = 'converted') THEN 'converted' ELSE max(latest) END,
+                       max(outcome = 'converted'), count(*), min(visited_at), max(visited_at), max(latest_officer)
+                FROM (SELECT *,
+                             last_value(outcome) OVER w AS latest,
+                             last_value(officer) OVER w AS latest_officer
+                      FROM visits
+                      WINDOW w AS (PARTITION BY osm_id ORDER BY visited_at, id
+                                   ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING))
+                GROUP BY osm_id""")
+            db.execute("DELETE FROM officer_leads")
+            db.execute("""
+                INSERT INTO officer_leads
+                SELECT officer, osm_id, max(outcome = 'converted') FROM visits GROUP BY officer, osm_id""")
+            db.execute("DELETE FROM coverage_officer")
+            db.execute("""
+                INSERT INTO coverage_officer
+                SELECT v.officer, v.visits, o.leads, o.converted, v.last_visit
+                FROM (SELECT officer, count(*) AS visits, max(visited_at) AS last_visit FROM visits GROUP BY officer) v
+                JOIN (SELECT officer, count(*) AS leads, sum(converted) AS converted
+                      FROM officer_leads GROUP BY officer) o ON o.officer = v.officer""")
+            self._recount_areas(db)
+
+    # --- reads ------------------------------------------------------------
+
+    def totals(self, lgas=None):
+        """{"leads", "visited", "converted", "pending", "visits"} over all LGAs, or the given ones."""
+        by_lga = self.by_lga(lgas)
+        totals = {key: int(by_lga[column].sum()) for key, column in
+                  [("leads", 'Leads'), ("visited", 'Visited'), ("converted", 'Converted'), ("visits", 'Visits')]}
+        totals["pending"] = totals["leads"] - totals["visited"]
+        return totals
+
+    @staticmethod
+    def _with_rates(df):
+        df['Pending'] = df['Leads'] - df['Visited']
+        df['Coverage_Pct'] = np.round(100 * df['Visited'] / df['Leads'].where(df['Leads'] > 0), 1).fillna(0.0)
+        return df
+
+    @staticmethod
+    def _where_lga(lgas):
+        if not lgas:
+            return "", ()
+        return f" WHERE lga IN ({', '.join('?' * len(lgas))})", tuple(lgas)
+
+    def by_lga(self, lgas=None):
+        """Leads, Visited, Converted, Visits, Pending and Coverage_Pct per LGA."""
+        where, params = self._where_lga(lgas)
+        return self._with_rates(self._frame(
+            f"SELECT lga, leads, visited, converted, visits FROM coverage_lga{where} ORDER BY lga", params,
+            ['LGA', 'Leads', 'Visited', 'Converted', 'Visits']))
+
+    def by_cell(self, lgas=None):
+        """The same per coverage cell (with its centre and main LGA), most pending leads first."""
+        where, params = self._where_lga(lgas)
+        cells = self._with_rates(self._frame(
+            f"SELECT cell, lat, lon, lga, leads, visited, converted, visits FROM coverage_cell{where}", params,
+            ['Cell', 'Latitude', 'Longitude', 'Top_LGA', 'Leads', 'Visited', 'Converted', 'Visits']))
+        return cells.sort_values(['Pending', 'Leads'], ascending=False, kind='stable').reset_index(drop=True)
+
+    def by_officer(self):
+        """Visits, distinct leads visited, leads converted and the last visit per officer, busiest first."""
+        return self._frame(
+            "SELECT officer, visits, leads, converted, last_visit FROM coverage_officer ORDER BY visits DESC, officer",
+            columns=['Officer', 'Visits', 'Leads_Visited', 'Converted', 'Last_Visit'])
+
+    def lead_status(self):
+        """Status, visit count, last visit and last officer of every visited lead."""
+        return self._frame(
+            "SELECT osm_id, status, visits, last_visit, last_officer FROM lead_status",
+            columns=[ID_COLUMN, 'Field_Status', 'Visits', 'Last_Visit', 'Last_Officer'])
+
+    def recent_visits(self, limit=20):
+        """The latest visits, with lead names."""
+        return self._frame(
+            "SELECT v.visited_at, v.officer, l.name, l.lga, v.outcome, v.notes, v.source FROM visits v "
+            "LEFT JOIN leads l ON l.osm_id = v.osm_id ORDER BY v.visited_at DESC, v.id DESC LIMIT ?", (int(limit),),
+            ['Visited_At', 'Officer', 'Name', 'LGA', 'Outcome', 'Notes', 'Source'])
+
+
+def main():
+    import region_config
+
+    parser = argparse.ArgumentParser(description="Field coverage: log visits, import field CSVs, report coverage.")
+    parser.add_argument("--region", default=region_config.DEFAULT_REGION, help="Region config name.")
+    parser.add_argument("--import", dest="import_file", default=None, metavar="CSV",
+                        help="Field visits to add (OSM_ID, Officer, Visited_At[, Outcome, Notes]).")
+    parser.add_argument("--log", default=None, metavar="OSM_ID", help="Log one visit to this lead.")
+    parser.add_argument("--officer", default=None, help="Officer of the --log visit.")
+    parser.add_argument("--outcome", default="visited", choices=OUTCOMES, help="Outcome of the --log visit.")
+    parser.add_argument("--notes", default=None, help="Notes of the --log visit.")
+    parser.add_argument("--rebuild", action="store_true", help="Recompute all coverage tables from the visit log.")
+    args = parser.parse_args()
+
+    region = region_config.load_region(args.region)
+    store = CoverageStore(region.coverage_file)
+    leads = store.sync_leads(master_leads.load_master(region.master_file, region.master_parquet))
+    print(f"{leads:,} leads in {region.master_file} -> {region.coverage_file}")
+
+    if args.rebuild:
+        store.rebuild()
+        print("Coverage tables rebuilt from the visit log.")
+    if args.log:
+        if not args.officer:
+            parser.error("--log needs --officer")
+        added = store.log_visit(args.log, args.officer, args.outcome, notes=args.notes, source="cli")
+        print("Visit logged." if added else "Visit was already logged.")
+    if args.import_file:
+        added, duplicates, rejected = store.import_csv(args.import_file)
+        print(f"{added:,} visits added, {duplicates:,} already logged, {len(rejected):,} rejected")
+        if len(rejected):
+            print(rejected.to_string(index=False))
+
+    totals = store.totals()
+    print(f"--- COVERAGE: {totals['visited']:,} of {totals['leads']:,} leads visited, {totals['converted']:,} converted, "
+          f"{totals['pending']:,} pending ({totals['visits']:,} visits) ---")
+    print(store.by_lga().to_string(index=False))
+    officers = store.by_officer()
+    if len(officers):
+        print(officers.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Hex-grid market-potential aggregation.
+
+Leads are binned into pointy-top hexagons of fixed size (RESOLUTIONS, edge
+length in km) with plain array arithmetic: project to km, convert to axial
+hex coordinates, round in cube space, then one groupby per resolution. Each
+cell gets:
+
+- Leads, Settlements, Commercial and Tier1 counts (category mix),
+- Score_Sum: the sum of Market_Score,
+- Pop_Share: the part of its LGA's official population the cell stands for
+  (each lead carries LGA_Actual_Pop / leads in that LGA),
+- Potential: 0-100, POTENTIAL_WEIGHTS of Score_Sum and Pop_Share, each
+  scaled to the best cell at that resolution,
+- Top_LGA and the cell centre.
+
+Cells are identified by (resolution, q, r), so the same place lands in the
+same cell whatever filter produced the frame. The frames are small (one row
+per occupied cell) and the dashboard memoizes them per filter.
+
+    cells = hex_grid.aggregate(df, resolution=1)
+    cells.head(20)   # hot cells, best first
+"""
+import numpy as np
+import pandas as pd
+
+import spatial_index
+
+# Edge length (km) per resolution, coarse to fine
+RESOLUTIONS = [25.0, 10.0, 4.0, 1.5]
+
+# Map zoom at which each resolution takes over
+ZOOM_BREAKS = [8, 10, 12]
+
+# Cell sizes are exact at this latitude (the middle of Nigeria), within ~3% across the country
+REFERENCE_LAT = 8.0
+
+POTENTIAL_WEIGHTS = {"Score_Sum": 0.6, "Pop_Share": 0.4}
+
+CELL_COLUMNS = ['Cell', 'Latitude', 'Longitude', 'Leads', 'Settlements', 'Commercial', 'Tier1',
+                'Score_Sum', 'Pop_Share', 'Potential', 'Top_LGA']
+
+_SQRT3 = np.sqrt(3.0)
+_KM_PER_DEG_LON = spatial_index.KM_PER_DEGREE * np.cos(np.radians(REFERENCE_LAT))
+
+
+def resolution_for_zoom(zoom):
+    """Coarsest cells when zoomed out, finest when zoomed in."""
+    return int(np.searchsorted(ZOOM_BREAKS, zoom, side="right"))
+
+
+def hex_cells(lat, lon, edge_km):
+    """Axial (q, r) of the hexagon holding each point."""
+    x = np.asarray(lon, dtype=float) * _KM_PER_DEG_LON / edge_km
+    y = np.asarray(lat, dtype=float) * spatial_index.KM_PER_DEGREE / edge_km
+    q = _SQRT3 / 3 * x - y / 3
+    r = 2 / 3 * y
+    # Cube rounding: round all three, then fix the one that moved most
+    s = -q - r
+    rq, rr, rs = np.round(q), np.round(r), np.round(s)
+    dq, dr, ds = np.abs(rq - q), np.abs(rr - r), np.abs(rs - s)
+    fix_q = (dq > dr) & (dq > ds)
+    fix_r = ~fix_q & (dr > ds)
+    rq = np.where(fix_q, -rr - rs, rq)
+    rr = np.where(fix_r, -rq - rs, rr)
+    return rq.astype(np.int64), rr.astype(np.int64)
+
+
+def cell_centers(q, r, edge_km):
+    """(lat, lon) of the centre of each hexagon."""
+    x = edge_km * _SQRT3 * (np.asarray(q) + np.asarray(r) / 2)
+    y = edge_km * 1.5 * np.asarray(r)
+    return y / spatial_index.KM_PER_DEGREE, x / _KM_PER_DEG_LON
+
+
+def cell_polygons(q, r, edge_km):
+    """(n, 7, 2) closed rings of [lon, lat] corners, ready for GeoJSON."""
+    lat, lon = cell_centers(q, r, edge_km)
+    angles = np.radians(30 + 60 * np.arange(7))
+    corner_lon = lon[:, None] + edge_km * np.cos(angles)[None, :] / _KM_PER_DEG_LON
+    corner_lat = lat[:, None] + edge_km * np.sin(angles)[None, :] / spatial_index.KM_PER_DEGREE
+    return np.stack([corner_lon, corner_lat], axis=-1)
+
+
+def _scaled(values):
+    top = values.max() if len(values) else 0
+    return values / top if top > 0 else values * 0.0
+
+
+def aggregate(df, resolution=1):
+    """One row per occupied cell at `resolution` (index into RESOLUTIONS), highest Potential first."""
+    if df.empty:
+        return pd.DataFrame(columns=CELL_COLUMNS)
+    edge_km = RESOLUTIONS[resolution]
+    q, r = hex_cells(df['Latitude'].to_numpy(dtype=float), df['Longitude'].to_numpy(dtype=float), edge_km)
+
+    lga = df['LGA'].astype(object).astype(str).to_numpy()
+    leads_per_lga = pd.Series(lga).map(pd.Series(lga).value_counts()).to_numpy()
+    leads = pd.DataFrame({
+        'q': q,
+        'r': r,
+        'LGA': lga,
+        'Settlement': (df['Category'].astype(object) == 'Settlement').to_numpy(),
+        'Tier1': (df['Priority_Tier'].to_numpy() == 1),
+        'Score': df['Market_Score'].to_numpy(dtype=float),
+        'Pop': df['LGA_Actual_Pop'].to_numpy(dtype=float) / leads_per_lga,
+    })
+    grouped = leads.groupby(['q', 'r'], sort=False)
+    cells = grouped.agg(Leads=('Score', 'size'), Settlements=('Settlement', 'sum'), Tier1=('Tier1', 'sum'),
+                        Score_Sum=('Score', 'sum'), Pop_Share=('Pop', 'sum'))
+    top_lga = (leads.groupby(['q', 'r', 'LGA'], sort=False).size().rename('n').reset_index()
+               .sort_values(['n', 'LGA'], ascending=[False, True]).drop_duplicates(['q', 'r'])
+               .set_index(['q', 'r'])['LGA'])
+    cells['Top_LGA'] = top_lga.reindex(cells.index).to_numpy()
+    cells = cells.reset_index()
+
+    cells['Commercial'] = cells['Leads'] - cells['Settlements']
+    cells['Potential'] = np.round(100 * sum(
+        weight * _scaled(cells[column].astype(float)) for column, weight in POTENTIAL_WEIGHTS.items()
+    ), 1)
+    cells['Latitude'], cells['Longitude'] = cell_centers(cells['q'].to_numpy(), cells['r'].to_numpy(), edge_km)
+    cells['Pop_Share'] = cells['Pop_Share'].round().astype(np.int64)
+    cells['Cell'] = [f"{resolution}:{a}:{b}" for a, b in zip(cells['q'], cells['r'])]
+    cells = cells.sort_values(['Potential', 'Leads'], ascending=False, kind='stable').reset_index(drop=True)
+    return cells[CELL_COLUMNS + ['q', 'r']]
+
+
+def aggregate_all(df):
+    """aggregate() at every resolution: {resolution: cells}."""
+    return {resolution: aggregate(df, resolution) for resolution in range(len(RESOLUTIONS))}
+
+
+def to_geojson(cells, resolution):
+    """The cells as a GeoJSON FeatureCollection of hexagons carrying the cell columns."""
+    rings = cell_polygons(cells['q'].to_numpy(), cells['r'].to_numpy(), RESOLUTIONS[resolution]).round(6)
+    properties = cells[CELL_COLUMNS].to_dict(orient='records')
+    return {
+        "type": "FeatureCollection",
+        "features": [
+            {"type": "Feature", "properties": props, "geometry": {"type": "Polygon", "coordinates": [ring.tolist()]}}
+            for props, ring in zip(properties, rings)
+        ],
+    }
@@ -0,0 +1,358 @@
+"""
+Read-only HTTP API over the master leads, for field clients on slow connections.
+
+    python3 leads_api.py --host 0.0.0.0 --port 8080
+
+The master file is loaded on first use (like the dashboard's load_data, with
+road minutes when the travel-time matrix exists); until it can be loaded,
+every endpoint answers 503. Each lead's JSON and GeoJSON
+text is rendered up front, with row lists per LGA, Category and
+Priority_Tier, so a query is a few array intersections and a string join.
+The server re-reads the files when a merge rewrites them.
+
+    GET /leads?lga=Okene,Adavi&category=Education&priority=1&page=2&per_page=100
+    GET /leads?format=geojson&lga=Lokoja
+    GET /lgas                  LGAs with their lead count and bundle ETag
+    GET /bundle/Okene          every lead of one LGA, compact, for offline sync
+    GET /health
+
+Responses are gzip- or brotli-compressed (brotli when the package is
+installed and the client accepts it) and carry an ETag. A client that sends
+it back in If-None-Match gets an empty 304 while the data is unchanged. A
+bundle's ETag depends only on its own LGA, so a sync client only
+re-downloads the LGAs a merge actually changed. Encoded answers are kept
+in a view_cache.ViewCache.
+
+Load test: benchmarks/bench_api.py.
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import numpy as np
+import pandas as pd
+
+import master_leads
+import region_config
+import travel_times
+import view_cache
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+ID_COLUMN = master_leads.ID_COLUMN
+
+# Lead fields served, in order; the optional ones when the master file has them
+FIELDS = [ID_COLUMN, 'Name', 'Category', 'Type', 'LGA', 'Priority_Tier', 'Tentative_Population', 'Market_Score',
+          'Latitude', 'Longitude']
+OPTIONAL_FIELDS = ['Population_Estimate', 'Nearest_Branch', 'Branch_Drive_Min']
+
+# Query parameter -> indexed column
+FILTERS = {'lga': 'LGA', 'category': 'Category', 'priority': 'Priority_Tier'}
+
+DEFAULT_PER_PAGE = 100
+MAX_PER_PAGE = 1000
+
+# Smaller answers are sent as they are
+MIN_COMPRESS_BYTES = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# How often a request may check whether the master files changed
+RELOAD_CHECK_S = 5.0
+
+CACHE_ENTRIES = 256
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def _json(value):
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+
+def _etag(*parts):
+    return 'W/"' + hashlib.sha1("|".join(map(str, parts)).encode("utf-8")).hexdigest()[:20] + '"'
+
+
+def _plain(value):
+    """JSON-ready scalar: numpy types unwrapped, NaN as null."""
+    if isinstance(value, np.generic):
+        value = value.item()
+    if value is pd.NA or (isinstance(value, float) and math.isnan(value)):
+        return None
+    return value
+
+
+class LeadsIndex:
+    """The leads of one master-file version, pre-rendered, with row lists per filter value."""
+
+    def __init__(self, df, version):
+        self.version = version
+        self.fields = [c for c in FIELDS + OPTIONAL_FIELDS if c in df.columns]
+        df = df.reset_index(drop=True)
+        df = df.assign(Latitude=df['Latitude'].astype(float).round(6), Longitude=df['Longitude'].astype(float).round(6))
+        self.rows = [[_plain(value) for value in row] for row in df[self.fields].itertuples(index=False)]
+        self.lead_json, self.lead_geojson = [], []
+        for row in self.rows:
+            lead = dict(zip(self.fields, row))
+            self.lead_json.append(_json(lead))
+            point = [lead.pop('Longitude'), lead.pop('Latitude')]
+            self.lead_geojson.append(_json({"type": "Feature", "geometry": {"type": "Point", "coordinates": point},
+                                            "properties": lead}))
+        # value (as text) -> sorted row positions
+        self.index = {param: {str(_plain(value)): np.sort(np.asarray(rows))
+                              for value, rows in df.groupby(column, observed=True, sort=True).indices.items()}
+                      for param, column in FILTERS.items()}
+        self.bundles = {}
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.rows)
+
+    def select(self, filters):
+        """Row positions matching every filter (any of the values given for each), in master order."""
+        selected = None
+        for param, values in filters.items():
+            rows = [self.index[param].get(value) for value in values]
+            rows = np.unique(np.concatenate([r for r in rows if r is not None] or [np.empty(0, dtype=np.int64)]))
+            selected = rows if selected is None else np.intersect1d(selected, rows, assume_unique=True)
+        return np.arange(len(self.rows)) if selected is None else selected
+
+    def page(self, filters, page, per_page, fmt):
+        """One page of the filtered leads as JSON text (a FeatureCollection for fmt="geojson")."""
+        rows = self.select(filters)
+        total = len(rows)
+        head = {"version": self.version, "total": total, "page": page, "per_page": per_page,
+                "pages": max(math.ceil(total / per_page), 1)}
+        chosen = rows[(page - 1) * per_page:page * per_page]
+        if fmt == "geojson":
+            items = ",".join(self.lead_geojson[i] for i in chosen)
+            return '{"type":"FeatureCollection",' + _json(head)[1:-1] + ',"features":[' + items + ']}'
+        return _json(head)[:-1] + ',"leads":[' + ",".join(self.lead_json[i] for i in chosen) + ']}'
+
+    def bundle(self, lga):
+        """(JSON text, ETag) of one LGA's leads as field names plus value rows; None for an unknown LGA."""
+        rows = self.index['lga'].get(lga)
+        if rows is None:
+            return None
+        with self.lock:
+            if lga not in self.bundles:
+                body = _json({"lga": lga, "count": len(rows), "fields": self.fields,
+                              "rows": [self.rows[i] for i in rows]})
+                self.bundles[lga] = (body, _etag(body))
+            return self.bundles[lga]
+
+    def lgas(self):
+        return [{"lga": lga, "leads": len(rows), "etag": self.bundle(lga)[1]} for lga, rows in self.index['lga'].items()]
+
+
+class LeadsService:
+    """The current LeadsIndex of a region, reloaded when the master files change."""
+
+    def __init__(self, region):
+        self.region = region
+        self.lock = threading.Lock()
+        self.checked = 0.0
+        self.data_version = None
+        self.index = None
+        self.cache = view_cache.ViewCache(max_entries=CACHE_ENTRIES)
+
+    def _files_version(self):
+        region = self.region
+        return (master_leads.data_version(region.master_file, region.master_parquet)
+                + travel_times.data_version(region.matrix_file, region.index_file))
+
+    def current(self):
+        """The index, reloaded first when the files changed since the last check (at most every RELOAD_CHECK_S)."""
+        now = time.monotonic()
+        if self.index is not None and now - self.checked < RELOAD_CHECK_S:
+            return self.index
+        with self.lock:
+            if self.index is not None and now - self.checked < RELOAD_CHECK_S:
+                return self.index
+            version = self._files_version()
+            if version != self.data_version:
+                region = self.region
+                df = master_leads.load_master(region.master_file, region.master_parquet)
+                df = travel_times.add_branch_minutes(df, travel_times.load(region.matrix_file, region.index_file))
+                self.index = LeadsIndex(df, hashlib.sha1(repr(version).encode("utf-8")).hexdigest()[:12])
+                self.data_version = version
+                self.cache.clear()
+                print(f"Loaded {len(self.index):,} leads from {region.master_file} (version {self.index.version})")
+            self.checked = now
+            return self.index
+
+
+def parse_leads_query(query):
+    """(filters, page, per_page, format) from a /leads query string, checked."""
+    params = parse_qs(query, keep_blank_values=False)
+    unknown = set(params) - set(FILTERS) - {'page', 'per_page', 'format'}
+    if unknown:
+        raise BadRequest(f"unknown parameter(s): {', '.join(sorted(unknown))}")
+    filters = {}
+    for param in FILTERS:
+        values = sorted({v.strip() for raw in params.get(param, []) for v in raw.split(",") if v.strip()})
+        if values:
+            filters[param] = tuple(values)
+    try:
+        page = int(params.get('page', ['1'])[-1])
+        per_page = int(params.get('per_page', [str(DEFAULT_PER_PAGE)])[-1])
+    except ValueError:
+        raise BadRequest("page and per_page must be whole numbers") from None
+    if page < 1 or not 1 <= per_page <= MAX_PER_PAGE:
+        raise BadRequest(f"page must be >= 1 and per_page between 1 and {MAX_PER_PAGE}")
+    fmt = params.get('format', ['json'])[-1]
+    if fmt not in ('json', 'geojson'):
+        raise BadRequest("format must be json or geojson")
+    return filters, page, per_page, fmt
+
+
+def choose_encoding(accept_encoding):
+    """"br", "gzip" or None for an Accept-Encoding header."""
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            accepted[name.strip().lower()] = q
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+def encode(text, encoding):
+    data = text.encode("utf-8")
+    if encoding is None or len(data) < MIN_COMPRESS_BYTES:
+        return data, None
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY), "br"
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0), "gzip"
+
+
+class LeadsHandler(BaseHTTPRequestHandler):
+    # Keep-alive: a phone on a slow link should not pay a new handshake per page
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out as separate writes; with Nagle on, the body waits for
+    # the client's delayed ACK (~40 ms per keep-alive response)
+    disable_nagle_algorithm = True
+    service = None  # LeadsService, set in main()
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _send(self, status, payload=b"", content_type="application/json; charset=utf-8", etag=None, encoding=None):
+        self.send_response(status)
+        if status != 304:
+            self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.send_header("Vary", "Accept-Encoding")
+        self.send_header("Cache-Control", "no-cache")
+        if etag:
+            self.send_header("ETag", etag)
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _error(self, status, message):
+        self._send(status, _json({"error": message}).encode("utf-8"))
+
+    def _not_modified(self, etag):
+        tags = [tag.strip() for tag in self.headers.get("If-None-Match", "").split(",")]
+        # Weak comparison: W/"x" and "x" are the same tag
+        return "*" in tags or etag.removeprefix("W/") in [tag.removeprefix("W/") for tag in tags]
+
+    def _reply(self, kind, key, etag, build, content_type="application/json"):
+        """304 when the client has `etag`, else the text from build(), encoded and memoized per encoding."""
+        if self._not_modified(etag):
+            return self._send(304, etag=etag)
+        encoding = choose_encoding(self.headers.get("Accept-Encoding"))
+        payload, used = self.service.cache.get(kind, (key, encoding), lambda: encode(build(), encoding))
+        self._send(200, payload, f"{content_type}; charset=utf-8", etag, used)
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        path = parts.path.rstrip("/") or "/"
+        try:
+            index = self.service.current()
+            if path == "/leads":
+                filters, page, per_page, fmt = parse_leads_query(parts.query)
+                key = (tuple(sorted(filters.items())), page, per_page, fmt)
+                return self._reply("leads", (index.version, key), _etag(index.version, key),
+                                   lambda: index.page(filters, page, per_page, fmt),
+                                   "application/geo+json" if fmt == "geojson" else "application/json")
+            if path.startswith("/bundle/"):
+                lga = unquote(path[len("/bundle/"):])
+                bundle = index.bundle(lga)
+                if bundle is None:
+                    return self._error(404, f"no leads for LGA {lga!r}")
+                body, etag = bundle
+                return self._reply("bundle", (index.version, lga), etag, lambda: body)
+            if path == "/lgas":
+                return self._reply("lgas", index.version, _etag(index.version, "lgas"),
+                                   lambda: _json({"version": index.version, "lgas": index.lgas()}))
+            if path == "/health":
+                return self._send(200, _json({"status": "ok", "region": self.service.region.name,
+                                              "leads": len(index), "version": index.version}).encode("utf-8"))
+            return self._error(404, "unknown endpoint (try /leads, /lgas, /bundle/<LGA>, /health)")
+        except BadRequest as e:
+            return self._error(400, str(e))
+        except FileNotFoundError as e:
+            return self._error(503, f"no master file yet: {e}")
+        except (BrokenPipeError, ConnectionResetError):
+            raise  # the client is gone, there is nobody to answer
+        except Exception as e:
+            # e.g. a master file caught half-written by a merge; the next request reloads it
+            print(f"Error serving {self.path}: {type(e).__name__}: {e}")
+            return self._error(503, f"leads unavailable: {type(e).__name__}: {e}")
+
+
+class LeadsServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Room for bursts of new connections from many clients at once
+    request_queue_size = 128
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the master leads as a read-only JSON/GeoJSON API.")
+    parser.add_argument("--region", default=region_config.DEFAULT_REGION, help="Region config name.")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (0.0.0.0 for every interface).")
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args()
+
+    LeadsHandler.service = LeadsService(region_config.load_region(args.region))
+    try:
+        # Load up front so the first client does not wait; a missing file is not fatal
+        LeadsHandler.service.current()
+    except Exception as e:
+        print(f"No leads loaded yet ({type(e).__name__}: {e}); answering 503 until the master file can be read")
+    server = LeadsServer((args.host, args.port), LeadsHandler)
+    print(f"--- LEADS API ON http://{args.host}:{args.port} "
+          f"(compression: {'brotli, gzip' if brotli is not None else 'gzip'}) ---")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
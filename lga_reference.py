@@ -0,0 +1,28 @@
+"""
+Reference data for Kogi State's 21 LGAs, shared by the merge step and the dashboard.
+
+The data itself (official populations, viability tiers, branch locations)
+lives in the region config, regions/kogi.json (see region_config.py); other
+states get their own config next to it.
+"""
+import region_config
+
+REGION = region_config.load_region(region_config.DEFAULT_REGION)
+
+STATE_NAME = REGION.state
+
+# ------------------------------------------------------
+# OFFICIAL KOGI STATE POPULATION DATA & VIABILITY TIERS
+# ------------------------------------------------------
+LGA_DATA = REGION.lga_data
+
+
+def lga_table():
+    """LGA_DATA as a frame (LGA, LGA_Actual_Pop, Viability_Tier, LGA_Desc) for joins."""
+    return REGION.lga_table()
+
+
+# Start points for proximity search and route planning: (latitude, longitude)
+# of the town centres the field teams leave from. Swap in exact branch
+# coordinates where they differ (in the region config).
+BRANCHES = REGION.branches
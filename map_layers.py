@@ -0,0 +1,310 @@
+"""
+Lead layers for the COMMAND MAP tab.
+
+The map used to get one folium.Marker (with its own Icon and a full HTML
+Popup string) per target, so the page grew by ~2 kB per lead and every
+rerun shipped all of it again. Here the leads go out as one compact array:
+
+- up to `client_limit` points: a FastMarkerCluster whose JavaScript callback
+  builds each marker in the browser; the popup HTML is only templated when
+  a marker is clicked. Repeated text (type, LGA, estimate) is sent once in
+  lookup tables and referenced by index, and the navigation link is rebuilt
+  from the coordinates.
+- above that: server-side grid clustering for the current zoom and
+  viewport (what st_folium last reported), so the browser receives at most
+  a few hundred bubbles however many leads are selected. Cells holding a
+  single lead are still drawn as normal markers.
+
+add_route_layer draws a planned field route (route_planner.py) on top, and
+add_hex_layer a market-potential choropleth of hex_grid cells.
+"""
+import json
+
+import branca
+import folium
+import numpy as np
+import pandas as pd
+from folium.map import Layer
+from folium.plugins import FastMarkerCluster
+from folium.template import Template
+
+import hex_grid
+import master_leads
+
+# Switch to server-side clustering above this many points
+DEFAULT_CLIENT_LIMIT = 5000
+
+# Size of a server-side cluster cell on screen, in pixels
+CLUSTER_CELL_PX = 80
+
+# (color, icon) per marker style, in the order the old if-chain tested them
+MARKER_STYLES = [
+    ("red", "shopping-cart"),     # Markets/Comm.
+    ("green", "book"),            # Education
+    ("purple", "bell"),           # Religious
+    ("blue", "home"),             # Settlements
+    ("darkblue", "briefcase"),    # Financial
+    ("gray", "info-sign"),        # Other
+]
+
+_POPUP_JS = """
+function escapeHtml(text) {
+    return String(text).replace(/[&<>"']/g, function (c) {
+        return {"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "'": "&#39;"}[c];
+    });
+}
+
+function leadPopup(row, color, icon) {
+    var link = NAV_PREFIX + row[0] + "," + row[1];
+    return "<div style='font-family: \\"Segoe UI\\", sans-serif; width: 250px; border-radius: 8px; overflow: hidden; box-shadow: 0 2px 5px rgba(0,0,0,0.3);'>"
+        + "<div style='background-color: " + color + "; color: white; padding: 10px; font-weight: bold; font-size: 14px;'>"
+        + "<i class='fa fa-" + icon + "'></i> " + escapeHtml(row[2]) + "</div>"
+        + "<div style='padding: 15px; background-color: #fff; color: #333;'>"
+        + "<p style='margin: 5px 0; font-size: 13px;'><b>📍 LGA:</b> " + escapeHtml(LGAS[row[5]]) + " (" + escapeHtml(TIERS[row[5]]) + ")</p>"
+        + "<p style='margin: 5px 0; font-size: 13px;'><b>🏢 Type:</b> " + escapeHtml(TYPES[row[4]]) + "</p>"
+        + "<p style='margin: 5px 0; font-size: 13px;'><b>👥 Estimate:</b> " + escapeHtml(ESTIMATES[row[6]]) + "</p>"
+        + "<hr style='margin: 10px 0; border: 0; border-top: 1px solid #eee;'>"
+        + "<a href='" + link + "' target='_blank' style='text-decoration:none;'>"
+        + "<button style='width:100%; background-color:" + color + "; color:white; border:none; padding: 10px; border-radius: 4px; cursor:pointer; font-weight: bold; font-size: 13px;'>"
+        + "<i class='fa fa-location-arrow'></i> NAVIGATE HERE</button></a></div></div>";
+}
+
+function leadMarker(row) {
+    var style = STYLES[row[3]];
+    var marker = L.marker([row[0], row[1]], {
+        icon: L.AwesomeMarkers.icon({icon: style[1], markerColor: style[0], prefix: "fa"})
+    });
+    marker.bindTooltip(escapeHtml(row[2]) + " | " + escapeHtml(TYPES[row[4]]));
+    // Popup HTML is built on click, not for every lead up front
+    marker.bindPopup(function () { return leadPopup(row, style[0], style[1]); }, {maxWidth: 300});
+    return marker;
+}
+"""
+
+_BUBBLE_JS = """
+function clusterBubble(row) {
+    var count = row[2];
+    var size = Math.round(28 + 10 * Math.log10(count));
+    var bubble = L.marker([row[0], row[1]], {
+        icon: L.divIcon({
+            html: "<div style='width:" + size + "px;height:" + size + "px;line-height:" + size + "px;"
+                + "border-radius:50%;background:" + STYLES[row[3]][0] + ";opacity:0.85;color:white;"
+                + "text-align:center;font-weight:bold;font-size:12px;'>" + count + "</div>",
+            className: "", iconSize: [size, size]
+        })
+    });
+    bubble.bindTooltip(count + " targets - zoom in for detail");
+    return bubble;
+}
+"""
+
+
+class PointLayer(Layer):
+    """A plain (unclustered) layer of markers built in the browser by a JS callback, one per data row."""
+
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+            var {{ this.get_name() }} = (function(){
+                {{ this.callback }}
+                var data = {{ this.data|tojson }};
+                var layer = L.featureGroup();
+                for (var i = 0; i < data.length; i++) {
+                    callback(data[i]).addTo(layer);
+                }
+                layer.addTo({{ this._parent.get_name() }});
+                return layer;
+            })();
+        {% endmacro %}
+    """)
+
+    def __init__(self, data, callback, name=None, overlay=True, control=True, show=True):
+        super().__init__(name=name, overlay=overlay, control=control, show=show)
+        self._name = "PointLayer"
+        self.data = data
+        # Same convention as FastMarkerCluster: `callback` is a JS expression
+        self.callback = f"var callback = {callback};"
+
+
+def marker_styles(df):
+    """Index into MARKER_STYLES per row, same precedence as the old per-marker if-chain."""
+    type_text = df['Type'].astype(object).astype(str)
+    category = df['Category'].astype(object).astype(str)
+    conditions = [
+        type_text.str.contains("Market|Shop").to_numpy(),
+        type_text.str.contains("School|College").to_numpy(),
+        category.str.contains("Relig", regex=False).to_numpy(),
+        (category == "Settlement").to_numpy(),
+        type_text.str.contains("Bank|Finance").to_numpy(),
+    ]
+    return np.select(conditions, range(len(conditions)), default=len(conditions)).astype(int)
+
+
+def _codes(values):
+    codes, uniques = pd.factorize(values.astype(object).astype(str))
+    return codes, list(uniques)
+
+
+def _coordinates(df):
+    """
+    Full-precision (lat, lon) lists. The typed master keeps float32 coordinates,
+    so they are read back from the stored navigation link when there is one;
+    the rebuilt link in the browser then matches Navigation_Link exactly.
+    """
+    if 'Navigation_Link' in df.columns:
+        query = df['Navigation_Link'].astype(str).str.slice(len(master_leads.NAV_PREFIX)).str.split(",", n=1, expand=True)
+        if query.shape[1] == 2:
+            return (pd.to_numeric(query[0], errors='coerce').tolist(),
+                    pd.to_numeric(query[1], errors='coerce').tolist())
+    return df['Latitude'].astype(float).tolist(), df['Longitude'].astype(float).tolist()
+
+
+def _lead_rows(df, styles, lga_codes, type_codes, est_codes):
+    lat, lon = _coordinates(df)
+    return [
+        [lat, lon, name, style, t, lga, est]
+        for lat, lon, name, style, t, lga, est in zip(
+            lat, lon, df['Name'].astype(object).astype(str).tolist(), styles.tolist(),
+            type_codes.tolist(), lga_codes.tolist(), est_codes.tolist(),
+        )
+    ]
+
+
+def _tables_js(df, lgas, types, estimates):
+    """Lookup tables the JS callbacks index into, sent once per layer."""
+    first = df.drop_duplicates('LGA')
+    tier_by_lga = dict(zip(first['LGA'].astype(object).astype(str), first['Viability_Tier'].astype(object)))
+    tiers = [str(tier_by_lga.get(lga, 'N/A')) for lga in lgas]
+    return (
+        f"var NAV_PREFIX = {json.dumps(master_leads.NAV_PREFIX)};\n"
+        f"var STYLES = {json.dumps(MARKER_STYLES)};\n"
+        f"var LGAS = {json.dumps(lgas)};\n"
+        f"var TIERS = {json.dumps(tiers)};\n"
+        f"var TYPES = {json.dumps(types)};\n"
+        f"var ESTIMATES = {json.dumps(estimates)};\n"
+    )
+
+
+def _callback(tables, functions, name):
+    """A JS expression evaluating to the callback `name`, with its tables in a closure."""
+    return f"(function () {{\n{tables}{functions}\nreturn {name};\n}})()"
+
+
+def grid_clusters(df, styles, zoom, bounds=None):
+    """
+    Aggregate leads into square cells of ~CLUSTER_CELL_PX screen pixels at `zoom`.
+
+    Only leads inside `bounds` ((south, west), (north, east)), padded by one
+    cell, are kept. Returns (clusters, singles): clusters have lat, lon,
+    count and the most common marker style; singles are the row positions of
+    leads that are alone in their cell.
+    """
+    cell = CLUSTER_CELL_PX * 360.0 / (256 * 2 ** zoom)
+    lat = df['Latitude'].to_numpy(dtype=float)
+    lon = df['Longitude'].to_numpy(dtype=float)
+    keep = np.ones(len(df), dtype=bool)
+    if bounds is not None:
+        (south, west), (north, east) = bounds
+        keep = (lat >= south - cell) & (lat <= north + cell) & (lon >= west - cell) & (lon <= east + cell)
+
+    cells = pd.DataFrame({
+        "row": np.flatnonzero(keep),
+        "cy": np.floor(lat[keep] / cell).astype(np.int64),
+        "cx": np.floor(lon[keep] / cell).astype(np.int64),
+        "lat": lat[keep],
+        "lon": lon[keep],
+        "style": styles[keep],
+    })
+    grouped = cells.groupby(["cy", "cx"], sort=False)
+    summary = grouped.agg(lat=("lat", "mean"), lon=("lon", "mean"), count=("row", "size"), first=("row", "first"))
+    dominant = (cells.groupby(["cy", "cx", "style"], sort=False).size().rename("n").reset_index()
+                .sort_values(["n", "style"], ascending=[False, True]).drop_duplicates(["cy", "cx"])
+                .set_index(["cy", "cx"])["style"])
+    summary["style"] = dominant.reindex(summary.index).to_numpy()
+
+    singles = summary.loc[summary["count"] == 1, "first"].to_numpy()
+    clusters = summary[summary["count"] > 1].reset_index(drop=True)[["lat", "lon", "count", "style"]]
+    return clusters, singles
+
+
+def add_lead_layer(m, df, client_limit=DEFAULT_CLIENT_LIMIT, zoom=9, bounds=None, name="Target Clusters"):
+    """
+    Add the leads of `df` to folium map `m`. Returns "client" or "server",
+    the clustering mode that was used.
+    """
+    styles = marker_styles(df)
+    lga_codes, lga_uniques = _codes(df['LGA'])
+    type_codes, type_uniques = _codes(df['Type'])
+    est_codes, est_uniques = _codes(df['Tentative_Population'])
+    tables = _tables_js(df, lga_uniques, type_uniques, est_uniques)
+
+    if len(df) <= client_limit:
+        rows = _lead_rows(df, styles, lga_codes, type_codes, est_codes)
+        FastMarkerCluster(rows, callback=_callback(tables, _POPUP_JS, "leadMarker"), name=name).add_to(m)
+        return "client"
+
+    clusters, singles = grid_clusters(df, styles, zoom, bounds)
+    bubbles = [[round(lat, 6), round(lon, 6), int(count), int(style)]
+               for lat, lon, count, style in clusters.itertuples(index=False)]
+    PointLayer(bubbles, _callback(tables, _BUBBLE_JS, "clusterBubble"), name=name).add_to(m)
+
+    single_rows = _lead_rows(df.iloc[singles], styles[singles], lga_codes[singles],
+                             type_codes[singles], est_codes[singles])
+    PointLayer(single_rows, _callback(tables, _POPUP_JS, "leadMarker"), name=f"{name} (single)").add_to(m)
+    return "server"
+
+
+def viewport(map_state):
+    """{"zoom", "bounds"} from what st_folium returned, or None before the map has reported."""
+    bounds = (map_state or {}).get("bounds") or {}
+    sw, ne = bounds.get("_southWest"), bounds.get("_northEast")
+    if not sw or not ne or sw.get("lat") is None or map_state.get("zoom") is None:
+        return None
+    return {"zoom": map_state["zoom"], "bounds": ((sw["lat"], sw["lng"]), (ne["lat"], ne["lng"]))}
+
+
+def viewport_moved(old, new, tolerance=0.25):
+    """True when the zoom changed or the view panned by more than `tolerance` of its size."""
+    if not old or old.get("zoom") != new["zoom"]:
+        return True
+    (s0, w0), (n0, e0) = old["bounds"]
+    (s1, w1), (n1, e1) = new["bounds"]
+    height, width = max(n0 - s0, 1e-9), max(e0 - w0, 1e-9)
+    return abs((s1 + n1) - (s0 + n0)) / 2 > tolerance * height or abs((w1 + e1) - (w0 + e0)) / 2 > tolerance * width
+
+
+def add_route_layer(m, start, route, return_to_start=True, name="Field Route"):
+    """Add a planned route (route_planner.plan_route output) to `m`: one polyline plus numbered stops."""
+    lat, lon = _coordinates(route)
+    points = [list(start)] + [[round(y, 6), round(x, 6)] for y, x in zip(lat, lon)]
+    if return_to_start:
+        points.append(list(start))
+    layer = folium.FeatureGroup(name=name)
+    folium.PolyLine(points, color="#0b5394", weight=4, opacity=0.8).add_to(layer)
+    folium.Marker(list(start), tooltip="Start branch", icon=folium.Icon(color="black", icon="flag", prefix="fa")).add_to(layer)
+    for (y, x), stop, label in zip(points[1:len(route) + 1], route['Stop'].tolist(),
+                                   route['Name'].astype(object).astype(str).tolist()):
+        folium.CircleMarker([y, x], radius=6, color="#0b5394", fill=True, fill_opacity=0.9,
+                            tooltip=f"{stop}. {label}").add_to(layer)
+    layer.add_to(m)
+
+
+def add_hex_layer(m, cells, resolution, name="Market Potential (hex)", show=False):
+    """Add hex_grid cells to `m` as a choropleth on Potential (0-100), with the cell figures in the tooltip."""
+    colormap = branca.colormap.linear.YlOrRd_09.scale(0, 100)
+    colormap.caption = "Market potential"
+    geojson = hex_grid.to_geojson(cells, resolution)
+    for feature in geojson["features"]:
+        feature["properties"]["color"] = colormap(feature["properties"]["Potential"])
+    folium.GeoJson(
+        geojson,
+        name=name,
+        show=show,
+        style_function=lambda feature: {
+            "fillColor": feature["properties"]["color"], "color": "#555", "weight": 0.5, "fillOpacity": 0.6,
+        },
+        tooltip=folium.GeoJsonTooltip(
+            fields=["Top_LGA", "Leads", "Settlements", "Commercial", "Tier1", "Potential"],
+            aliases=["LGA", "Targets", "Settlements", "Commercial", "Tier 1", "Potential"],
+        ),
+    ).add_to(m)
+    return colormap
@@ -0,0 +1,193 @@
+"""
+Building blocks of the master leads table (kogi_master_leads.csv).
+
+3_merge_data.py runs these over the two scraper CSVs; the incremental
+scraper mode (osm_delta.py) runs them over just the rows that changed. Every
+rule here and in feature_rows.py reads only the row's own values, never the
+rest of the batch, so patched rows come out like freshly merged ones.
+
+Other states run the same code with their own region config (region_config.py,
+pipeline.py), which supplies the LGA data and the file names.
+
+The master table is stored twice: kogi_master_leads.csv for the field
+officers, and a typed kogi_master_leads.parquet for the dashboard.
+Categorical text columns and float32 coordinates keep it small, and the file
+is memory-mapped on load, so a cold start skips the CSV parse.
+
+When a population raster (POPULATION_RASTER) is present, every lead also
+gets a numeric Population_Estimate from it (population_raster.py), which
+replaces the tier text and drives Market_Score.
+"""
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import dedup
+import lga_reference
+import population_raster
+
+try:
+    import pyarrow  # noqa: F401  (Parquet engine)
+except ImportError:  # without it we only write/read the CSV
+    pyarrow = None
+
+VILLAGES_FILE = "kogi_villages_smart.csv"
+COMMERCIAL_FILE = "kogi_commercial.csv"
+MASTER_FILE = "kogi_master_leads.csv"
+MASTER_PARQUET = "kogi_master_leads.parquet"
+MASTER_DEDUP_REPORT = "kogi_master_dedup_report.csv"
+
+# GRID3/WorldPop people-per-pixel GeoTIFF; used by the merge when it exists
+POPULATION_RASTER = "kogi_population.tif"
+
+# Columns the enrichment stage adds, so the dashboard only has to load the file
+DERIVED_COLUMNS = ['Market_Score', 'Full_Address', 'LGA_Actual_Pop', 'Viability_Tier', 'LGA_Desc', 'Chart_Type']
+
+# Low-cardinality text columns, stored as dictionary-encoded categoricals
+CATEGORICAL_COLUMNS = ['LGA', 'Category', 'Type', 'Tentative_Population', 'Viability_Tier', 'LGA_Desc', 'Chart_Type']
+
+# Google Maps deep link, completed with "LAT,LONG"
+NAV_PREFIX = "https://www.google.com/maps/search/?api=1&query="
+
+# Market score from the population/traffic estimate: first keyword wins
+SCORE_RULES = [("high", 100), ("medium", 50), ("low", 10)]
+DEFAULT_SCORE = 5
+
+# We select only the columns we need to keep the file clean
+MASTER_COLUMNS = ['Name', 'Category', 'Type', 'LGA', 'Tentative_Population', 'Priority_Tier', 'Latitude', 'Longitude']
+
+# Stable OSM key ("node/123") carried along when the scrapers provide it
+ID_COLUMN = 'OSM_ID'
+
+
+def normalize_villages(df_villages):
+    """We want one column called "Tentative_Population" for everyone, and a Category."""
+    df_villages = df_villages.rename(columns={'Population_Info': 'Tentative_Population'})
+    df_villages['Category'] = 'Settlement'  # Label all these as Settlements
+    return df_villages
+
+
+def navigation_links(lat, lon):
+    # This creates the URL: http://maps.google.com/?q=LAT,LONG
+    return NAV_PREFIX + lat.astype(str) + "," + lon.astype(str)
+
+
+def market_scores(tentative_population):
+    """Score per row, worked out once per distinct estimate label and broadcast back."""
+    labels = tentative_population.astype('category')
+    lowered = labels.cat.categories.astype(str).str.lower()
+    per_label = np.select([lowered.str.contains(word, regex=False) for word, _ in SCORE_RULES],
+                          [score for _, score in SCORE_RULES], default=DEFAULT_SCORE)
+    codes = labels.cat.codes.to_numpy()
+    # Missing estimates score like any unknown label
+    return np.where(codes >= 0, per_label[codes], DEFAULT_SCORE).astype(np.int64)
+
+
+def enrich(df_master, region=None):
+    """
+    Dashboard columns: market score, address, LGA reference data and chart grouping.
+    `region` (region_config.Region) supplies the state and LGA data; Kogi by default.
+    """
+    region = region or lga_reference.REGION
+    df_master = df_master.copy()
+    df_master['Market_Score'] = market_scores(df_master['Tentative_Population'])
+    lga_names = df_master['LGA'].astype(object)
+    df_master['Full_Address'] = df_master['Name'].astype(object) + ", " + lga_names + f" LGA, {region.state}"
+
+    # Merge Actual LGA Data (one join instead of a lookup per row)
+    lga = pd.DataFrame({'LGA': lga_names.to_numpy()}).merge(region.lga_table(), on='LGA', how='left')
+    df_master['LGA_Actual_Pop'] = lga['LGA_Actual_Pop'].fillna(0).astype(np.int64).to_numpy()
+    df_master['Viability_Tier'] = lga['Viability_Tier'].fillna('Unknown').to_numpy()
+    df_master['LGA_Desc'] = lga['LGA_Desc'].fillna('').to_numpy()
+
+    # Simplified Chart Type
+    df_master['Chart_Type'] = np.where(df_master['Category'].eq('Settlement'), 'Village/Settlement', 'Commercial/Inst.')
+    return df_master
+
+
+def with_population(df_master, raster_path=POPULATION_RASTER):
+    """Raster population estimates (population_raster.py) when the raster and rasterio are available."""
+    if population_raster.rasterio is None or not Path(raster_path).is_file():
+        return df_master
+    return population_raster.enrich(df_master, raster_path)
+
+
+def to_master_rows(df, raster_path=POPULATION_RASTER, region=None):
+    """Select the master columns, add the navigation deep link and the enrichment columns."""
+    cols = MASTER_COLUMNS + ([ID_COLUMN] if ID_COLUMN in df.columns else [])
+    df_master = df[cols].copy()
+    df_master['Navigation_Link'] = navigation_links(df_master['Latitude'], df_master['Longitude'])
+    df_master = with_population(enrich(df_master, region), raster_path)
+    # Keep the id last so existing column positions do not move
+    if ID_COLUMN in df_master.columns:
+        df_master = df_master[[c for c in df_master.columns if c != ID_COLUMN] + [ID_COLUMN]]
+    return df_master
+
+
+def drop_duplicate_leads(df_master):
+    """
+    If a Village and a Market (or two mappings of one place) sit at the same spot
+    under the same or a near-identical name, keep just one. Returns (df_master, merge_report).
+    """
+    return dedup.deduplicate(df_master)
+
+
+def build_master(df_villages, df_commercial, raster_path=POPULATION_RASTER, region=None):
+    """Villages + commercial -> deduplicated master table. Returns (df_master, merge_report)."""
+    df_master = pd.concat([normalize_villages(df_villages), df_commercial], ignore_index=True)
+    df_master = to_master_rows(df_master, raster_path, region)
+    return drop_duplicate_leads(df_master)
+
+
+def to_typed(df_master):
+    """Compact dtypes for the Parquet copy: categoricals, float32 coordinates, int8 tiers."""
+    df_master = df_master.copy()
+    for col in CATEGORICAL_COLUMNS:
+        if col in df_master.columns:
+            df_master[col] = df_master[col].astype('category')
+    for col in ['Latitude', 'Longitude']:
+        if col in df_master.columns:
+            df_master[col] = df_master[col].astype(np.float32)
+    if 'Priority_Tier' in df_master.columns:
+        df_master['Priority_Tier'] = df_master['Priority_Tier'].astype(np.int8)
+    if 'Market_Score' in df_master.columns:
+        df_master['Market_Score'] = df_master['Market_Score'].astype(np.int16)
+    if 'LGA_Actual_Pop' in df_master.columns:
+        df_master['LGA_Actual_Pop'] = df_master['LGA_Actual_Pop'].astype(np.int32)
+    if population_raster.ESTIMATE_COLUMN in df_master.columns:
+        df_master[population_raster.ESTIMATE_COLUMN] = df_master[population_raster.ESTIMATE_COLUMN].astype('Int32')
+    return df_master
+
+
+def save_master(df_master, csv_path=MASTER_FILE, parquet_path=MASTER_PARQUET):
+    """Write the CSV export and, when pyarrow is installed, the typed Parquet copy."""
+    df_master.to_csv(csv_path, index=False)
+    if pyarrow is None:
+        print("pyarrow not installed - skipping the Parquet copy (pip install pyarrow)")
+        return
+    to_typed(df_master).to_parquet(parquet_path, index=False, compression='zstd')
+
+
+def data_version(csv_path=MASTER_FILE, parquet_path=MASTER_PARQUET):
+    """(name, mtime, size) of the master files: changes whenever a merge or delta run rewrites them."""
+    return tuple((path.name, path.stat().st_mtime_ns, path.stat().st_size)
+                 for path in (Path(csv_path), Path(parquet_path)) if path.is_file())
+
+
+def load_master(csv_path=MASTER_FILE, parquet_path=MASTER_PARQUET):
+    """
+    The master table, from the Parquet copy when it is at least as new as the
+    CSV (memory-mapped, dtypes preserved), else from the CSV.
+    """
+    csv_file, parquet_file = Path(csv_path), Path(parquet_path)
+    if pyarrow is not None and parquet_file.is_file() and (
+        not csv_file.is_file() or parquet_file.stat().st_mtime >= csv_file.stat().st_mtime
+    ):
+        df_master = pd.read_parquet(parquet_file, memory_map=True)
+    else:
+        df_master = pd.read_csv(csv_file)
+    # Files merged before the enrichment stage existed: enrich once here
+    if not set(DERIVED_COLUMNS).issubset(df_master.columns):
+        df_master = enrich(df_master[[c for c in df_master.columns if c not in DERIVED_COLUMNS]])
+    return to_typed(df_master)
@@ -0,0 +1,244 @@
+"""
+Incremental (delta) scrape mode, keyed on OSM element id and version.
+
+A full scrape records, per dataset, the Overpass snapshot time it was built
+from (timestamp_osm_base) and the OSM ids it holds, in kogi_osm_state.json.
+An incremental run then asks Overpass only for:
+
+1. elements matching the dataset's tags that are newer than that snapshot
+   (`newer:` filter, `out meta` so we get versions), and
+2. the bare id list of everything that still matches (`out ids`, tiny), to
+   spot deletions and elements that lost their tag.
+
+Only those rows are rebuilt (through the same feature_rows / master_leads
+code as a full run) and patched into the dataset CSV and
+kogi_master_leads.csv by OSM_ID. Every added / modified / deleted lead is
+appended to kogi_changelog.csv.
+
+Geometry note: ways come back with their node coordinates (closed ways become
+polygons, like osmnx does for these tags); relations are placed at the centre
+of their bounding box.
+"""
+import json
+import re
+from collections import OrderedDict
+from datetime import datetime, timezone
+from pathlib import Path
+
+import geopandas as gpd
+import pandas as pd
+import shapely
+from osmnx import _overpass
+
+import dedup
+import master_leads
+import state_acquisition
+
+STATE_FILE = Path("kogi_osm_state.json")
+CHANGELOG_FILE = Path("kogi_changelog.csv")
+ID_COLUMN = master_leads.ID_COLUMN
+
+
+# --- state file ---------------------------------------------------------
+
+def load_state(state_file=STATE_FILE):
+    state_file = Path(state_file)
+    if state_file.is_file():
+        return json.loads(state_file.read_text(encoding="utf-8"))
+    return {"datasets": {}}
+
+
+def save_state(state, state_file=STATE_FILE):
+    Path(state_file).write_text(json.dumps(state, indent=1, sort_keys=True), encoding="utf-8")
+
+
+def record_snapshot(dataset, df, osm_base, state_file=STATE_FILE):
+    """After a full scrape: remember the snapshot time and which ids the CSV holds."""
+    if osm_base is None or ID_COLUMN not in df.columns:
+        return
+    state = load_state(state_file)
+    state["datasets"][dataset] = {
+        "timestamp_osm_base": osm_base,
+        # Full scrapes come from `out body`, so versions are unknown until a delta run
+        "versions": {osm_id: None for osm_id in df[ID_COLUMN].dropna()},
+    }
+    save_state(state, state_file)
+    print(f"Delta baseline for {dataset}: OSM snapshot {osm_base}")
+
+
+# --- Overpass -----------------------------------------------------------
+
+def build_query(tags, polygon_coord_str, since=None, out="meta geom", note=""):
+    """Overpass QL for every node/way/relation carrying one of `tags` inside the polygon."""
+    newer = f'(newer:"{since}")' if since else ""
+    statements = []
+    for key, values in tags.items():
+        if values is True:
+            tag_filter = f'["{key}"]'
+        else:
+            values = [values] if isinstance(values, str) else values
+            tag_filter = f'["{key}"~"^({"|".join(re.escape(v) for v in values)})$"]'
+        for kind in ("node", "way", "relation"):
+            statements.append(f'{kind}{tag_filter}{newer}(poly:"{polygon_coord_str}");')
+    comment = f"/* {note} */" if note else ""
+    return f"{_overpass._make_overpass_settings()};{comment}({''.join(statements)});out {out};"
+
+
+def fetch_changes(tags, since, state_query=state_acquisition.STATE_QUERY):
+    """(changed elements, ids that still match, new snapshot time) for the whole state."""
+    polygon = state_acquisition.state_boundary(state_query)
+    with state_acquisition.single_query():
+        coord_strs = _overpass._make_overpass_polygon_coord_strs(polygon)
+
+    changed, current_ids, osm_base = [], set(), None
+    for coord_str in coord_strs:
+        response = _overpass._overpass_request(OrderedDict(data=build_query(tags, coord_str, since)))
+        changed.extend(response.get("elements", []))
+        osm_base = response.get("osm3s", {}).get("timestamp_osm_base", osm_base)
+
+        # The comment keeps each baseline's id listing its own cache entry
+        listing = _overpass._overpass_request(
+            OrderedDict(data=build_query(tags, coord_str, out="ids", note=f"ids after {since}"))
+        )
+        current_ids.update(f"{el['type']}/{el['id']}" for el in listing.get("elements", []))
+    return changed, current_ids, osm_base
+
+
+def _geometry(element):
+    if element["type"] == "node":
+        return shapely.Point(element["lon"], element["lat"])
+    coords = [(pt["lon"], pt["lat"]) for pt in element.get("geometry") or [] if pt]
+    if element["type"] == "way" and len(coords) >= 2:
+        if len(coords) >= 4 and coords[0] == coords[-1]:
+            return shapely.Polygon(coords)
+        return shapely.LineString(coords)
+    bounds = element.get("bounds", {})
+    if bounds:
+        return shapely.Point((bounds["minlon"] + bounds["maxlon"]) / 2, (bounds["minlat"] + bounds["maxlat"]) / 2)
+    return None
+
+
+def elements_to_gdf(elements):
+    """Overpass `out meta geom` elements -> frame shaped like an osmnx features frame."""
+    records, geometries = [], []
+    for element in elements:
+        geometry = _geometry(element)
+        if geometry is None:
+            continue
+        record = dict(element.get("tags", {}))
+        record.update(element=element["type"], id=element["id"], version=element.get("version"))
+        records.append(record)
+        geometries.append(geometry)
+    return gpd.GeoDataFrame(records, geometry=geometries, crs="EPSG:4326")
+
+
+# --- patching -----------------------------------------------------------
+
+def patch_rows(df, new_rows, deleted_ids, scope=None):
+    """
+    Patch `df` by OSM_ID: replace modified rows in place, drop deleted ones,
+    append new ones. `scope` limits which rows of `df` may be touched.
+    """
+    scope = pd.Series(True, index=df.index) if scope is None else scope
+    ids = df[ID_COLUMN]
+    replacement = new_rows.drop_duplicates(ID_COLUMN).set_index(ID_COLUMN)
+
+    df = df.copy()
+    in_place = scope & ids.isin(replacement.index)
+    if in_place.any():
+        cols = [c for c in df.columns if c in replacement.columns]
+        df.loc[in_place, cols] = replacement.loc[ids[in_place], cols].to_numpy()
+
+    added = new_rows[~new_rows[ID_COLUMN].isin(ids[scope])]
+    kept = df[~(scope & ids.isin(deleted_ids))]
+    return pd.concat([kept, added[[c for c in df.columns if c in added.columns]]], ignore_index=True)
+
+
+def append_changelog(dataset, changes):
+    if not changes:
+        return
+    log = pd.DataFrame(changes, columns=["Change", "OSM_ID", "Name", "LGA"])
+    log.insert(0, "Dataset", dataset)
+    log.insert(0, "Run_At", datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"))
+    log.to_csv(CHANGELOG_FILE, mode="a", header=not CHANGELOG_FILE.is_file(), index=False)
+
+
+def run_incremental(dataset, csv_path, tags, rows_fn, lgas, deduplicate=False):
+    """Fetch what changed since the last run and patch it into the dataset CSV and the master file."""
+    state = load_state()
+    entry = state["datasets"].get(dataset)
+    if not entry or not Path(csv_path).is_file():
+        print(f"No delta baseline for {dataset} yet. Run a full scrape first.")
+        return False
+
+    df = pd.read_csv(csv_path, float_precision="round_trip")
+    if ID_COLUMN not in df.columns:
+        print(f"{csv_path} has no {ID_COLUMN} column. Run a full scrape first.")
+        return False
+
+    since = entry["timestamp_osm_base"]
+    print(f"Fetching {dataset} changes since {since}...")
+    elements, current_ids, osm_base = fetch_changes(tags, since)
+
+    # Skip elements whose version we already hold
+    versions = entry["versions"]
+    elements = [el for el in elements
+                if versions.get(f"{el['type']}/{el['id']}") is None
+                or versions[f"{el['type']}/{el['id']}"] != el.get("version")]
+
+    frames = []
+    if elements:
+        boundaries = state_acquisition.load_lga_boundaries(lgas)
+        gdf = state_acquisition.assign_lgas(elements_to_gdf(elements), boundaries)
+        for lga, part in state_acquisition.split_by_lga(gdf, lgas, tags):
+            if not part.empty:
+                frames.append(rows_fn(part, lga))
+    new_rows = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=list(df.columns))
+
+    known = set(df[ID_COLUMN].dropna())
+    deleted_ids = sorted(known - current_ids - set(new_rows[ID_COLUMN]))
+
+    # Dataset CSV
+    old_rows = df.set_index(ID_COLUMN, drop=False)
+    patched = patch_rows(df, new_rows, deleted_ids)
+    if deduplicate:
+        patched, _ = dedup.deduplicate(patched)
+    patched.to_csv(csv_path, index=False)
+
+    # Master file: only this dataset's rows may change
+    if Path(master_leads.MASTER_FILE).is_file():
+        master = pd.read_csv(master_leads.MASTER_FILE, float_precision="round_trip")
+        if ID_COLUMN in master.columns:
+            settlement = master['Category'].eq('Settlement')
+            scope = settlement if dataset == "villages" else ~settlement
+            master_rows = new_rows
+            if dataset == "villages":
+                master_rows = master_leads.normalize_villages(new_rows)
+            master_rows = master_leads.to_master_rows(master_rows) if len(master_rows) else master_rows
+            master = patch_rows(master, master_rows, deleted_ids, scope)
+            master, merge_report = master_leads.drop_duplicate_leads(master)
+            master_leads.save_master(master)
+            dedup.save_report(merge_report, master_leads.MASTER_DEDUP_REPORT)
+
+    # Changelog + new baseline
+    changes = []
+    for _, row in new_rows.iterrows():
+        change = "modified" if row[ID_COLUMN] in known else "added"
+        changes.append((change, row[ID_COLUMN], row['Name'], row['LGA']))
+    for osm_id in deleted_ids:
+        old = old_rows.loc[[osm_id]].iloc[0]
+        changes.append(("deleted", osm_id, old['Name'], old['LGA']))
+    append_changelog(dataset, changes)
+
+    for el in elements:
+        versions[f"{el['type']}/{el['id']}"] = el.get("version")
+    for osm_id in deleted_ids:
+        versions.pop(osm_id, None)
+    entry["timestamp_osm_base"] = osm_base or since
+    save_state(state)
+
+    counts = pd.Series([c[0] for c in changes], dtype=object).value_counts()
+    print(f"\nDELTA APPLIED for {dataset}: {counts.get('added', 0)} added, "
+          f"{counts.get('modified', 0)} modified, {counts.get('deleted', 0)} deleted "
+          f"(snapshot {entry['timestamp_osm_base']})")
+    return True
@@ -0,0 +1,345 @@
+"""
+Managed cache for the Overpass/Nominatim responses in cache/.
+
+osmnx writes one `<sha1 of url>.json` file per response and never looks at
+them again unless the exact same URL comes back. This module takes over
+osmnx's cache read/write hooks and adds:
+
+- a manifest (cache/manifest.json): key -> file, label (which LGA/query),
+  created, last used, byte size, element count
+- a per-entry TTL (expired entries are treated as misses and refetched)
+- optional gzip/zstd compression of new entries
+- LRU eviction down to a size budget
+- an offline mode (--cache-only) where a miss is an error instead of a request
+- a hit/miss/bytes-saved report at the end of the run
+- the Overpass snapshot time (timestamp_osm_base) of every response, which
+  incremental runs use as their starting point
+
+File names are the same SHA1 keys osmnx uses, so the existing cache/ files
+are picked up as-is.
+
+Run on its own to index, expire, compress and trim the folder:
+    python overpass_cache.py --compress gzip --max-mb 200 --ttl-days 30
+"""
+import argparse
+import contextlib
+import gzip
+import hashlib
+import json
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+from osmnx import _http
+from osmnx import settings as ox_settings
+
+import run_metrics
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional, gzip is always there
+    zstandard = None
+
+MANIFEST_NAME = "manifest.json"
+EXTENSIONS = {None: ".json", "gzip": ".json.gz", "zstd": ".json.zst"}
+
+_context = threading.local()
+
+
+class CacheMissError(RuntimeError):
+    """Raised in --cache-only mode when a response is not in the cache."""
+
+
+@contextlib.contextmanager
+def label(text):
+    """Tag every cache entry written inside this block (e.g. with the LGA name)."""
+    previous = getattr(_context, "label", None)
+    _context.label = text
+    try:
+        yield
+    finally:
+        _context.label = previous
+
+
+def _now():
+    return time.time()
+
+
+def _iso(ts):
+    return datetime.fromtimestamp(ts, tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _encode(raw, compress):
+    if compress == "gzip":
+        return gzip.compress(raw, mtime=0)
+    if compress == "zstd":
+        return zstandard.ZstdCompressor(level=10).compress(raw)
+    return raw
+
+
+def _decode(data, path):
+    if path.name.endswith(".gz"):
+        return gzip.decompress(data)
+    if path.name.endswith(".zst"):
+        if zstandard is None:
+            raise RuntimeError(f"{path.name} is zstd-compressed but the zstandard package is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return data
+
+
+def find_file(folder, key):
+    """The cache file of `key` in `folder`, whichever compression it was written with, or None."""
+    for ext in EXTENSIONS.values():
+        path = Path(folder) / f"{key}{ext}"
+        if path.is_file():
+            return path
+    return None
+
+
+def read_response(folder, url):
+    """Decoded JSON bytes cached for `url`, or None. Read-only: no manifest update, no stats."""
+    path = find_file(folder, hashlib.sha1(url.encode("utf-8")).hexdigest())
+    return _decode(path.read_bytes(), path) if path is not None else None
+
+
+def _count_elements(response_json):
+    if isinstance(response_json, dict):
+        return len(response_json.get("elements", []))
+    return len(response_json)
+
+
+def _label_from_url(url):
+    # Nominatim URLs carry the place name; Overpass queries only carry polygons
+    q = parse_qs(urlsplit(url).query).get("q")
+    return q[0] if q else None
+
+
+class ResponseCache:
+    def __init__(self, folder="cache", ttl_days=None, compress=None, max_mb=None, offline=False):
+        if compress == "zstd" and zstandard is None:
+            raise RuntimeError("--cache-compress zstd needs the zstandard package (pip install zstandard)")
+        self.folder = Path(folder)
+        self.ttl = ttl_days * 86400 if ttl_days else None
+        self.compress = compress
+        self.max_bytes = int(max_mb * 1024 * 1024) if max_mb else None
+        self.offline = offline
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "evicted": 0,
+                      "bytes_saved": 0, "bytes_written": 0}
+        self.osm_bases = set()
+        self.manifest_path = self.folder / MANIFEST_NAME
+        self.entries = self._load_manifest()
+
+    # --- manifest -------------------------------------------------------
+
+    def _load_manifest(self):
+        if self.manifest_path.is_file():
+            return json.loads(self.manifest_path.read_text(encoding="utf-8"))
+        return {}
+
+    def flush(self):
+        self.folder.mkdir(parents=True, exist_ok=True)
+        with self.lock:
+            text = json.dumps(self.entries, indent=1, sort_keys=True)
+        self.manifest_path.write_text(text, encoding="utf-8")
+
+    def _index(self, key, path, raw, label_text=None, created=None):
+        response_json = json.loads(raw)
+        entry = self.entries.get(key, {})
+        entry.update({
+            "file": path.name,
+            "kind": "overpass" if isinstance(response_json, dict) else "nominatim",
+            "label": label_text or entry.get("label"),
+            "created": created or entry.get("created") or _iso(path.stat().st_mtime),
+            "last_used": _iso(_now()),
+            "bytes": path.stat().st_size,
+            "raw_bytes": len(raw),
+            "elements": _count_elements(response_json),
+        })
+        if isinstance(response_json, dict):
+            # Data snapshot time of the Overpass answer, the baseline for delta runs
+            entry["osm_base"] = response_json.get("osm3s", {}).get("timestamp_osm_base")
+            if entry["osm_base"]:
+                self.osm_bases.add(entry["osm_base"])
+        self.entries[key] = entry
+        return response_json
+
+    def _is_expired(self, entry, path):
+        if self.ttl is None:
+            return False
+        created = entry.get("created")
+        ts = (datetime.strptime(created, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc).timestamp()
+              if created else path.stat().st_mtime)
+        return _now() - ts > self.ttl
+
+    # --- osmnx hooks ----------------------------------------------------
+
+    def retrieve(self, url):
+        if not ox_settings.use_cache:
+            return None
+
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        path = find_file(self.folder, key)
+        with self.lock:
+            entry = self.entries.get(key, {})
+            if path is not None and self._is_expired(entry, path):
+                path.unlink()
+                self.entries.pop(key, None)
+                self.stats["expired"] += 1
+                path = None
+
+            if path is None:
+                self.stats["misses"] += 1
+                run_metrics.count(cache_misses=1)
+                if self.offline:
+                    raise CacheMissError(f"Not in cache (offline mode): {_label_from_url(url) or url[:120]}")
+                return None
+
+            raw = _decode(path.read_bytes(), path)
+            response_json = self._index(key, path, raw, _label_from_url(url) or getattr(_context, "label", None))
+            self.stats["hits"] += 1
+            self.stats["bytes_saved"] += len(raw)
+        run_metrics.count(cache_hits=1, cache_bytes=len(raw))
+        return response_json
+
+    def save(self, url, response_json, ok):
+        if not ox_settings.use_cache or not ok:
+            return
+        if isinstance(response_json, dict) and "remark" in response_json:
+            return
+
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        raw = json.dumps(response_json).encode("utf-8")
+        path = self.folder / f"{key}{EXTENSIONS[self.compress]}"
+        self.folder.mkdir(parents=True, exist_ok=True)
+        with self.lock:
+            # Drop any copy stored under another compression
+            old = find_file(self.folder, key)
+            if old is not None and old != path:
+                old.unlink()
+            path.write_bytes(_encode(raw, self.compress))
+            self._index(key, path, raw, _label_from_url(url) or getattr(_context, "label", None), _iso(_now()))
+            self.stats["bytes_written"] += path.stat().st_size
+
+    # --- maintenance ----------------------------------------------------
+
+    def compact(self):
+        """Index unknown files, expire old entries, (re)compress, then evict to budget."""
+        known = {}
+        for path in sorted(self.folder.iterdir()):
+            if path.name == MANIFEST_NAME or not path.name.endswith(tuple(EXTENSIONS.values())):
+                continue
+            key = path.name.split(".", 1)[0]
+            if len(key) != 40:
+                continue
+            known[key] = path
+
+        with self.lock:
+            # Forget manifest entries whose file disappeared
+            for key in list(self.entries):
+                if key not in known:
+                    self.entries.pop(key)
+
+            for key, path in known.items():
+                entry = self.entries.get(key, {})
+                if self._is_expired(entry, path):
+                    path.unlink()
+                    self.entries.pop(key, None)
+                    self.stats["expired"] += 1
+                    continue
+
+                raw = _decode(path.read_bytes(), path)
+                target = self.folder / f"{key}{EXTENSIONS[self.compress]}"
+                if target != path:
+                    target.write_bytes(_encode(raw, self.compress))
+                    path.unlink()
+                # Indexing is not a use: never-used files keep their age for LRU
+                last_used = entry.get("last_used")
+                self._index(key, target, raw)
+                self.entries[key]["last_used"] = last_used or self.entries[key]["created"]
+
+        self.evict()
+
+    def evict(self):
+        """Delete least-recently-used entries until the folder fits in max_mb."""
+        if self.max_bytes is None:
+            return
+        with self.lock:
+            total = sum(entry["bytes"] for entry in self.entries.values())
+            for key, entry in sorted(self.entries.items(), key=lambda item: item[1]["last_used"]):
+                if total <= self.max_bytes:
+                    break
+                path = self.folder / entry["file"]
+                if path.is_file():
+                    path.unlink()
+                total -= entry["bytes"]
+                self.entries.pop(key)
+                self.stats["evicted"] += 1
+
+    def osm_base(self):
+        """Oldest Overpass snapshot time among the responses used this run."""
+        return min(self.osm_bases) if self.osm_bases else None
+
+    def report(self):
+        s = self.stats
+        lookups = s["hits"] + s["misses"]
+        rate = 100 * s["hits"] / lookups if lookups else 0
+        size = sum(entry["bytes"] for entry in self.entries.values())
+        return (f"Cache: {s['hits']} hits / {s['misses']} misses ({rate:.0f}% hit rate), "
+                f"{s['bytes_saved'] / 1024:,.0f} kB not downloaded, "
+                f"{s['bytes_written'] / 1024:,.0f} kB written, "
+                f"{s['expired']} expired, {s['evicted']} evicted, "
+                f"{len(self.entries)} entries / {size / 1024:,.0f} kB on disk")
+
+
+def install(folder="cache", ttl_days=None, compress=None, max_mb=None, offline=False):
+    """Route osmnx's cache reads/writes through a ResponseCache and return it."""
+    cache = ResponseCache(folder, ttl_days, compress, max_mb, offline)
+    ox_settings.cache_folder = str(cache.folder)
+    _http._retrieve_from_cache = cache.retrieve
+    _http._save_to_cache = cache.save
+    return cache
+
+
+def add_cache_args(parser):
+    group = parser.add_argument_group("response cache")
+    group.add_argument("--cache-only", action="store_true",
+                       help="Offline: rebuild the CSVs purely from cache/, never touch the network.")
+    group.add_argument("--cache-ttl-days", type=float, default=None,
+                       help="Refetch responses older than this many days.")
+    group.add_argument("--cache-compress", choices=["gzip", "zstd"], default=None,
+                       help="Compress new cache entries.")
+    group.add_argument("--cache-max-mb", type=float, default=None,
+                       help="Evict least-recently-used entries above this size.")
+    return parser
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index, expire, compress and trim the Overpass cache.")
+    parser.add_argument("--folder", default="cache")
+    parser.add_argument("--ttl-days", type=float, default=None)
+    parser.add_argument("--compress", choices=["gzip", "zstd", "none"], default="none")
+    parser.add_argument("--max-mb", type=float, default=None)
+    args = parser.parse_args()
+
+    compress = None if args.compress == "none" else args.compress
+    cache = ResponseCache(args.folder, args.ttl_days, compress, args.max_mb)
+    print("--- COMPACTING RESPONSE CACHE ---")
+    cache.compact()
+    cache.flush()
+
+    by_kind = {}
+    for entry in cache.entries.values():
+        kind = by_kind.setdefault(entry["kind"], [0, 0, 0])
+        kind[0] += 1
+        kind[1] += entry["bytes"]
+        kind[2] += entry["elements"]
+    for kind, (count, size, elements) in sorted(by_kind.items()):
+        print(f"  -> {kind}: {count} files, {size / 1024:,.0f} kB, {elements:,} elements")
+    print(cache.report())
+
+
+if __name__ == "__main__":
+    main()
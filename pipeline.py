@@ -0,0 +1,443 @@
+"""
+One pipeline for every region: scrape -> merge -> travel times, driven by regions/<name>.json.
+
+    python3 pipeline.py                            # Kogi (regions/kogi.json)
+    python3 pipeline.py kogi benue --jobs 2        # two regions, one process each
+    python3 pipeline.py --refresh villages         # scrape again even though the config did not change
+    python3 pipeline.py --stages merge             # only the merge
+    python3 pipeline.py --list
+
+Stages form a small DAG (STAGES): the two scrapes are independent, the merge
+needs both CSVs, the travel-time matrix needs the master file. Before a stage
+runs, its fingerprint is taken: the config keys it reads, the options that
+change its output, and the content digest of its input files. If that
+matches the fingerprint recorded after its last successful run (in
+<prefix>_pipeline_state.json) and its outputs are still there untouched, the
+stage is skipped. So editing an LGA population re-runs only the merge, and a
+re-scrape that returns the same data stops there.
+
+Scrapes have no input files (OSM is the input), so they are cached until the
+config changes or --refresh names them. Regions run in separate processes
+(--jobs); the scrape engine flags (--workers, --rate, ...) apply to each
+region, so N regions make up to N times --rate requests per second.
+
+Every stage and LGA scan is timed into the region's run log
+(<prefix>_run_log.jsonl, see run_metrics.py) and each region ends with a
+run report; --profile adds a cProfile/pyinstrument profile per stage.
+
+The numbered scripts (1_, 2_, 3_) run single stages of this for Kogi.
+"""
+import argparse
+import graphlib
+import hashlib
+import json
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pandas as pd
+
+import dedup
+import feature_rows
+import master_leads
+import osm_delta
+import region_config
+import run_metrics
+import streaming_merge
+
+# stage: (stages it needs, config keys it reads)
+STAGES = {
+    "villages": ([], ["state", "country", "lgas", "tags"]),
+    "commercial": ([], ["state", "country", "lgas", "tags"]),
+    "merge": (["villages", "commercial"], ["state", "lga_data"]),
+    "travel_times": (["merge"], ["state", "country", "branches"]),
+}
+
+
+# osmnx's message when a query worked but matched nothing (other errors are failures)
+NO_FEATURES = "No matching features"
+
+
+# --- stages -------------------------------------------------------------
+
+def scan(region, tags, rows_fn, workers=1, single_pass=False, label="features", fail_fast=False):
+    """
+    Rows for every LGA of the region (per-LGA queries, or one state-wide query), or None.
+    An LGA that fails is reported and logged with its error (run_metrics) and the
+    others go on, unless `fail_fast`.
+    """
+    import osmnx as ox
+    from osmnx._errors import InsufficientResponseError
+
+    import scrape_engine
+    import state_acquisition
+
+    failed = []
+    if single_pass:
+        # One state-wide query, split locally by LGA boundary
+        frames = []
+        with run_metrics.span(step="state_query"):
+            parts = state_acquisition.scan_state(region.lgas, tags, region.query,
+                                                 region.boundary_file, region.all_tags)
+        for lga, gdf in parts:
+            if gdf.empty:
+                print(f"  -> No data found for {lga}")
+                continue
+            with run_metrics.span(step="rows", lga=lga):
+                # Like the per-LGA path: a malformed tag fails this LGA, not the stage
+                try:
+                    rows = rows_fn(gdf, lga)
+                except Exception as e:
+                    if fail_fast:
+                        raise
+                    run_metrics.record_error(e)
+                    failed.append(lga)
+                    print(f"  -> ERROR converting {lga}: {type(e).__name__}: {e}")
+                    continue
+                run_metrics.count(rows=len(rows))
+            frames.append(rows)
+            print(f"  -> Found {len(gdf)} {label} in {lga}")
+    else:
+        def scan_lga(lga):
+            query = region.lga_query(lga)
+            print(f"Scanning {query}...")
+
+            with run_metrics.span(step="scan", lga=lga):
+                try:
+                    gdf = ox.features_from_place(query, tags)
+                    if gdf.empty:
+                        print(f"  -> No data found for {lga}")
+                        return None
+                    # Converting stays in here: a malformed tag fails this LGA, not the stage
+                    rows = rows_fn(gdf.reset_index(), lga)
+                except Exception as e:
+                    if isinstance(e, InsufficientResponseError) and str(e).startswith(NO_FEATURES):
+                        # Overpass answered, there is just nothing with these tags here
+                        print(f"  -> No data found for {lga}")
+                        return None
+                    if fail_fast:
+                        raise
+                    run_metrics.record_error(e)
+                    failed.append(lga)
+                    print(f"  -> ERROR scanning {lga}: {type(e).__name__}: {e}")
+                    return None
+
+                run_metrics.count(rows=len(rows))
+                print(f"  -> Found {len(gdf)} {label} in {lga}")
+                return rows
+
+        # Scan every LGA (in parallel when workers > 1; results stay in LGA order)
+        frames = scrape_engine.run_scan(region.lgas, scan_lga, workers)
+    if failed:
+        print(f"  -> {len(failed)} LGAs failed: {', '.join(sorted(failed))} (details in {region.run_log_file})")
+
+    frames = [frame for frame in frames if frame is not None and not frame.empty]
+    return pd.concat(frames, ignore_index=True) if frames else None
+
+
+def _osm_base():
+    import scrape_engine
+
+    return scrape_engine.cache.osm_base() if scrape_engine.cache is not None else None
+
+
+@run_metrics.span("villages")
+def scrape_villages(region, workers=1, single_pass=False, fail_fast=False):
+    """Settlements of every LGA -> region.villages_file. Returns the rows, or None when nothing came back."""
+    df = scan(region, region.settlement_tags, feature_rows.settlement_rows, workers, single_pass,
+              "settlements", fail_fast)
+    if df is None:
+        print("\nFAILED. No data collected.")
+        return None
+    df.to_csv(region.villages_file, index=False)
+    print(f"\nSUCCESS! Scraped {len(df)} locations.")
+    print(f"Data saved to {region.villages_file}")
+    osm_delta.record_snapshot("villages", df, _osm_base(), region.osm_state_file)
+    return df
+
+
+@run_metrics.span("commercial")
+def scrape_commercial(region, workers=1, single_pass=False, fail_fast=False):
+    """Markets, schools and institutions -> region.commercial_file (deduplicated). Returns the rows, or None."""
+    df = scan(region, region.commercial_tags, feature_rows.commercial_rows, workers, single_pass,
+              "targets", fail_fast)
+    if df is None:
+        print("\nFAILED.")
+        return None
+    # Same place mapped twice (node + way, spelling variants): keep one, log the rest
+    with run_metrics.span(step="dedup"):
+        df, merge_report = dedup.deduplicate(df)
+    dedup.save_report(merge_report, region.commercial_dedup_report)
+    df.to_csv(region.commercial_file, index=False)
+    print(f"\nSUCCESS! Scraped {len(df)} targets with traffic estimates.")
+    osm_delta.record_snapshot("commercial", df, _osm_base(), region.osm_state_file)
+    return df
+
+
+@run_metrics.span("merge")
+def merge(region, streaming=False, chunksize=streaming_merge.DEFAULT_CHUNKSIZE):
+    """Villages + commercial -> the region's master files. Returns the number of leads kept."""
+    if streaming:
+        # Same steps, one chunk at a time (see streaming_merge.py)
+        total, kept, duplicates = streaming_merge.stream_merge(
+            region.villages_file, region.commercial_file, region.master_file, region.master_parquet,
+            region.master_dedup_report, chunksize, raster_path=region.population_raster, region=region,
+        )
+        run_metrics.count(rows=kept)
+        print(f"Loaded: {total} Villages/Towns + Businesses/Institutions")
+        print(f"Removed {duplicates} duplicates.")
+        print(f"Merge report: {duplicates} duplicates -> {region.master_dedup_report}")
+        print(f"\nSUCCESS! Master Database Created: {region.master_file} (+ {region.master_parquet})")
+        print(f"TOTAL TARGETS: {kept}")
+        return kept
+
+    with run_metrics.span(step="read"):
+        df_villages = pd.read_csv(region.villages_file)
+        df_commercial = pd.read_csv(region.commercial_file)
+
+    print(f"Loaded: {len(df_villages)} Villages/Towns")
+    print(f"Loaded: {len(df_commercial)} Businesses/Institutions")
+
+    # Standardize columns, combine, add the navigation link and the enrichment columns,
+    # then clean duplicates - see master_leads.py
+    with run_metrics.span(step="build"):
+        df_master, merge_report = master_leads.build_master(df_villages, df_commercial,
+                                                            region.population_raster, region)
+    print(f"Removed {len(merge_report)} duplicates.")
+    run_metrics.count(rows=len(df_master))
+
+    # CSV for the field, typed Parquet for the dashboard
+    with run_metrics.span(step="save"):
+        dedup.save_report(merge_report, region.master_dedup_report)
+        master_leads.save_master(df_master, region.master_file, region.master_parquet)
+
+    print(f"\nSUCCESS! Master Database Created: {region.master_file} (+ {region.master_parquet})")
+    print(f"TOTAL TARGETS: {len(df_master)}")
+    print("-" * 30)
+    print("Sample Row:")
+    print(df_master.iloc[0])
+    return len(df_master)
+
+
+@run_metrics.span("travel_times")
+def build_travel_times(region, refresh_graph=False):
+    import travel_times
+
+    minutes = travel_times.build(region, refresh_graph)
+    run_metrics.count(rows=minutes.shape[1])
+    return minutes
+
+
+# --- stage cache --------------------------------------------------------
+
+def file_digest(path):
+    """sha1 of the file's content, or None when it does not exist."""
+    path = Path(path)
+    if not path.is_file():
+        return None
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def stage_inputs(stage, region):
+    """Files a stage reads (optional ones count too: adding a raster re-runs the merge)."""
+    return {
+        "villages": [],
+        "commercial": [],
+        "merge": [region.villages_file, region.commercial_file, region.population_raster],
+        # Not the drive graph: the stage downloads it on first run, so hashing it here would never
+        # match the next time; --refresh-graph re-runs the stage instead
+        "travel_times": [region.master_file],
+    }[stage]
+
+
+def stage_outputs(stage, region):
+    """Files a stage writes; all must still be there (and unchanged) for it to be skipped."""
+    return {
+        "villages": [region.villages_file],
+        "commercial": [region.commercial_file],
+        "merge": [region.master_file, region.master_dedup_report],
+        "travel_times": [region.matrix_file, region.index_file],
+    }[stage]
+
+
+def fingerprint(stage, region, options):
+    """Digest of everything that decides the stage's output."""
+    settings = {"single_pass": options.get("single_pass", False)} if stage in ("villages", "commercial") else {}
+    return hashlib.sha1(json.dumps({
+        "config": region.config_hash(STAGES[stage][1]),
+        "options": settings,
+        "inputs": {Path(path).name: file_digest(path) for path in stage_inputs(stage, region)},
+    }, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def load_pipeline_state(region):
+    path = Path(region.pipeline_state_file)
+    return json.loads(path.read_text(encoding="utf-8")) if path.is_file() else {"stages": {}}
+
+
+def save_pipeline_state(region, state):
+    Path(region.pipeline_state_file).write_text(json.dumps(state, indent=1, sort_keys=True), encoding="utf-8")
+
+
+def is_current(stage, region, state, key):
+    """True when the stage last ran with this fingerprint and its outputs are as it left them."""
+    entry = state["stages"].get(stage)
+    if not entry or entry.get("fingerprint") != key:
+        return False
+    return all(file_digest(path) == digest for path, digest in entry.get("outputs", {}).items())
+
+
+# --- runner -------------------------------------------------------------
+
+def _run_stage(stage, region, options):
+    if stage == "villages":
+        return scrape_villages(region, options.get("workers", 1), options.get("single_pass", False),
+                               options.get("fail_fast", False))
+    if stage == "commercial":
+        return scrape_commercial(region, options.get("workers", 1), options.get("single_pass", False),
+                                 options.get("fail_fast", False))
+    if stage == "merge":
+        return merge(region, options.get("streaming", False),
+                     options.get("chunksize", streaming_merge.DEFAULT_CHUNKSIZE))
+    if stage == "travel_times":
+        return build_travel_times(region, options.get("refresh_graph", False))
+    raise ValueError(f"Unknown stage {stage!r}")
+
+
+def run_region(name, options=None, engine_args=None):
+    """
+    Run the region's stages in dependency order. Returns {stage: outcome} with
+    outcome one of "ran", "ran with N errors" (some LGAs failed; not cached),
+    "cached", "failed: ...", "blocked" (a needed stage failed), "disabled"
+    (travel times off in the config) or "not selected".
+    """
+    options = options or {}
+    region = region_config.load_region(name)
+    Path(region.output_dir).mkdir(parents=True, exist_ok=True)
+    selected = options.get("stages") or list(STAGES)
+    refresh = set(options.get("refresh") or [])
+    if options.get("refresh_graph"):
+        refresh.add("travel_times")
+
+    needs_network = bool({"villages", "commercial", "travel_times"} & set(selected))
+    if engine_args is not None and needs_network:
+        import scrape_engine
+
+        scrape_engine.configure(engine_args)
+
+    run_metrics.start(region.run_log_file, region.name, options.get("profile"))
+    state = load_pipeline_state(region)
+    outcome = {}
+    order = graphlib.TopologicalSorter({stage: needs for stage, (needs, _) in STAGES.items()}).static_order()
+    for stage in order:
+        if stage not in selected:
+            outcome[stage] = "not selected"
+            continue
+        if stage == "travel_times" and not region.travel_times:
+            outcome[stage] = "disabled"
+            continue
+        if any(outcome.get(need, "").startswith(("failed", "blocked")) for need in STAGES[stage][0]):
+            outcome[stage] = "blocked"
+            continue
+
+        key = fingerprint(stage, region, options)
+        if stage not in refresh and "all" not in refresh and is_current(stage, region, state, key):
+            print(f"[{region.name}] {stage}: unchanged, skipped")
+            outcome[stage] = "cached"
+            continue
+
+        print(f"[{region.name}] --- {stage.upper()} ---")
+        started = time.perf_counter()
+        try:
+            result = _run_stage(stage, region, options)
+        except Exception as e:
+            traceback.print_exc()
+            outcome[stage] = f"failed: {e}"
+            continue
+        if result is None:
+            outcome[stage] = "failed: no data collected"
+            continue
+        errors = run_metrics.stage_errors(stage)
+        if errors:
+            # Partial result: downstream stages use it, but it is not cached, so the next run retries
+            outcome[stage] = f"ran with {errors} errors"
+            continue
+
+        state["stages"][stage] = {
+            "fingerprint": key,
+            "outputs": {path: file_digest(path) for path in stage_outputs(stage, region)},
+            "finished": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "seconds": round(time.perf_counter() - started, 2),
+        }
+        save_pipeline_state(region, state)
+        outcome[stage] = "ran"
+
+    if engine_args is not None and needs_network:
+        import scrape_engine
+
+        scrape_engine.finish()
+    print(run_metrics.finish())
+    return outcome
+
+
+def run(names, options=None, engine_args=None, jobs=1):
+    """run_region for every region, `jobs` regions at a time in separate processes. Returns {name: outcome}."""
+    if jobs <= 1 or len(names) <= 1:
+        return {name: run_region(name, options, engine_args) for name in names}
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = {name: pool.submit(run_region, name, options, engine_args) for name in names}
+        return {name: future.result() for name, future in futures.items()}
+
+
+def main():
+    import scrape_engine
+
+    parser = argparse.ArgumentParser(description="Scrape, merge and enrich one or more regions (regions/*.json).")
+    parser.add_argument("regions", nargs="*", default=[region_config.DEFAULT_REGION],
+                        help="Region config names (default: %(default)s).")
+    parser.add_argument("--list", action="store_true", help="List the region configs and exit.")
+    parser.add_argument("--jobs", type=int, default=1, help="Regions processed at the same time (one process each).")
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES), help="Run only these stages.")
+    parser.add_argument("--refresh", nargs="+", choices=list(STAGES) + ["all"], default=[],
+                        help="Run these stages even when nothing they depend on changed.")
+    parser.add_argument("--streaming", action="store_true", help="Chunked merge (see streaming_merge.py).")
+    parser.add_argument("--chunksize", type=int, default=streaming_merge.DEFAULT_CHUNKSIZE,
+                        help="Rows per chunk with --streaming.")
+    parser.add_argument("--refresh-graph", action="store_true", help="Download the drive networks again (re-runs travel_times).")
+    scrape_engine.add_engine_args(parser)
+    args = parser.parse_args()
+
+    if args.list:
+        for name in region_config.available_regions():
+            region = region_config.load_region(name)
+            print(f"{name}: {region.state}, {len(region.lgas)} LGAs -> {region.output_dir}")
+        return
+    if args.incremental:
+        parser.error("--incremental patches the Kogi files in place; run it through 1_/2_scrape_*.py")
+
+    options = {
+        "stages": args.stages,
+        "refresh": args.refresh,
+        "workers": args.workers,
+        "single_pass": args.single_pass,
+        "streaming": args.streaming,
+        "chunksize": args.chunksize,
+        "refresh_graph": args.refresh_graph,
+        "fail_fast": args.fail_fast,
+        "profile": args.profile,
+    }
+    results = run(args.regions, options, args, args.jobs)
+
+    print("\n--- PIPELINE SUMMARY ---")
+    for name, outcome in results.items():
+        print(f"{name}: " + ", ".join(f"{stage} {result}" for stage, result in outcome.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Population enrichment from a gridded population raster (GRID3 / WorldPop GeoTIFF).
+
+The OSM `place` tag only gives a tier ("Medium (2k-10k)"). With a population
+count raster on disk (people per pixel, e.g. the 100 m GRID3 layer for
+Nigeria), every lead gets the number of people living within `radius_m` of
+it instead.
+
+The raster is never loaded whole. Points are bucketed into TILE x TILE pixel
+tiles; each occupied tile is read once as a window (padded by the radius)
+straight from the GeoTIFF's own tiles/strips, and every point in it is
+summed over a precomputed disk of pixel offsets in one array gather. Memory
+stays at one window, however big the raster is.
+
+    python3 population_raster.py --raster kogi_population.tif --radius-m 1000
+
+The merge applies it automatically when master_leads.POPULATION_RASTER
+exists (see master_leads.to_master_rows).
+"""
+import argparse
+
+import numpy as np
+
+try:
+    import rasterio
+    from rasterio.warp import transform as warp_transform
+    from rasterio.windows import Window
+except ImportError:  # optional: without it the merge keeps the tier estimates
+    rasterio = None
+
+DEFAULT_RADIUS_M = 1000
+
+# Pixels per side of the tiles points are batched by (one window read each)
+TILE = 512
+
+# Market score from people within the radius: linear in log10 between these points
+SCORE_POINTS = [(1, 5), (1000, 10), (2000, 50), (20000, 100)]
+
+ESTIMATE_COLUMN = 'Population_Estimate'
+
+# Metres per degree of latitude; a degree of longitude is this times cos(latitude)
+_M_PER_DEGREE = 111_320.0
+
+
+def _pixel_size_m(src, lat):
+    """(pixel width, pixel height) in metres; geographic rasters are measured at `lat`."""
+    width, height = abs(src.transform.a), abs(src.transform.e)
+    if src.crs is not None and src.crs.is_geographic:
+        return width * _M_PER_DEGREE * np.cos(np.radians(lat)), height * _M_PER_DEGREE
+    return width, height
+
+
+def disk_offsets(radius_m, pixel_w_m, pixel_h_m):
+    """(row, col) offsets of every pixel whose centre lies within `radius_m` of the centre pixel."""
+    ry, rx = int(np.ceil(radius_m / pixel_h_m)), int(np.ceil(radius_m / pixel_w_m))
+    dr, dc = np.mgrid[-ry:ry + 1, -rx:rx + 1]
+    inside = (dr * pixel_h_m) ** 2 + (dc * pixel_w_m) ** 2 <= radius_m ** 2
+    return dr[inside], dc[inside]
+
+
+def _pixels(src, lat, lon):
+    """Fractional-free (row, col) of each point in the raster grid."""
+    xs, ys = np.asarray(lon, dtype=float), np.asarray(lat, dtype=float)
+    if src.crs is not None and not src.crs.is_geographic:
+        xs, ys = (np.asarray(v) for v in warp_transform("EPSG:4326", src.crs, xs, ys))
+    inverse = ~src.transform
+    col = np.floor(inverse.a * xs + inverse.b * ys + inverse.c)
+    row = np.floor(inverse.d * xs + inverse.e * ys + inverse.f)
+    return row, col
+
+
+def sample(lat, lon, raster_path, radius_m=DEFAULT_RADIUS_M):
+    """People within `radius_m` of each point (float, NaN outside the raster)."""
+    if rasterio is None:
+        raise RuntimeError("rasterio is needed to read the population raster (pip install rasterio)")
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    out = np.full(len(lat), np.nan)
+
+    with rasterio.open(raster_path) as src:
+        row, col = _pixels(src, lat, lon)
+        inside = (row >= 0) & (row < src.height) & (col >= 0) & (col < src.width) & np.isfinite(row) & np.isfinite(col)
+        if not inside.any():
+            return out
+        dr, dc = disk_offsets(radius_m, *_pixel_size_m(src, np.nanmean(lat[inside])))
+        pad_r, pad_c = int(dr.max()), int(dc.max())
+
+        points = np.flatnonzero(inside)
+        row, col = row[points].astype(np.int64), col[points].astype(np.int64)
+        tile = (row // TILE) * (src.width // TILE + 1) + col // TILE
+        order = np.argsort(tile, kind="stable")
+        tiles, starts = np.unique(tile[order], return_index=True)
+
+        for batch in np.split(order, starts[1:]):
+            r0 = max(int(row[batch].min()) - pad_r, 0)
+            c0 = max(int(col[batch].min()) - pad_c, 0)
+            r1 = min(int(row[batch].max()) + pad_r + 1, src.height)
+            c1 = min(int(col[batch].max()) + pad_c + 1, src.width)
+            window = src.read(1, window=Window(c0, r0, c1 - c0, r1 - r0), masked=True)
+            values = np.ma.filled(window.astype(float), 0.0)
+            values[~np.isfinite(values)] = 0.0
+
+            rr = row[batch, None] - r0 + dr[None, :]
+            cc = col[batch, None] - c0 + dc[None, :]
+            valid = (rr >= 0) & (rr < values.shape[0]) & (cc >= 0) & (cc < values.shape[1])
+            gathered = values[np.where(valid, rr, 0), np.where(valid, cc, 0)]
+            out[points[batch]] = np.where(valid, gathered, 0.0).sum(axis=1)
+    return out
+
+
+def market_scores(population):
+    """Market score (5-100) from people within the radius; NaN stays NaN."""
+    people, scores = zip(*SCORE_POINTS)
+    population = np.asarray(population, dtype=float)
+    return np.interp(np.log10(np.maximum(population, 1)), np.log10(people), scores)
+
+
+def estimate_labels(population, radius_m):
+    """Tentative_Population text for a numeric estimate, e.g. "Est. 4,300 within 1 km"."""
+    within = f"{radius_m / 1000:g} km" if radius_m >= 1000 else f"{radius_m:g} m"
+    rounded = np.round(np.asarray(population, dtype=float), -2).astype(np.int64)
+    return np.array([f"Est. {people:,} within {within}" for people in rounded], dtype=object)
+
+
+def enrich(df, raster_path, radius_m=DEFAULT_RADIUS_M):
+    """
+    Population_Estimate for every lead the raster covers, and the tier text and
+    Market_Score replaced by it. Counts from OSM ("Confirmed: ...") keep their label.
+    """
+    df = df.copy()
+    people = sample(df['Latitude'], df['Longitude'], raster_path, radius_m)
+    known = np.isfinite(people)
+    df[ESTIMATE_COLUMN] = np.where(known, np.round(people), np.nan)
+    if known.any():
+        labels = df['Tentative_Population'].astype(object).to_numpy().copy()
+        replace = known & ~df['Tentative_Population'].astype(str).str.startswith("Confirmed").to_numpy()
+        labels[replace] = estimate_labels(people[replace], radius_m)
+        df['Tentative_Population'] = labels
+        df['Market_Score'] = np.where(known, np.round(market_scores(np.where(known, people, 1))),
+                                      df['Market_Score']).astype(np.int64)
+    df[ESTIMATE_COLUMN] = df[ESTIMATE_COLUMN].astype('Int64')
+    return df
+
+
+def main():
+    import master_leads
+
+    parser = argparse.ArgumentParser(description="Add raster population estimates to the master leads.")
+    parser.add_argument("--raster", default=master_leads.POPULATION_RASTER, help="Population count GeoTIFF.")
+    parser.add_argument("--radius-m", type=float, default=DEFAULT_RADIUS_M, help="Catchment radius per lead.")
+    args = parser.parse_args()
+
+    print("--- POPULATION RASTER ENRICHMENT ---")
+    df_master = master_leads.load_master()
+    df_master = enrich(df_master, args.raster, args.radius_m)
+    master_leads.save_master(df_master)
+    covered = df_master[ESTIMATE_COLUMN].notna()
+    print(f"SUCCESS! {covered.sum():,} of {len(df_master):,} leads have a raster estimate "
+          f"(median {df_master.loc[covered, ESTIMATE_COLUMN].median():,.0f} people within {args.radius_m:g} m)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Region configs: one JSON file per state in regions/ drives the whole pipeline.
+
+    regions/kogi.json
+    {
+      "name": "kogi",                  # file stem, used on the command line and in the dashboard
+      "state": "Kogi State", "country": "Nigeria",
+      "output_dir": ".", "prefix": "kogi",   # -> ./kogi_villages_smart.csv, ./kogi_master_leads.csv, ...
+      "lgas": [...],                   # scrape order
+      "lga_data": {"Okene": {"pop": ..., "tier": ..., "desc": ...}, ...},
+      "branches": {"Lokoja": [lat, lon], ...},
+      "tags": {"settlement": {...}, "commercial": {...}},
+      "travel_times": true             # optional: build the road travel-time matrix
+    }
+
+`output_dir` defaults to regions/<name>/ and `prefix` to the name, so a new
+state only needs its LGAs, populations, branches and tags. Kogi keeps its
+files in the repo root under their original names.
+"""
+import hashlib
+import json
+from pathlib import Path
+
+import pandas as pd
+
+REGIONS_DIR = Path(__file__).resolve().parent / "regions"
+DEFAULT_REGION = "kogi"
+
+
+class Region:
+    """One region config, with every file of that region's pipeline derived from it."""
+
+    def __init__(self, config):
+        self.config = config
+        self.name = config["name"]
+        self.state = config["state"]
+        self.country = config.get("country", "Nigeria")
+        self.lgas = list(config["lgas"])
+        self.lga_data = config["lga_data"]
+        self.branches = {branch: tuple(point) for branch, point in config["branches"].items()}
+        self.settlement_tags = config["tags"]["settlement"]
+        self.commercial_tags = config["tags"]["commercial"]
+        self.travel_times = bool(config.get("travel_times", False))
+        self.prefix = config.get("prefix", self.name)
+        self.output_dir = Path(config.get("output_dir", Path("regions") / self.name))
+        self.boundary_file = Path(config.get("boundary_file", Path("cache") / f"{self.prefix}_lga_boundaries.geojson"))
+        self.graph_file = Path(config.get("graph_file", Path("cache") / f"{self.prefix}_drive.graphml"))
+
+    def __repr__(self):
+        return f"Region({self.name!r})"
+
+    @property
+    def query(self):
+        """Geocoder query for the whole state, e.g. "Kogi State, Nigeria"."""
+        return f"{self.state}, {self.country}"
+
+    def lga_query(self, lga):
+        return f"{lga}, {self.query}"
+
+    @property
+    def all_tags(self):
+        """Settlement and commercial tags together, for the single-pass state query."""
+        return {**self.settlement_tags, **self.commercial_tags}
+
+    def path(self, suffix):
+        """Output file `<output_dir>/<prefix>_<suffix>`."""
+        return str(self.output_dir / f"{self.prefix}_{suffix}")
+
+    villages_file = property(lambda self: self.path("villages_smart.csv"))
+    commercial_file = property(lambda self: self.path("commercial.csv"))
+    commercial_dedup_report = property(lambda self: self.path("commercial_dedup_report.csv"))
+    master_file = property(lambda self: self.path("master_leads.csv"))
+    master_parquet = property(lambda self: self.path("master_leads.parquet"))
+    master_dedup_report = property(lambda self: self.path("master_dedup_report.csv"))
+    population_raster = property(lambda self: self.path("population.tif"))
+    osm_state_file = property(lambda self: self.path("osm_state.json"))
+    matrix_file = property(lambda self: self.path("travel_minutes.npy"))
+    index_file = property(lambda self: self.path("travel_minutes.json"))
+    pipeline_state_file = property(lambda self: self.path("pipeline_state.json"))
+    run_log_file = property(lambda self: self.path("run_log.jsonl"))
+    coverage_file = property(lambda self: self.path("coverage.sqlite"))
+
+    def lga_table(self):
+        """lga_data as a frame (LGA, LGA_Actual_Pop, Viability_Tier, LGA_Desc) for joins."""
+        return pd.DataFrame(
+            [(lga, info["pop"], info["tier"], info["desc"]) for lga, info in self.lga_data.items()],
+            columns=["LGA", "LGA_Actual_Pop", "Viability_Tier", "LGA_Desc"],
+        )
+
+    def config_hash(self, keys=None):
+        """Stable digest of the config (or just `keys` of it), for stage caching."""
+        part = self.config if keys is None else {key: self.config.get(key) for key in keys}
+        return hashlib.sha1(json.dumps(part, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def available_regions(regions_dir=REGIONS_DIR):
+    """Names of the region configs on disk, default region first."""
+    names = sorted(path.stem for path in Path(regions_dir).glob("*.json"))
+    return sorted(names, key=lambda name: name != DEFAULT_REGION)
+
+
+def load_region(name=DEFAULT_REGION, regions_dir=REGIONS_DIR):
+    """The Region for regions/<name>.json."""
+    path = Path(regions_dir) / f"{name}.json"
+    if not path.is_file():
+        raise FileNotFoundError(f"No region config {path} (available: {', '.join(available_regions(regions_dir))})")
+    config = json.loads(path.read_text(encoding="utf-8"))
+    config.setdefault("name", name)
+    return Region(config)
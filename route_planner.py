@@ -0,0 +1,243 @@
+"""
+Daily field-route planning over the filtered targets.
+
+    route, summary = route_planner.plan_route(filtered_df, lga_reference.BRANCHES["Okene"],
+                                              max_stops=40, day_hours=8)
+    route_planner.directions_links(lga_reference.BRANCHES["Okene"], route)
+
+The candidates are the `max_stops` targets nearest to the start branch. They
+are put in visiting order with a nearest-neighbour tour, then improved with
+2-opt (reverse a stretch of the route) and Or-opt (move a run of 1-3 stops
+elsewhere) until neither finds a shorter route. Both moves are evaluated
+against every position at once on a haversine distance matrix, so a 500-stop
+day solves in well under a second on one core.
+
+Travel time is straight-line distance times ROAD_FACTOR at `speed_kmh`, plus
+`service_min` at each stop. If the whole list does not fit in `day_hours`,
+the day covers the largest number of nearest candidates whose optimized
+route does (binary search, so only a handful of small solves). With `per_lga=True` the route finishes one LGA before moving
+to the next, LGAs visited nearest first.
+"""
+import numpy as np
+
+import spatial_index
+
+DEFAULT_MAX_STOPS = 40
+DEFAULT_DAY_HOURS = 8
+DEFAULT_SERVICE_MIN = 20
+DEFAULT_SPEED_KMH = 35
+
+# Road km per straight-line km on Kogi's rural roads (rough; see the travel-time stage for real roads)
+ROAD_FACTOR = 1.3
+
+# Google Maps directions URLs take at most 9 waypoints between origin and destination on mobile
+MAX_WAYPOINTS = 9
+DIRECTIONS_PREFIX = "https://www.google.com/maps/dir/?api=1"
+
+_EPS = 1e-9
+
+
+def distance_matrix(lat, lon):
+    """Pairwise haversine km between the points, as an (n, n) array."""
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    return spatial_index.haversine_km(lat[:, None], lon[:, None], lat[None, :], lon[None, :])
+
+
+def path_length(d, path):
+    return float(d[path[:-1], path[1:]].sum())
+
+
+def nearest_neighbour(d, nodes, start, end):
+    """Greedy path start -> nodes -> end: always drive to the closest unvisited stop."""
+    left = np.asarray(nodes, dtype=np.int64)
+    path = [start]
+    while len(left):
+        k = int(np.argmin(d[path[-1], left]))
+        path.append(int(left[k]))
+        left = np.delete(left, k)
+    path.append(end)
+    return np.array(path, dtype=np.int64)
+
+
+def two_opt(d, path):
+    """Reverse stretches of the path while that shortens it; both endpoints stay fixed."""
+    path = path.copy()
+    m = len(path)
+    improved = True
+    while improved:
+        improved = False
+        for i in range(m - 3):
+            # Replace edges (p[i], p[i+1]) and (p[j], p[j+1]) by (p[i], p[j]) and (p[i+1], p[j+1])
+            a, b = path[i], path[i + 1]
+            c, e = path[i + 2:m - 1], path[i + 3:m]
+            delta = d[a, c] + d[b, e] - d[a, b] - d[c, e]
+            k = int(np.argmin(delta))
+            if delta[k] < -_EPS:
+                j = i + 2 + k
+                path[i + 1:j + 1] = path[i + 1:j + 1][::-1].copy()
+                improved = True
+    return path
+
+
+def or_opt(d, path, max_segment=3):
+    """Move runs of 1..max_segment stops to a better place (either direction) while that shortens the path."""
+    path = path.copy()
+    improved = True
+    while improved:
+        improved = False
+        for seg in range(1, max_segment + 1):
+            u, v = path[:-1], path[1:]
+            edge = d[u, v]
+            i = 1
+            while i + seg < len(path):
+                first, last = path[i], path[i + seg - 1]
+                gain = edge[i - 1] + edge[i + seg - 1] - d[path[i - 1], path[i + seg]]
+                # Insert between u[k] and v[k]; the edges touching the run itself are not gaps
+                forward = d[u, first] + d[last, v] - edge
+                backward = d[u, last] + d[first, v] - edge
+                cost = np.minimum(forward, backward)
+                cost[i - 1:i + seg] = np.inf
+                k = int(np.argmin(cost))
+                if cost[k] < gain - _EPS:
+                    segment = path[i:i + seg]
+                    if backward[k] < forward[k]:
+                        segment = segment[::-1]
+                    if k < i:
+                        path = np.concatenate([path[:k + 1], segment, path[k + 1:i], path[i + seg:]])
+                    else:
+                        path = np.concatenate([path[:i], path[i + seg:k + 1], segment, path[k + 1:]])
+                    u, v = path[:-1], path[1:]
+                    edge = d[u, v]
+                    improved = True
+                else:
+                    i += 1
+    return path
+
+
+def optimize_path(d, nodes, start, end):
+    """Short path start -> every node -> end: nearest neighbour, then 2-opt / Or-opt until stable."""
+    path = nearest_neighbour(d, nodes, start, end)
+    length = path_length(d, path)
+    while True:
+        path = or_opt(d, two_opt(d, path))
+        new_length = path_length(d, path)
+        if new_length >= length - _EPS:
+            return path
+        length = new_length
+
+
+def _solve(d, nodes, start, end, groups=None):
+    if groups is None:
+        return optimize_path(d, nodes, start, end)
+    # One LGA at a time, nearest unvisited LGA (by its closest stop) next
+    nodes = np.asarray(nodes, dtype=np.int64)
+    groups = np.asarray(groups)[nodes]
+    path, here = [start], start
+    while len(nodes):
+        group = groups[int(np.argmin(d[here, nodes]))]
+        members = nodes[groups == group]
+        nodes, groups = nodes[groups != group], groups[groups != group]
+        # Open-ended leg through this LGA: the last node of d is a zero-cost "anywhere" end
+        leg = optimize_path(d, members, here, len(d) - 1)[1:-1]
+        path.extend(leg.tolist())
+        here = path[-1]
+    path.append(end)
+    return np.array(path, dtype=np.int64)
+
+
+def _day_minutes(d, path, minutes_per_km, service_min):
+    return path_length(d, path) * minutes_per_km + (len(path) - 2) * service_min
+
+
+def plan_route(df, start, max_stops=DEFAULT_MAX_STOPS, day_hours=DEFAULT_DAY_HOURS,
+               service_min=DEFAULT_SERVICE_MIN, speed_kmh=DEFAULT_SPEED_KMH,
+               return_to_start=True, per_lga=False):
+    """
+    One day's visiting order from `start` (lat, lon) over the leads in `df`.
+
+    Returns (route, summary). `route` holds the visited rows in order with
+    Stop, Leg_km (road estimate from the previous stop) and Arrival_Min
+    (minutes after leaving the branch). `summary` has the stop count, the
+    number of candidates left out to fit the day, and the distance and time
+    totals (including the drive back when `return_to_start`).
+    """
+    start_lat, start_lon = start
+    candidates = spatial_index.LeadIndex(df).nearest(start_lat, start_lon, int(max_stops))
+    n = len(candidates)
+
+    # Nodes: 0 = branch, 1..n = candidates (nearest first), n + 1 = end of the day
+    # (back at the branch, or wherever the last stop is), n + 2 = free end for per-LGA legs
+    lat = np.concatenate([[start_lat], candidates['Latitude'].to_numpy(dtype=float)])
+    lon = np.concatenate([[start_lon], candidates['Longitude'].to_numpy(dtype=float)])
+    d = np.zeros((n + 3, n + 3))
+    d[:n + 1, :n + 1] = distance_matrix(lat, lon) * ROAD_FACTOR
+    if return_to_start:
+        d[n + 1, :n + 1] = d[:n + 1, n + 1] = d[0, :n + 1]
+    end = n + 1
+    groups = None
+    if per_lga:
+        groups = np.concatenate([[""], candidates['LGA'].astype(object).astype(str).to_numpy(), ["", ""]])
+
+    minutes_per_km = 60.0 / speed_kmh
+    budget = day_hours * 60
+
+    def solve(k):
+        return _solve(d, np.arange(1, k + 1), 0, end, groups)
+
+    # Visit the k nearest candidates for the largest k whose optimized day fits the budget.
+    # Stops alone, plus the drive out to the k-th (and back), bound k before any solving.
+    reach = d[0, 1:n + 1] * (2 if return_to_start else 1)
+    bound = np.arange(1, n + 1) * service_min + reach * minutes_per_km
+    k_max = int(np.searchsorted(np.maximum.accumulate(bound), budget, side="right"))
+    path = solve(k_max)
+    if _day_minutes(d, path, minutes_per_km, service_min) > budget:
+        lo, hi, path = 0, k_max, solve(0)
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            trial = solve(mid)
+            if _day_minutes(d, trial, minutes_per_km, service_min) <= budget:
+                lo, path = mid, trial
+            else:
+                hi = mid
+
+    stops = path[1:-1]
+    legs = d[path[:-1], path[1:]]
+    drive_min = np.cumsum(legs[:-1]) * minutes_per_km
+    route = candidates.iloc[stops - 1].drop(columns='Distance_km')
+    route.insert(0, 'Stop', np.arange(1, len(stops) + 1))
+    route['Leg_km'] = np.round(legs[:-1], 2)
+    route['Arrival_Min'] = np.round(drive_min + np.arange(len(stops)) * service_min).astype(np.int64)
+
+    distance_km = float(legs.sum())
+    summary = {
+        "stops": len(stops),
+        "left_out": n - len(stops),
+        "distance_km": round(distance_km, 1),
+        "drive_min": round(distance_km * minutes_per_km),
+        "service_min": len(stops) * service_min,
+        "total_min": round(distance_km * minutes_per_km + len(stops) * service_min),
+        "return_km": round(float(legs[-1]), 1),
+    }
+    return route, summary
+
+
+def directions_links(start, route, return_to_start=True, max_waypoints=MAX_WAYPOINTS):
+    """
+    Google Maps multi-stop driving links for the route, one per leg of up to
+    `max_waypoints` + 1 stops; each leg starts where the previous one ended.
+    """
+    points = [f"{start[0]},{start[1]}"] + [
+        f"{lat:.6f},{lon:.6f}" for lat, lon in zip(route['Latitude'].astype(float), route['Longitude'].astype(float))
+    ]
+    if return_to_start:
+        points.append(points[0])
+    links = []
+    step = max_waypoints + 1
+    for i in range(0, len(points) - 1, step):
+        leg = points[i:i + step + 1]
+        url = f"{DIRECTIONS_PREFIX}&origin={leg[0]}&destination={leg[-1]}&travelmode=driving"
+        if len(leg) > 2:
+            url += "&waypoints=" + "%7C".join(leg[1:-1])
+        links.append(url)
+    return links
@@ -0,0 +1,309 @@
+"""
+Run instrumentation: where the time of a refresh goes, per stage and per LGA.
+
+Every stage (villages, commercial, merge, travel_times) and every LGA scan
+inside it is a span. The HTTP layer (scrape_engine.LimitedRequests) and the
+response cache (overpass_cache) add to whichever span is open in their
+thread:
+
+- network_s / requests / bytes: time of the HTTP calls that went out, and the
+  bytes of their answers as received (before gzip decoding),
+- rate_wait_s: time spent waiting for the shared token bucket,
+- cache_hits / cache_misses / cache_bytes: answers served from cache/,
+- retries / backoff_s: 429/504 answers that were retried, and the time slept before each retry,
+- rows: rows the span produced, errors: scans that failed.
+
+parse_s is osmnx building the frames plus the row conversion. A span with
+no spans inside it (an LGA scan, the merge) measures it as what is left of
+its wall time after network_s, rate_wait_s and backoff_s. A span's counters,
+parse_s included, roll up into the span that encloses it, so a stage carries
+the totals of its LGAs. With --workers > 1 those totals are summed over
+threads and can exceed the stage's wall time.
+
+Each finished span is one JSON line in the region's run log
+(kogi_run_log.jsonl), tagged with a run id, and the run ends with a report
+on stdout. To look at it again, or to compare the last runs by stage:
+
+    python3 run_metrics.py                  # report of the last run
+    python3 run_metrics.py --run 20261016T101500-4242
+    python3 run_metrics.py --history 10     # wall time per stage, last 10 runs
+
+With a profiler (--profile cprofile, or pyinstrument when installed), every
+stage also writes a profile next to the log (kogi_profile_<stage>.prof /
+.html). cProfile only sees the thread that runs the stage, so profile scans
+with --workers 1.
+"""
+import argparse
+import contextlib
+import contextvars
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import traceback
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pandas as pd
+
+try:
+    import pyinstrument
+except ImportError:  # optional second profiler
+    pyinstrument = None
+
+COUNTERS = ['network_s', 'rate_wait_s', 'backoff_s', 'parse_s', 'requests', 'bytes', 'cache_hits', 'cache_misses', 'cache_bytes',
+            'retries', 'rows', 'errors']
+
+PROFILERS = ['cprofile', 'pyinstrument']
+
+# The recorder of this run, set up by start()
+recorder = None
+
+_current = contextvars.ContextVar("run_metrics_span", default=None)
+
+
+class Span:
+    """One timed piece of work; counters are added while it is open."""
+
+    def __init__(self, stage, step=None, lga=None, parent=None):
+        self.stage, self.step, self.lga, self.parent = stage, step, lga, parent
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.nested = False  # an inner span closed into this one
+        self.error = None
+        self.started = time.time()
+        self.clock = time.perf_counter()
+
+
+class RunRecorder:
+    """Writes finished spans to a JSON-lines log and keeps them for the end-of-run report."""
+
+    def __init__(self, log_path, region=None, profile=None):
+        self.log_path = Path(log_path)
+        self.region = region
+        self.profile = profile
+        self.run_id = f"{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')}-{os.getpid()}"
+        self.records = []
+        self.lock = threading.Lock()
+
+    def write(self, record):
+        line = json.dumps(record, default=str)
+        with self.lock:
+            self.records.append(record)
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+    def close(self, span):
+        wall = time.perf_counter() - span.clock
+        counters = span.counters
+        if not span.nested:
+            # Single-threaded: the rest of the wall time is parsing; outer spans add these up
+            waits = counters['network_s'] + counters['rate_wait_s'] + counters['backoff_s']
+            counters['parse_s'] += max(wall - waits, 0.0)
+        record = {
+            "run_id": self.run_id,
+            "region": self.region,
+            "stage": span.stage,
+            "step": span.step,
+            "lga": span.lga,
+            "started": datetime.fromtimestamp(span.started, tz=timezone.utc).isoformat(timespec="seconds"),
+            "status": "error" if span.error else "ok",
+            "wall_s": round(wall, 4),
+            **{key: round(value, 4) if isinstance(value, float) else value for key, value in counters.items()},
+        }
+        if span.error:
+            record["error"] = span.error
+        self.write(record)
+        if span.parent is not None:
+            with self.lock:
+                span.parent.nested = True
+                for key, value in counters.items():
+                    span.parent.counters[key] += value
+
+    def profile_path(self, stage):
+        suffix = ".html" if self.profile == "pyinstrument" else ".prof"
+        # kogi_run_log.jsonl -> kogi_profile_merge.prof
+        return self.log_path.with_name(f"{self.log_path.stem.replace('run_log', '')}profile_{stage}{suffix}")
+
+    def report(self):
+        return report(pd.DataFrame(self.records))
+
+
+def start(log_path, region=None, profile=None):
+    """Begin recording this run (one per process); returns the RunRecorder."""
+    global recorder
+    if profile == "pyinstrument" and pyinstrument is None:
+        raise RuntimeError("--profile pyinstrument needs the pyinstrument package (pip install pyinstrument)")
+    recorder = RunRecorder(log_path, region, profile)
+    return recorder
+
+
+def finish():
+    """The report of this run (empty when nothing was recorded); recording stops."""
+    global recorder
+    if recorder is None or not recorder.records:
+        return ""
+    text = recorder.report()
+    recorder = None
+    return text
+
+
+def count(**deltas):
+    """Add to the counters of the open span (no-op outside a span)."""
+    span = _current.get()
+    if span is None:
+        return
+    for key, value in deltas.items():
+        span.counters[key] += value
+
+
+def stage_errors(stage):
+    """Errors counted in the last finished `stage` span of this run (0 when not recording)."""
+    if recorder is None:
+        return 0
+    for record in reversed(recorder.records):
+        if record['stage'] == stage and record['step'] is None and record['lga'] is None:
+            return record['errors']
+    return 0
+
+
+@contextlib.contextmanager
+def _profiled(path, kind):
+    if kind == "pyinstrument":
+        profiler = pyinstrument.Profiler()
+        profiler.start()
+        try:
+            yield
+        finally:
+            profiler.stop()
+            Path(path).write_text(profiler.output_html(), encoding="utf-8")
+            print(f"Profile: {path}")
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(12)
+        print(f"Profile: {path} (top by cumulative time)")
+        print("\n".join(out.getvalue().strip().splitlines()[-14:]))
+
+
+@contextlib.contextmanager
+def span(stage=None, step=None, lga=None):
+    """
+    Time the block as a span. Inside a stage, `stage` may be left out and is
+    taken from the enclosing span. Exceptions are recorded on the span and re-raised.
+    """
+    parent = _current.get()
+    stage = stage or (parent.stage if parent is not None else None)
+    current = Span(stage, step, lga, parent)
+    token = _current.set(current)
+    # Whole stages are profiled, when asked for
+    profile = recorder is not None and recorder.profile and parent is None and step is None and lga is None
+    try:
+        with _profiled(recorder.profile_path(stage), recorder.profile) if profile else contextlib.nullcontext():
+            yield current
+    except Exception as e:
+        if getattr(e, "_run_metrics_counted", False):
+            # Counted where it was raised and rolled up from there; only mark this span failed
+            current.error = current.error or describe(e)
+        else:
+            record_error(e)
+            e._run_metrics_counted = True
+        raise
+    finally:
+        _current.reset(token)
+        if recorder is not None:
+            recorder.close(current)
+
+
+def record_error(error):
+    """Mark the open span as failed by `error` (handled by the caller), with where it was raised."""
+    span = _current.get()
+    if span is None:
+        return
+    span.counters['errors'] += 1
+    span.error = describe(error)
+
+
+def describe(error):
+    """'Type: message @ file:line <- ...' for the log."""
+    where = " <- ".join(f"{Path(frame.filename).name}:{frame.lineno}"
+                        for frame in traceback.extract_tb(error.__traceback__)[-3:])
+    return f"{type(error).__name__}: {error}" + (f" @ {where}" if where else "")
+
+
+# --- reports ------------------------------------------------------------
+
+def report(records):
+    """Run report: one line per stage, then the slowest LGAs and any errors."""
+    if records.empty:
+        return ""
+    run_id = records['run_id'].iloc[-1]
+    lines = [f"--- RUN REPORT {records['region'].iloc[-1] or ''} {run_id} ---"]
+
+    stages = records[records['step'].isna() & records['lga'].isna()]
+    table = stages[['stage', 'status', 'wall_s', 'network_s', 'rate_wait_s', 'backoff_s', 'parse_s', 'requests',
+                    'bytes', 'cache_hits', 'cache_misses', 'retries', 'rows', 'errors']].copy()
+    table['kB'] = (table.pop('bytes') / 1024).round(0).astype(int)
+    lines.append(table.to_string(index=False, float_format=lambda value: f"{value:,.2f}"))
+
+    steps = records[records['step'].notna() & records['lga'].isna()]
+    for stage, part in steps.groupby('stage', sort=False):
+        lines.append(f"{stage}: " + ", ".join(f"{row.step} {row.wall_s:.2f}s" for row in part.itertuples()))
+
+    lgas = records[records['lga'].notna()]
+    for stage, part in lgas.groupby('stage', sort=False):
+        slowest = part.sort_values('wall_s', ascending=False).head(5)
+        lines.append(f"{stage}: slowest LGAs " + ", ".join(
+            f"{row.lga} {row.wall_s:.2f}s ({row.network_s:.2f}s network)" for row in slowest.itertuples()))
+
+    failed = records[records['status'].eq('error') & records['lga'].notna()]
+    for row in failed.itertuples():
+        lines.append(f"ERROR {row.stage} / {row.lga}: {row.error}")
+    return "\n".join(lines)
+
+
+def read_log(log_path):
+    with open(log_path, encoding="utf-8") as f:
+        return pd.DataFrame([json.loads(line) for line in f if line.strip()])
+
+
+def history(records, runs=10):
+    """Wall seconds per stage (columns) for the last `runs` runs (rows), oldest first."""
+    stages = records[records['step'].isna() & records['lga'].isna()]
+    table = stages.pivot_table(index='run_id', columns='stage', values='wall_s', aggfunc='sum', sort=False)
+    return table.tail(runs).round(2)
+
+
+def main():
+    import region_config
+
+    parser = argparse.ArgumentParser(description="Report on the runs recorded in a region's run log.")
+    parser.add_argument("--region", default=region_config.DEFAULT_REGION, help="Region config name.")
+    parser.add_argument("--log", default=None, help="Run log to read (default: the region's).")
+    parser.add_argument("--run", default=None, help="Run id to report on (default: the last run).")
+    parser.add_argument("--history", type=int, default=None, metavar="N",
+                        help="Wall time per stage over the last N runs instead.")
+    args = parser.parse_args()
+
+    log_path = args.log or region_config.load_region(args.region).run_log_file
+    records = read_log(log_path)
+    if records.empty:
+        print(f"No runs in {log_path}")
+        return
+    if args.history:
+        print(history(records, args.history).to_string())
+        return
+    run_id = args.run or records['run_id'].iloc[-1]
+    print(report(records[records['run_id'] == run_id]))
+
+
+if __name__ == "__main__":
+    main()
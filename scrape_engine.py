@@ -0,0 +1,199 @@
+"""
+Shared scrape engine for 1_scrape_villages.py and 2_scrape_commercial.py.
+
+The scrapers hand us one `scan_lga(lga)` function and the LGA list. We run
+the scans one by one (workers=1, the original behaviour) or on a bounded
+thread pool, and always return the results in LGA order so the CSVs come out
+byte-identical either way.
+
+Every HTTP call osmnx makes (Nominatim geocode + Overpass fetch) goes through
+ONE token bucket shared by all workers, at most `--slots` calls are in
+flight at once (Overpass runs 2 queries per IP at a time), and 429/504
+answers are retried with exponential backoff instead of osmnx's fixed 55
+second pause. Responses are stored through the managed cache in
+overpass_cache.py. Time on the wire, time waiting for the bucket, bytes and
+retries go to the open run_metrics span, so every LGA scan is measured on
+its own.
+"""
+import argparse
+import contextvars
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import osmnx as ox
+import requests
+from osmnx import _nominatim, _overpass
+
+import overpass_cache
+import run_metrics
+
+RETRY_STATUS = {429, 504}
+
+# The managed response cache, set up by configure()
+cache = None
+
+
+class TokenBucket:
+    """Classic token bucket: `capacity` requests can burst, then `rate` per second."""
+
+    def __init__(self, rate=1.0, capacity=2):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def wire_bytes(response):
+    """Body bytes as they came over the wire (gzip-compressed when the server compressed them)."""
+    tell = getattr(response.raw, "tell", None)
+    return tell() if tell is not None else len(response.content)
+
+
+class LimitedRequests:
+    """
+    Drop-in for the `requests` module inside osmnx.
+
+    Only get/post are intercepted; everything else (Request, exceptions, ...)
+    is the real `requests` module.
+    """
+
+    def __init__(self, limiter, max_retries=5, backoff=2.0, slots=2):
+        self.limiter = limiter
+        # The bucket only caps the start rate; slow queries would still pile up past the server's slots
+        self.slots = threading.BoundedSemaphore(slots)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.retries = 0
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        return getattr(requests, name)
+
+    def get(self, url, **kwargs):
+        return self._send(requests.get, url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self._send(requests.post, url, **kwargs)
+
+    def _send(self, method, url, **kwargs):
+        attempt = 0
+        while True:
+            waited = time.perf_counter()
+            with self.slots:
+                self.limiter.acquire()
+                sent = time.perf_counter()
+                response = method(url, **kwargs)
+            run_metrics.count(rate_wait_s=sent - waited, network_s=time.perf_counter() - sent,
+                              requests=1, bytes=wire_bytes(response))
+            if response.status_code not in RETRY_STATUS or attempt >= self.max_retries:
+                return response
+
+            # Honour Retry-After if the server sent one, otherwise back off 2s, 4s, 8s...
+            retry_after = response.headers.get("Retry-After", "")
+            if retry_after.isdigit():
+                delay = float(retry_after)
+            else:
+                delay = self.backoff * (2 ** attempt) + random.uniform(0, 1)
+            print(f"  -> {response.status_code} from server, retrying in {delay:.1f}s")
+            with self._lock:
+                self.retries += 1
+            run_metrics.count(retries=1, backoff_s=delay)
+            attempt += 1
+            time.sleep(delay)
+
+
+def add_engine_args(parser):
+    group = parser.add_argument_group("scrape engine")
+    group.add_argument("--workers", type=int, default=1,
+                       help="LGAs scanned at the same time (1 = serial, the original behaviour).")
+    group.add_argument("--rate", type=float, default=1.0,
+                       help="Requests per second shared by all workers.")
+    group.add_argument("--slots", type=int, default=2,
+                       help="Requests in flight at once, also the limiter's burst size "
+                            "(Overpass gives 2 slots per IP by default).")
+    group.add_argument("--max-retries", type=int, default=5,
+                       help="Retries on HTTP 429/504 before giving up.")
+    group.add_argument("--overpass-url", default=None,
+                       help="Overpass endpoint, e.g. a local stand-in server.")
+    group.add_argument("--nominatim-url", default=None,
+                       help="Nominatim endpoint, e.g. a local stand-in server.")
+    group.add_argument("--single-pass", action="store_true",
+                       help="One state-wide Overpass query split locally by LGA boundary.")
+    group.add_argument("--incremental", action="store_true",
+                       help="Only fetch elements changed since the last run and patch them into the CSVs.")
+    group.add_argument("--no-cache", action="store_true",
+                       help="Do not read or write the osmnx response cache.")
+    group.add_argument("--fail-fast", action="store_true",
+                       help="Stop at the first LGA that fails instead of logging it and going on.")
+    group.add_argument("--profile", choices=run_metrics.PROFILERS, default=None,
+                       help="Profile each stage (see run_metrics.py).")
+    overpass_cache.add_cache_args(parser)
+    return parser
+
+
+def configure(args):
+    """Point osmnx at the right servers and route its HTTP calls through the limiter and cache."""
+    global cache
+    if args.overpass_url:
+        ox.settings.overpass_url = args.overpass_url
+    if args.nominatim_url:
+        ox.settings.nominatim_url = args.nominatim_url
+    if args.no_cache:
+        ox.settings.use_cache = False
+
+    cache = overpass_cache.install(
+        ox.settings.cache_folder, args.cache_ttl_days, args.cache_compress, args.cache_max_mb, args.cache_only
+    )
+
+    # The shared bucket replaces osmnx's own /status polling
+    ox.settings.overpass_rate_limit = False
+
+    session = LimitedRequests(TokenBucket(args.rate, args.slots), args.max_retries, slots=args.slots)
+    _overpass.requests = session
+    _nominatim.requests = session
+    return session
+
+
+def run_scan(lgas, scan_lga, workers=1):
+    """Run scan_lga over every LGA and return the per-LGA results in input order."""
+    def labelled_scan(lga):
+        with overpass_cache.label(lga):
+            return scan_lga(lga)
+
+    if workers <= 1:
+        return [labelled_scan(lga) for lga in lgas]
+
+    # Each scan runs in a copy of this thread's context, so its metrics span nests under the stage
+    contexts = [contextvars.copy_context() for _ in lgas]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(lambda context, lga: context.run(labelled_scan, lga), contexts, lgas))
+
+
+def finish():
+    """Trim the cache to budget, save its manifest and print the hit/miss report."""
+    if cache is None:
+        return
+    cache.evict()
+    cache.flush()
+    print(cache.report())
+
+
+def parse_engine_args(description):
+    parser = argparse.ArgumentParser(description=description)
+    add_engine_args(parser)
+    return parser.parse_args()
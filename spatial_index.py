@@ -0,0 +1,168 @@
+"""
+Spatial index over the master leads: radius, nearest-neighbour and bounding-box queries.
+
+    index = spatial_index.LeadIndex(df)
+    index.within_radius(7.55, 6.235, 15, where=df['Priority_Tier'] == 1)
+    index.nearest(7.55, 6.235, 50, where=df['Type'] == 'Marketplace')
+    index.in_bbox(7.4, 6.1, 7.7, 6.4)
+
+Distances are great-circle (haversine) kilometres. With scikit-learn
+installed the index is a BallTree on the haversine metric; without it, a
+grid of ~11 km cells over sorted arrays (numpy only) answers the same
+queries by visiting the cells around the query point. Either way a query
+touches only the neighbourhood, not every lead, so it stays in the
+millisecond range on a national-scale table.
+
+Results are rows of the indexed frame with a Distance_km column, nearest first.
+"""
+import numpy as np
+
+try:
+    from sklearn.neighbors import BallTree
+except ImportError:  # scikit-learn is optional, the grid index needs only numpy
+    BallTree = None
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = np.pi * EARTH_RADIUS_KM / 180
+
+# Grid fallback: cell edge in degrees (~11 km at the equator)
+GRID_CELL_DEG = 0.1
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km; arguments in degrees, broadcast like numpy."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=float)) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+class _GridBackend:
+    """Points bucketed into lat/lon cells; a query scans only the cells it can reach."""
+
+    def __init__(self, lat, lon, cell_deg=GRID_CELL_DEG):
+        self.lat, self.lon, self.cell = lat, lon, cell_deg
+        cy = np.floor(lat / cell_deg).astype(np.int64)
+        cx = np.floor(lon / cell_deg).astype(np.int64)
+        self.order = np.lexsort((cx, cy))
+        keys = np.stack([cy[self.order], cx[self.order]], axis=1)
+        uniq, starts, counts = np.unique(keys, axis=0, return_index=True, return_counts=True)
+        self.cells = {(int(y), int(x)): (s, s + c) for (y, x), s, c in zip(uniq, starts, counts)}
+
+    def _candidates(self, south, west, north, east):
+        y0, y1 = int(np.floor(south / self.cell)), int(np.floor(north / self.cell))
+        x0, x1 = int(np.floor(west / self.cell)), int(np.floor(east / self.cell))
+        if (y1 - y0 + 1) * (x1 - x0 + 1) > len(self.cells):
+            # Huge window: walking the occupied cells is cheaper than the empty ones
+            spans = [span for (y, x), span in self.cells.items() if y0 <= y <= y1 and x0 <= x <= x1]
+        else:
+            spans = [self.cells[(y, x)] for y in range(y0, y1 + 1) for x in range(x0, x1 + 1) if (y, x) in self.cells]
+        if not spans:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate([self.order[s:e] for s, e in spans])
+
+    def radius(self, lat, lon, km):
+        dlat = km / KM_PER_DEGREE
+        dlon = km / (KM_PER_DEGREE * max(np.cos(np.radians(min(abs(lat) + dlat, 89.9))), 1e-6))
+        idx = self._candidates(lat - dlat, lon - dlon, lat + dlat, lon + dlon)
+        dist = haversine_km(lat, lon, self.lat[idx], self.lon[idx])
+        keep = dist <= km
+        return idx[keep], dist[keep]
+
+    def nearest(self, lat, lon, k):
+        # Grow the search radius until it holds k points that are provably the closest
+        km = self.cell * KM_PER_DEGREE
+        while True:
+            idx, dist = self.radius(lat, lon, km)
+            if len(idx) >= k or len(idx) == len(self.lat) or km > np.pi * EARTH_RADIUS_KM:
+                top = np.argsort(dist, kind="stable")[:k]
+                return idx[top], dist[top]
+            km *= 2
+
+    def bbox(self, south, west, north, east):
+        idx = self._candidates(south, west, north, east)
+        keep = (self.lat[idx] >= south) & (self.lat[idx] <= north) & (self.lon[idx] >= west) & (self.lon[idx] <= east)
+        return idx[keep]
+
+
+class _BallTreeBackend:
+    def __init__(self, lat, lon):
+        self.lat, self.lon = lat, lon
+        self.tree = BallTree(np.radians(np.column_stack([lat, lon])), metric="haversine")
+        self.sorted_lat = np.argsort(lat, kind="stable")
+
+    def radius(self, lat, lon, km):
+        idx, dist = self.tree.query_radius(np.radians([[lat, lon]]), r=km / EARTH_RADIUS_KM, return_distance=True)
+        return idx[0], dist[0] * EARTH_RADIUS_KM
+
+    def nearest(self, lat, lon, k):
+        dist, idx = self.tree.query(np.radians([[lat, lon]]), k=min(k, len(self.lat)))
+        return idx[0], dist[0] * EARTH_RADIUS_KM
+
+    def bbox(self, south, west, north, east):
+        # Latitude band by binary search, then the longitude test on that band only
+        lats = self.lat[self.sorted_lat]
+        band = self.sorted_lat[np.searchsorted(lats, south, "left"):np.searchsorted(lats, north, "right")]
+        return band[(self.lon[band] >= west) & (self.lon[band] <= east)]
+
+
+class LeadIndex:
+    """Spatial index over a leads frame with Latitude/Longitude columns."""
+
+    def __init__(self, df, backend=None):
+        self.df = df
+        valid = df['Latitude'].notna().to_numpy() & df['Longitude'].notna().to_numpy()
+        self.rows = np.flatnonzero(valid)
+        lat = df['Latitude'].to_numpy(dtype=float)[valid]
+        lon = df['Longitude'].to_numpy(dtype=float)[valid]
+        backend = backend or ("balltree" if BallTree is not None else "grid")
+        self.backend_name = backend
+        self.backend = _BallTreeBackend(lat, lon) if backend == "balltree" else _GridBackend(lat, lon)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _mask(self, where):
+        if where is None:
+            return None
+        return np.asarray(where, dtype=bool)[self.rows]
+
+    def _result(self, idx, dist=None):
+        out = self.df.iloc[self.rows[idx]].copy()
+        if dist is not None:
+            out['Distance_km'] = np.round(dist, 3)
+            out = out.sort_values('Distance_km', kind='stable')
+        return out
+
+    def within_radius(self, lat, lon, km, where=None):
+        """Leads within `km` of (lat, lon), nearest first. `where` is an optional boolean mask over the frame."""
+        idx, dist = self.backend.radius(lat, lon, km)
+        mask = self._mask(where)
+        if mask is not None:
+            keep = mask[idx]
+            idx, dist = idx[keep], dist[keep]
+        return self._result(idx, dist)
+
+    def nearest(self, lat, lon, k, where=None):
+        """The `k` leads closest to (lat, lon) (among `where`, if given), nearest first."""
+        mask = self._mask(where)
+        if mask is None:
+            idx, dist = self.backend.nearest(lat, lon, k)
+            return self._result(idx, dist)
+        if not mask.any():
+            return self._result(np.empty(0, dtype=np.int64), np.empty(0))
+        # Ask for more until k of them pass the mask (or everything has been seen)
+        want = k
+        while True:
+            idx, dist = self.backend.nearest(lat, lon, want)
+            keep = mask[idx]
+            if keep.sum() >= k or len(idx) >= len(self.rows):
+                return self._result(idx[keep][:k], dist[keep][:k])
+            want *= 4
+
+    def in_bbox(self, south, west, north, east, where=None):
+        """Leads inside the box, in frame order."""
+        idx = np.sort(self.backend.bbox(south, west, north, east))
+        mask = self._mask(where)
+        if mask is not None:
+            idx = idx[mask[idx]]
+        return self._result(idx)
@@ -0,0 +1,148 @@
+"""
+Single-pass acquisition for the whole state.
+
+Instead of 21 geocodes + 21 Overpass fetches per scraper (42 round trips for
+the same polygons, twice), we:
+
+1. geocode the state boundary once,
+2. pull the `place` tags and every commercial tag in ONE Overpass query
+   over that boundary,
+3. assign each feature to its LGA locally, by point-in-polygon against the
+   LGA boundaries (geocoded once, then kept in cache/lga_boundaries.geojson).
+
+Both scrapers ask for the same combined query, so the second one is served
+straight from the osmnx cache. A feature that sits on an LGA border is
+assigned to exactly one LGA instead of being counted in both.
+"""
+import contextlib
+
+import geopandas as gpd
+import osmnx as ox
+import pandas as pd
+import shapely
+
+import lga_reference
+import overpass_cache
+
+# Defaults for Kogi; other states pass their region config's values (see pipeline.py)
+STATE_QUERY = lga_reference.REGION.query
+BOUNDARY_FILE = lga_reference.REGION.boundary_file
+
+# Metric CRS for Nigeria (UTM 32N) - used for nearest-LGA fallbacks
+METRIC_CRS = "EPSG:32632"
+
+# Tag sets from regions/kogi.json
+SETTLEMENT_TAGS = lga_reference.REGION.settlement_tags
+COMMERCIAL_TAGS = lga_reference.REGION.commercial_tags
+
+ALL_TAGS = {**SETTLEMENT_TAGS, **COMMERCIAL_TAGS}
+
+
+def load_lga_boundaries(lgas, state_query=STATE_QUERY, boundary_file=BOUNDARY_FILE):
+    """LGA polygons in `lgas` order, geocoded once and then read from disk."""
+    if boundary_file.is_file():
+        boundaries = gpd.read_file(boundary_file)
+        if list(boundaries["LGA"]) == list(lgas):
+            return boundaries
+
+    boundaries = ox.geocode_to_gdf([f"{lga}, {state_query}" for lga in lgas])
+    boundaries = boundaries[["geometry"]].assign(LGA=list(lgas)).reset_index(drop=True)
+    boundary_file.parent.mkdir(parents=True, exist_ok=True)
+    boundaries.to_file(boundary_file, driver="GeoJSON")
+    return boundaries
+
+
+def state_boundary(state_query=STATE_QUERY):
+    return ox.geocode_to_gdf(state_query).union_all()
+
+
+@contextlib.contextmanager
+def single_query():
+    """Let the whole state go out as a single query instead of osmnx's 50km tiles."""
+    previous = ox.settings.max_query_area_size
+    ox.settings.max_query_area_size = float("inf")
+    try:
+        yield
+    finally:
+        ox.settings.max_query_area_size = previous
+
+
+def fetch_state_features(state_query=STATE_QUERY, tags=ALL_TAGS):
+    """Every feature matching `tags` inside the state boundary, in one Overpass request."""
+    state_polygon = state_boundary(state_query)
+    with single_query():
+        return ox.features_from_polygon(state_polygon, tags).reset_index()
+
+
+def assign_lgas(gdf, boundaries):
+    """
+    Add an `LGA` column by point-in-polygon on each feature's centroid.
+
+    Overlapping LGA polygons resolve to the first LGA in list order; points
+    that fall in a gap between polygons go to the nearest LGA.
+    """
+    points = gpd.GeoDataFrame(
+        {"feature": range(len(gdf))},
+        geometry=shapely.centroid(gdf.geometry.to_numpy()),
+        crs=gdf.crs,
+    )
+    boundaries = boundaries.to_crs(points.crs).assign(lga_order=range(len(boundaries)))
+
+    hits = gpd.sjoin(points, boundaries[["LGA", "lga_order", "geometry"]], predicate="within")
+    hits = hits.sort_values(["feature", "lga_order"]).drop_duplicates("feature")
+    lga = pd.Series(hits["LGA"].values, index=hits["feature"].values).reindex(range(len(gdf)))
+
+    missing = lga.isna().to_numpy()
+    if missing.any():
+        nearest = gpd.sjoin_nearest(
+            points[missing].to_crs(METRIC_CRS),
+            boundaries[["LGA", "lga_order", "geometry"]].to_crs(METRIC_CRS),
+        )
+        nearest = nearest.sort_values(["feature", "lga_order"]).drop_duplicates("feature")
+        lga.loc[nearest["feature"].values] = nearest["LGA"].values
+
+    gdf = gdf.copy()
+    gdf["LGA"] = lga.to_numpy()
+    return gdf
+
+
+def matches_tags(gdf, tags):
+    """Boolean mask of rows carrying at least one of the wanted tag values."""
+    mask = pd.Series(False, index=gdf.index)
+    for key, values in tags.items():
+        if key not in gdf.columns:
+            continue
+        if values is True:
+            mask |= gdf[key].notna()
+        else:
+            wanted = [values] if isinstance(values, str) else values
+            mask |= gdf[key].isin(wanted)
+    return mask
+
+
+def split_by_lga(gdf, lgas, tags):
+    """
+    Yield (lga, sub_frame) for every LGA, keeping only rows that match `tags`.
+
+    Columns that are empty for an LGA are dropped, so each sub-frame looks like
+    what ox.features_from_place would have returned for that LGA alone. The
+    geometry always stays: an LGA without features gets an empty GeoDataFrame.
+    """
+    wanted = gdf[matches_tags(gdf, tags)]
+    for lga in lgas:
+        part = wanted[wanted["LGA"] == lga].drop(columns="LGA")
+        empty = [col for col in part.columns if col != part.geometry.name and part[col].isna().all()]
+        yield lga, part.drop(columns=empty).reset_index(drop=True)
+
+
+def scan_state(lgas, tags, state_query=STATE_QUERY, boundary_file=BOUNDARY_FILE, all_tags=ALL_TAGS):
+    """
+    Single-pass replacement for the per-LGA loop: one (lga, frame) pair per LGA.
+    `all_tags` is what goes out in the one query (both scrapers ask for the same).
+    """
+    print(f"Scanning {state_query} in one pass...")
+    with overpass_cache.label(state_query):
+        boundaries = load_lga_boundaries(lgas, state_query, boundary_file)
+        gdf = assign_lgas(fetch_state_features(state_query, all_tags), boundaries)
+    print(f"  -> {len(gdf)} features assigned to {gdf['LGA'].nunique()} LGAs")
+    return list(split_by_lga(gdf, lgas, tags))
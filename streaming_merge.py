@@ -0,0 +1,211 @@
+"""
+Streaming (chunked) version of the master merge, for inputs that do not fit in memory.
+
+    python3 3_merge_data.py --streaming --chunksize 100000
+
+The scraper CSVs are read `chunksize` rows at a time with fixed dtypes,
+villages first and then commercial, which is the same row order as
+master_leads.build_master. Each chunk goes through the same
+master_leads.to_master_rows as the in-memory path. Deduplication uses the
+dedup.py rules against an on-disk SQLite index of every row seen so far
+(kept or dropped), looked up by grid cell and OSM_ID. For each chunk, only
+the earlier rows near it are read back, so memory is bounded by the chunk
+and its neighbourhood and not by the input size. Kept rows are appended to
+the CSV, and to the Parquet copy through a row-group writer, as they are
+produced.
+
+The result matches the in-memory merge row for row. The one case where it
+can differ: a late row that bridges two groups that were already written
+as separate survivors. The in-memory merge would then drop the second
+survivor; here it has already been written. Both still drop the late row.
+"""
+import sqlite3
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import dedup
+import master_leads
+
+DEFAULT_CHUNKSIZE = 100_000
+
+VILLAGE_DTYPES = {'Name': 'object', 'Type': 'object', 'LGA': 'object', 'Population_Info': 'object',
+                  'Priority_Tier': 'int64', 'Latitude': 'float64', 'Longitude': 'float64', 'OSM_ID': 'object'}
+COMMERCIAL_DTYPES = {'Name': 'object', 'Type': 'object', 'Category': 'object', 'LGA': 'object',
+                     'Tentative_Population': 'object', 'Priority_Tier': 'int64',
+                     'Latitude': 'float64', 'Longitude': 'float64', 'OSM_ID': 'object'}
+
+# Index cell edge in degrees (~220 m): wider than the dedup radius in both directions up to 60 degrees latitude
+CELL_DEG = 0.002
+
+ID_COLUMN = master_leads.ID_COLUMN
+
+_SEEN_COLUMNS = ['seq', 'cy', 'cx', 'Latitude', 'Longitude', 'Name', 'Type', 'LGA', ID_COLUMN,
+                 'root_seq', 'root_name', 'root_id', 'root_lat', 'root_lon']
+
+
+def read_chunks(path, dtypes, chunksize):
+    """The CSV `chunksize` rows at a time, with the given dtypes for the columns it has."""
+    header = pd.read_csv(path, nrows=0).columns
+    return pd.read_csv(path, chunksize=chunksize, dtype={c: t for c, t in dtypes.items() if c in header})
+
+
+def input_chunks(villages_file, commercial_file, chunksize):
+    """Raw rows in build_master order: every village chunk (normalized), then every commercial chunk."""
+    for chunk in read_chunks(villages_file, VILLAGE_DTYPES, chunksize):
+        yield master_leads.normalize_villages(chunk)
+    for chunk in read_chunks(commercial_file, COMMERCIAL_DTYPES, chunksize):
+        yield chunk
+
+
+class SeenIndex:
+    """Every row merged so far (position, location, name, group survivor), in SQLite on disk."""
+
+    def __init__(self, path):
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=OFF")
+        self.db.execute("PRAGMA synchronous=OFF")
+        self.db.execute(
+            "CREATE TABLE seen (seq INTEGER PRIMARY KEY, cy INTEGER, cx INTEGER, Latitude REAL, Longitude REAL, "
+            f"Name TEXT, Type TEXT, LGA TEXT, {ID_COLUMN} TEXT, "
+            "root_seq INTEGER, root_name TEXT, root_id TEXT, root_lat REAL, root_lon REAL)"
+        )
+        self.db.execute("CREATE INDEX seen_cell ON seen (cy, cx)")
+        self.db.execute(f"CREATE INDEX seen_id ON seen ({ID_COLUMN})")
+
+    def near(self, cy, cx, ids):
+        """Earlier rows in the cells around (cy, cx) or sharing an OSM_ID, in seq order."""
+        self.db.execute("CREATE TEMP TABLE IF NOT EXISTS want_cell (cy INTEGER, cx INTEGER)")
+        self.db.execute("CREATE TEMP TABLE IF NOT EXISTS want_id (id TEXT)")
+        self.db.execute("DELETE FROM want_cell")
+        self.db.execute("DELETE FROM want_id")
+        cells = {(int(y) + dy, int(x) + dx) for y, x in zip(cy, cx) for dy in (-1, 0, 1) for dx in (-1, 0, 1)}
+        self.db.executemany("INSERT INTO want_cell VALUES (?, ?)", cells)
+        self.db.executemany("INSERT INTO want_id VALUES (?)", [(str(i),) for i in ids if pd.notna(i)])
+        columns = ", ".join(f"s.{c}" for c in _SEEN_COLUMNS)
+        query = (f"SELECT {columns} FROM seen s JOIN want_cell w ON s.cy = w.cy AND s.cx = w.cx "
+                 f"UNION SELECT {columns} FROM seen s JOIN want_id w ON s.{ID_COLUMN} = w.id ORDER BY 1")
+        return pd.DataFrame(self.db.execute(query).fetchall(), columns=_SEEN_COLUMNS)
+
+    def add(self, rows):
+        self.db.executemany(
+            f"INSERT INTO seen VALUES ({', '.join('?' * len(_SEEN_COLUMNS))})",
+            rows[_SEEN_COLUMNS].astype(object).where(rows[_SEEN_COLUMNS].notna(), None).itertuples(index=False),
+        )
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+
+def _cells(df):
+    return (np.floor(df['Latitude'].to_numpy(dtype=float) / CELL_DEG).astype(np.int64),
+            np.floor(df['Longitude'].to_numpy(dtype=float) / CELL_DEG).astype(np.int64))
+
+
+def dedup_chunk(chunk, seq0, seen, **dedup_kwargs):
+    """
+    Keep mask and merge report for master rows `chunk` (global positions seq0...),
+    against everything already in `seen`; the chunk is then added to `seen`.
+    """
+    n = len(chunk)
+    chunk = chunk.reset_index(drop=True)
+    ids = chunk[ID_COLUMN].astype(object) if ID_COLUMN in chunk.columns else pd.Series([None] * n, dtype=object)
+    cy, cx = _cells(chunk)
+    prior = seen.near(cy, cx, ids.to_numpy())
+
+    # Earlier rows first, so the lowest position of a group is still its survivor
+    current = pd.DataFrame({'Name': chunk['Name'].to_numpy(), 'Type': chunk['Type'].to_numpy(),
+                            'LGA': chunk['LGA'].to_numpy(), ID_COLUMN: ids.to_numpy(),
+                            'Latitude': chunk['Latitude'].to_numpy(dtype=float),
+                            'Longitude': chunk['Longitude'].to_numpy(dtype=float)})
+    combined = pd.concat([prior[current.columns], current], ignore_index=True)
+    roots, report = dedup.duplicate_groups(combined, **dedup_kwargs)
+
+    # Survivor of each chunk row: an earlier row's recorded survivor, or a row of this chunk
+    p = len(prior)
+    local = roots[p:]
+    from_prior = local < p
+    prior_pos = np.clip(local, 0, max(p - 1, 0))
+    chunk_pos = np.clip(local - p, 0, None)
+
+    def survivor(prior_col, chunk_values):
+        ours = np.asarray(chunk_values, dtype=object)[chunk_pos]
+        return np.where(from_prior, prior[prior_col].to_numpy(dtype=object)[prior_pos], ours) if p else ours
+
+    root_seq = survivor('root_seq', seq0 + np.arange(n)).astype(np.int64)
+    keep = root_seq == seq0 + np.arange(n)
+    seen_rows = current.assign(
+        seq=seq0 + np.arange(n), cy=cy, cx=cx, root_seq=root_seq,
+        root_name=survivor('root_name', current['Name']), root_id=survivor('root_id', current[ID_COLUMN]),
+        root_lat=survivor('root_lat', current['Latitude']).astype(float),
+        root_lon=survivor('root_lon', current['Longitude']).astype(float),
+    )
+    seen.add(seen_rows)
+
+    # Report rows of this chunk, against the group survivor (which may be an earlier chunk's row)
+    dropped_all = np.flatnonzero(roots != np.arange(len(combined)))
+    report = report[dropped_all >= p].reset_index(drop=True)
+    dropped = dropped_all[dropped_all >= p] - p
+    dropped_rows = seen_rows.iloc[dropped]
+    report['Kept_Name'] = dropped_rows['root_name'].to_numpy()
+    report['Kept_OSM_ID'] = dropped_rows['root_id'].to_numpy()
+    report['Distance_m'] = np.round(dedup.spatial_index.haversine_km(
+        dropped_rows['root_lat'].to_numpy(dtype=float), dropped_rows['root_lon'].to_numpy(dtype=float),
+        dropped_rows['Latitude'].to_numpy(dtype=float), dropped_rows['Longitude'].to_numpy(dtype=float)) * 1000, 1)
+    return keep, report
+
+
+class _ParquetAppender:
+    """Row groups appended to one Parquet file; text columns stay strings so every chunk has the same schema."""
+
+    def __init__(self, path):
+        self.path, self.writer = path, None
+
+    def write(self, df_master):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        typed = master_leads.to_typed(df_master)
+        for col in typed.columns:
+            if isinstance(typed[col].dtype, pd.CategoricalDtype):
+                typed[col] = typed[col].astype(object)
+        table = pa.Table.from_pandas(typed, preserve_index=False)
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.path, table.schema, compression='zstd')
+        self.writer.write_table(table.cast(self.writer.schema))
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+def stream_merge(villages_file=master_leads.VILLAGES_FILE, commercial_file=master_leads.COMMERCIAL_FILE,
+                 csv_path=master_leads.MASTER_FILE, parquet_path=master_leads.MASTER_PARQUET,
+                 report_path=master_leads.MASTER_DEDUP_REPORT, chunksize=DEFAULT_CHUNKSIZE,
+                 raster_path=master_leads.POPULATION_RASTER, region=None, **dedup_kwargs):
+    """Merge the scraper CSVs chunk by chunk into the master files. Returns (rows read, rows kept, duplicates)."""
+    parquet = _ParquetAppender(parquet_path) if master_leads.pyarrow is not None else None
+    read = kept = duplicates = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        seen = SeenIndex(Path(tmp) / "seen.sqlite")
+        try:
+            for raw in input_chunks(villages_file, commercial_file, chunksize):
+                chunk = master_leads.to_master_rows(raw, raster_path, region)
+                keep, report = dedup_chunk(chunk, read, seen, **dedup_kwargs)
+                chunk = chunk[keep]
+                chunk.to_csv(csv_path, mode='w' if read == 0 else 'a', header=read == 0, index=False)
+                report.to_csv(report_path, mode='w' if read == 0 else 'a', header=read == 0, index=False)
+                if parquet is not None:
+                    parquet.write(chunk)
+                read += len(raw)
+                kept += len(chunk)
+                duplicates += len(report)
+                print(f"  -> {read:,} rows read, {kept:,} kept")
+        finally:
+            seen.close()
+            if parquet is not None:
+                parquet.close()
+    return read, kept, duplicates
@@ -0,0 +1,70 @@
+"""
+Single-pass scans: an LGA without any matching features.
+
+Run with:
+    python -m pytest tests
+"""
+import sys
+from pathlib import Path
+
+import geopandas as gpd
+import numpy as np
+from shapely.geometry import Point
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import feature_rows  # noqa: E402
+import pipeline  # noqa: E402
+import region_config  # noqa: E402
+import state_acquisition  # noqa: E402
+
+TAGS = {"amenity": ["marketplace", "school"]}
+
+
+def state_features():
+    """Two features, both in Adavi; Okene has nothing that matches TAGS."""
+    return gpd.GeoDataFrame({
+        "element": ["node", "node", "node"],
+        "id": [1, 2, 3],
+        "name": ["Ogaminana Market", "Adavi Grammar School", None],
+        "amenity": ["marketplace", "school", "bank"],
+        "tourism": [np.nan, np.nan, "hotel"],
+        "LGA": ["Adavi", "Adavi", "Okene"],
+    }, geometry=[Point(6.2, 7.6), Point(6.21, 7.61), Point(6.23, 7.5)], crs="EPSG:4326")
+
+
+def test_split_keeps_geometry_for_an_lga_without_features():
+    parts = dict(state_acquisition.split_by_lga(state_features(), ["Adavi", "Okene"], TAGS))
+
+    assert len(parts["Adavi"]) == 2
+    assert "tourism" not in parts["Adavi"].columns
+    assert parts["Okene"].empty
+    assert isinstance(parts["Okene"], gpd.GeoDataFrame)
+    assert "geometry" in parts["Okene"].columns
+    assert feature_rows.commercial_rows(parts["Okene"], "Okene").empty
+
+
+def test_single_pass_scan_skips_an_lga_without_features(monkeypatch):
+    region = region_config.load_region("kogi")
+    parts = list(state_acquisition.split_by_lga(state_features(), ["Adavi", "Okene"], TAGS))
+    monkeypatch.setattr(state_acquisition, "scan_state", lambda *args: parts)
+
+    rows = pipeline.scan(region, TAGS, feature_rows.commercial_rows, single_pass=True)
+
+    assert rows["LGA"].tolist() == ["Adavi", "Adavi"]
+    assert rows["Name"].tolist() == ["Ogaminana Market", "Adavi Grammar School"]
+
+
+def test_single_pass_scan_reports_a_failed_conversion_and_goes_on(monkeypatch):
+    region = region_config.load_region("kogi")
+    parts = [("Adavi", state_features().iloc[:2].drop(columns="LGA")),
+             ("Okene", state_features().iloc[2:].drop(columns="LGA"))]
+    monkeypatch.setattr(state_acquisition, "scan_state", lambda *args: parts)
+
+    def rows_fn(gdf, lga):
+        if lga == "Adavi":
+            raise ValueError("bad tag")
+        return feature_rows.commercial_rows(gdf, lga)
+
+    rows = pipeline.scan(region, TAGS, rows_fn, single_pass=True)
+
+    assert rows["LGA"].tolist() == ["Okene"]
@@ -0,0 +1,212 @@
+"""
+Road travel times from every branch to every lead, precomputed offline.
+
+Straight-line distance is misleading where the road has to go round a river
+(Ibaji, Kogi). This stage:
+
+1. downloads the state's drive network once with osmnx (simplified, with
+   speeds and travel times per edge) and keeps it in cache/kogi_drive.graphml,
+2. snaps the branches and the leads to their nearest road node (one KD-tree
+   query for all of them),
+3. runs Dijkstra from all branches in one scipy csgraph call over the graph
+   as a sparse matrix,
+4. writes a (branches x leads) float32 matrix of minutes to
+   kogi_travel_minutes.npy, with the branch names and the lead OSM_IDs in
+   kogi_travel_minutes.json.
+
+The dashboard memory-maps the matrix and looks minutes up by OSM_ID, so no
+graph search ever happens on a request. The stretch between a lead and its
+road node is added at OFF_ROAD_KMH. Leads the road network cannot reach
+(e.g. islands without a ferry edge) get no time.
+
+    python3 travel_times.py
+    python3 travel_times.py --refresh-graph
+"""
+import argparse
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import lga_reference
+import master_leads
+import spatial_index
+import state_acquisition
+
+try:
+    from scipy.sparse import csr_matrix
+    from scipy.sparse.csgraph import dijkstra
+    from scipy.spatial import cKDTree
+except ImportError:  # only the build needs scipy; reading the matrix is numpy only
+    cKDTree = None
+
+GRAPH_FILE = Path("cache") / "kogi_drive.graphml"
+MATRIX_FILE = "kogi_travel_minutes.npy"
+INDEX_FILE = "kogi_travel_minutes.json"
+
+# Speed for the stretch between a lead (or branch) and its nearest road node
+OFF_ROAD_KMH = 10
+
+ID_COLUMN = master_leads.ID_COLUMN
+
+
+def load_graph(state_query=state_acquisition.STATE_QUERY, graph_file=GRAPH_FILE, refresh=False):
+    """The drive network with `travel_time` (seconds) on every edge, downloaded once."""
+    import osmnx as ox  # heavy, and only needed when the matrix is rebuilt
+
+    if graph_file.is_file() and not refresh:
+        return ox.load_graphml(graph_file)
+    graph = ox.graph_from_place(state_query, network_type="drive", simplify=True)
+    graph = ox.add_edge_speeds(graph)
+    graph = ox.add_edge_travel_times(graph)
+    graph_file.parent.mkdir(parents=True, exist_ok=True)
+    ox.save_graphml(graph, graph_file)
+    return graph
+
+
+def _graph_arrays(graph):
+    """(node lat, node lon, sparse seconds matrix) with nodes in graph order; parallel edges keep the fastest."""
+    nodes = list(graph.nodes)
+    position = {node: i for i, node in enumerate(nodes)}
+    lat = np.array([graph.nodes[node]["y"] for node in nodes], dtype=float)
+    lon = np.array([graph.nodes[node]["x"] for node in nodes], dtype=float)
+    edges = pd.DataFrame(
+        [(position[u], position[v], float(data["travel_time"])) for u, v, data in graph.edges(data=True)],
+        columns=["u", "v", "seconds"],
+    ).groupby(["u", "v"], as_index=False)["seconds"].min()
+    seconds = csr_matrix((edges["seconds"].to_numpy(), (edges["u"].to_numpy(), edges["v"].to_numpy())),
+                         shape=(len(nodes), len(nodes)))
+    return lat, lon, seconds
+
+
+def _snap(node_lat, node_lon, lat, lon):
+    """Nearest road node for each point and the great-circle km to it."""
+    # Equirectangular projection around the network's mean latitude: fine at state scale
+    scale = np.cos(np.radians(node_lat.mean()))
+    tree = cKDTree(np.column_stack([node_lat, node_lon * scale]))
+    _, nearest = tree.query(np.column_stack([lat, lon * scale]))
+    return nearest, spatial_index.haversine_km(lat, lon, node_lat[nearest], node_lon[nearest])
+
+
+def travel_minutes(graph, df_master, branches=lga_reference.BRANCHES):
+    """(len(branches), len(df_master)) float32 minutes by road from each branch to each lead."""
+    if cKDTree is None:
+        raise RuntimeError("scipy is needed to build the travel-time matrix (pip install scipy)")
+    node_lat, node_lon, seconds = _graph_arrays(graph)
+    branch_lat, branch_lon = (np.array(values, dtype=float) for values in zip(*branches.values()))
+    branch_nodes, branch_km = _snap(node_lat, node_lon, branch_lat, branch_lon)
+    lead_nodes, lead_km = _snap(node_lat, node_lon, df_master['Latitude'].to_numpy(dtype=float),
+                                df_master['Longitude'].to_numpy(dtype=float))
+
+    # One Dijkstra per branch, all in a single call; only the lead columns are kept
+    on_road = dijkstra(seconds, directed=True, indices=branch_nodes)[:, lead_nodes] / 60
+    off_road = (branch_km[:, None] + lead_km[None, :]) / OFF_ROAD_KMH * 60
+    return (on_road + off_road).astype(np.float32)
+
+
+def save(minutes, keys, branches, matrix_file=MATRIX_FILE, index_file=INDEX_FILE):
+    np.save(matrix_file, minutes)
+    Path(index_file).write_text(json.dumps({
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "branches": list(branches),
+        "key_column": ID_COLUMN,
+        "keys": [str(key) for key in keys],
+    }))
+
+
+def data_version(matrix_file=MATRIX_FILE, index_file=INDEX_FILE):
+    """(name, mtime, size) of the matrix files, like master_leads.data_version."""
+    return tuple((path.name, path.stat().st_mtime_ns, path.stat().st_size)
+                 for path in (Path(matrix_file), Path(index_file)) if path.is_file())
+
+
+class TravelTimes:
+    """The precomputed matrix, memory-mapped, with lookups by branch and OSM_ID."""
+
+    def __init__(self, matrix_file=MATRIX_FILE, index_file=INDEX_FILE):
+        index = json.loads(Path(index_file).read_text())
+        self.branches = index["branches"]
+        self.keys = pd.Index(index["keys"])
+        self.minutes = np.load(matrix_file, mmap_mode="r")
+
+    def _columns(self, df):
+        """Matrix column of each row of `df` (-1 when the lead is newer than the matrix)."""
+        if ID_COLUMN not in df.columns:
+            return np.full(len(df), -1)
+        return self.keys.get_indexer(df[ID_COLUMN].astype(str))
+
+    def minutes_from(self, df, branch):
+        """Road minutes from `branch` to each row of `df` (NaN when unknown or unreachable)."""
+        out = np.full(len(df), np.nan, dtype=np.float32)
+        if branch in self.branches:
+            cols = self._columns(df)
+            found = cols >= 0
+            out[found] = self.minutes[self.branches.index(branch), cols[found]]
+        out[~np.isfinite(out)] = np.nan
+        return pd.Series(out, index=df.index, name="Drive_Min")
+
+    def nearest_branch(self, df):
+        """(branch name, road minutes) of the closest branch by road for each row of `df`."""
+        cols = self._columns(df)
+        found = cols >= 0
+        minutes = np.full(len(df), np.nan, dtype=np.float32)
+        names = np.full(len(df), None, dtype=object)
+        if found.any():
+            block = np.asarray(self.minutes[:, cols[found]])
+            best = np.argmin(block, axis=0)
+            best_minutes = block[best, np.arange(block.shape[1])]
+            reachable = np.isfinite(best_minutes)
+            minutes[np.flatnonzero(found)[reachable]] = best_minutes[reachable]
+            names[np.flatnonzero(found)[reachable]] = np.array(self.branches, dtype=object)[best[reachable]]
+        return (pd.Series(names, index=df.index, name="Nearest_Branch"),
+                pd.Series(minutes, index=df.index, name="Branch_Drive_Min"))
+
+
+def load(matrix_file=MATRIX_FILE, index_file=INDEX_FILE):
+    """The TravelTimes, or None when travel_times.py has not been run yet."""
+    if not (Path(matrix_file).is_file() and Path(index_file).is_file()):
+        return None
+    return TravelTimes(matrix_file, index_file)
+
+
+def add_branch_minutes(df, times=None):
+    """`df` plus Nearest_Branch and Branch_Drive_Min, when a travel-time matrix exists."""
+    times = times or load()
+    if times is None:
+        return df
+    df = df.copy()
+    nearest, minutes = times.nearest_branch(df)
+    df['Nearest_Branch'] = nearest.astype('category')
+    df['Branch_Drive_Min'] = minutes.round(1)
+    return df
+
+
+def build(region=None, refresh_graph=False):
+    """Build and save the matrix for a region's master file (region_config.Region; Kogi by default)."""
+    region = region or lga_reference.REGION
+    graph = load_graph(region.query, region.graph_file, refresh=refresh_graph)
+    print(f"Drive network: {graph.number_of_nodes():,} nodes, {graph.number_of_edges():,} edges ({region.graph_file})")
+
+    df_master = master_leads.load_master(region.master_file, region.master_parquet)
+    minutes = travel_minutes(graph, df_master, region.branches)
+    save(minutes, df_master[ID_COLUMN], region.branches, region.matrix_file, region.index_file)
+
+    reachable = np.isfinite(minutes).all(axis=0).sum()
+    print(f"SUCCESS! {len(region.branches)} branches x {len(df_master):,} leads -> {region.matrix_file}")
+    print(f"Reachable by road from every branch: {reachable:,} of {len(df_master):,} leads")
+    return minutes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute road travel times from each branch to every lead.")
+    parser.add_argument("--refresh-graph", action="store_true", help=f"Download the drive network again ({GRAPH_FILE}).")
+    args = parser.parse_args()
+
+    print("--- BUILDING ROAD TRAVEL-TIME MATRIX ---")
+    build(refresh_graph=args.refresh_graph)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Filter-keyed memoization for the dashboard.
+
+Every sidebar change reruns app.py from the top. Most of what a rerun builds
+(the filtered frame, the map page, the viability matrix, the CSV export)
+depends only on the normalized filter, so it is kept here per filter tuple
+and a repeat view is a dictionary lookup.
+
+Each kind of artefact has its own bounded LRU, and every lookup is counted so
+the dashboard can show hit/miss numbers in its debug panel.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_MAX_ENTRIES = 32
+
+
+def filter_key(selected_lgas, selected_cats, priority, *extra):
+    """Order-insensitive key for a sidebar state (plus any extra settings)."""
+    return (tuple(sorted(selected_lgas or [])), tuple(sorted(selected_cats or [])), tuple(priority), *extra)
+
+
+class ViewCache:
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries = {}  # kind -> OrderedDict(key -> value), oldest first
+        self.stats = {}    # kind -> {"hits", "misses", "evicted", "build_s"}
+
+    def _kind(self, kind):
+        self.stats.setdefault(kind, {"hits": 0, "misses": 0, "evicted": 0, "build_s": 0.0})
+        return self.entries.setdefault(kind, OrderedDict())
+
+    def get(self, kind, key, build):
+        """Value of `build()` for (kind, key), computed once until evicted."""
+        with self.lock:
+            entries = self._kind(kind)
+            if key in entries:
+                entries.move_to_end(key)
+                self.stats[kind]["hits"] += 1
+                return entries[key]
+
+        # Build outside the lock; two sessions racing on the same key just build twice
+        start = time.perf_counter()
+        value = build()
+        elapsed = time.perf_counter() - start
+
+        with self.lock:
+            entries = self._kind(kind)
+            stats = self.stats[kind]
+            stats["misses"] += 1
+            stats["build_s"] += elapsed
+            entries[key] = value
+            entries.move_to_end(key)
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+                stats["evicted"] += 1
+        return value
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.stats.clear()
+
+    def report(self):
+        """One row per kind: entries, hits, misses, hit rate, evictions, time spent building."""
+        with self.lock:
+            rows = []
+            for kind, s in sorted(self.stats.items()):
+                lookups = s["hits"] + s["misses"]
+                rows.append({
+                    "Cache": kind,
+                    "Entries": len(self.entries.get(kind, {})),
+                    "Hits": s["hits"],
+                    "Misses": s["misses"],
+                    "Hit_Rate": f"{100 * s['hits'] / lookups:.0f}%" if lookups else "-",
+                    "Evicted": s["evicted"],
+                    "Build_Seconds": round(s["build_s"], 3),
+                })
+            return rows